@@ -1,14 +1,22 @@
 import argparse
+import bisect
+import hashlib
+import io
+import json
 import os
+import posixpath
 import re
 import sys
 import shutil
+import stat
+import tempfile
+import time
+from array import array
 from datetime import date, datetime, timedelta
 from pathlib import Path
-import tarfile
-import tkinter as tk
-from tkinter import filedialog
-import pyfiglet
+from urllib.parse import unquote
+# Le dipendenze pesanti (concurrent.futures, tarfile, tkinter, pyfiglet) vengono importate
+# solo dai comandi che le usano, cosí i comandi veloci partono subito anche senza Tk
 
 ## VERSIONE ##
 JOURNALSCRIPT_VERSION = "1.3.2"
@@ -50,9 +58,186 @@ B_NEXT = "## next"  # Sezione per le note che verranno proiettate al giorno succ
 B_REFS = "## refs"  # Sezione per i riferimenti agli assets
 B_TIME = "## time"  # Sezione per le ore sui vari progetti
 
+## ASSET ##
+ASSET_LINK = re.compile(r"\]\((?:<([^>]*assets/[^>]+)>|([^)\s]*assets/[^)\s]+))")  # Link Markdown verso assets/ (anche <path con spazi>)
+
+F_ASSETS_INDEX = "assets.json"
+ASSETS_INDEX_VERSION = 1
+
 ## DIR BLOCCATE ##
 D_ASSETS = "assets"
 D_WEEKS = "weeks"
+D_CACHE = ".journalscript"  # Cartella nascosta con le cache dello script (non fa parte delle note)
+D_INDEXES = "indexes"  # Indici generati per il singolo anno (YYYY/indexes/)
+
+## FILE GENERATI PER ANNO ##
+F_YEAR_CALENDAR = "calendar-{year}.md"
+F_YEAR_STATISTICS = "statistics-{year}.md"
+F_YEAR_MAIN_INDEX = "main-{year}.md"  # Indici di un solo anno del layout diviso per anno (--index-layout year)
+F_YEAR_TAGS_INDEX = "tags-{year}.md"
+F_YEAR_TIME_INDEX = "time-{year}.md"
+SHARDED_MAIN_TITLE = "# Indice Principale per anno\n"  # Titolo di MAIN_INDEX_FILE nel layout diviso per anno
+
+## PAGINE DEI TAG ##
+D_TAG_PAGES = "tags"  # Pagine dei tag in indexes/tags/ (--tags-layout tag o letter)
+TAG_PAGES_TITLES = {  # Titoli di TAGS_INDEX_FILE nei layout a pagine
+    "tag": "# Indice TAGS per tag\n",
+    "letter": "# Indice TAGS per lettera\n",
+}
+WEEKLY_VERSION = 2  # Da incrementare quando cambia il formato dei file settimanali (li rigenera tutti)
+
+## CACHE ##
+F_MANIFEST = "manifest.json"
+MANIFEST_VERSION = 2  # Da incrementare quando cambia il formato delle entry del manifest
+CACHE_DIR = Path(os.path.join(VAULT_DIR, D_CACHE)).resolve()
+MANIFEST_FILE = Path(os.path.join(CACHE_DIR, F_MANIFEST)).resolve()
+
+## CONFIGURAZIONE DEL VAULT ##
+F_CONFIG = "config.json"  # Scelte del vault (layout degli indici), non eliminata da -rc
+CONFIG_FILE = Path(os.path.join(CACHE_DIR, F_CONFIG)).resolve()
+DEFAULT_CONFIG = {"index_layout": "single", "tags_layout": "single"}
+CONFIG_CHOICES = {"index_layout": ["single", "year"], "tags_layout": ["single", "tag", "letter"]}
+VAULT_CONFIG = dict(DEFAULT_CONFIG)  # Configurazione del vault attivo, letta una volta da Vault.Activate()
+
+## RICERCA ##
+F_SEARCH = "search.json"
+SEARCH_VERSION = 1  # Da incrementare quando cambia il formato dell'indice di ricerca
+SEARCH_FILE = Path(os.path.join(CACHE_DIR, F_SEARCH)).resolve()
+SEARCH_TOKEN = re.compile(r"\w+")  # Parole indicizzate (lettere accentate comprese)
+
+## QUERY SUI TAG ##
+F_TAGS_CACHE = "tags.json"
+TAGS_CACHE_VERSION = 1
+TAGS_CACHE_FILE = Path(os.path.join(CACHE_DIR, F_TAGS_CACHE)).resolve()
+
+## REGISTRO DELLE ORE ##
+F_TIME_LEDGER = "time-ledger.json"
+TIME_LEDGER_VERSION = 1
+TIME_LEDGER_FILE = Path(os.path.join(CACHE_DIR, F_TIME_LEDGER)).resolve()
+
+## BACKUP ##
+F_BACKUP_MANIFEST = "backup-manifest.json"
+F_BACKUP_INFO = "backup-info.json"  # Descrizione del backup salvata dentro l'archivio
+BACKUP_MANIFEST_VERSION = 2  # Da incrementare quando cambia il formato di BACKUP_MANIFEST_FILE
+BACKUP_MANIFEST_FILE = Path(os.path.join(CACHE_DIR, F_BACKUP_MANIFEST)).resolve()
+D_OBJECTS = "objects"  # Blob dell'archivio a contenuto, per hash
+D_SNAPSHOTS = "snapshots"  # Mappe path -> blob di ogni backup nell'archivio a contenuto
+
+## DATABASE ##
+F_DATABASE = "journal.db"
+DATABASE_VERSION = 2  # Da incrementare quando cambia lo schema delle tabelle
+DATABASE_FILE = Path(os.path.join(CACHE_DIR, F_DATABASE)).resolve()
+ASSETS_INDEX_FILE = Path(os.path.join(CACHE_DIR, F_ASSETS_INDEX)).resolve()
+TAG_PAGES_DIR = Path(os.path.join(VAULT_DIR, D_INDEXES, D_TAG_PAGES)).resolve()
+
+## WATCH ##
+WATCH_POLL_INTERVAL = 2.0  # Secondi tra due controlli quando inotify non è disponibile
+WATCH_DEBOUNCE = 0.3       # Secondi di attesa per raggruppare gli eventi di un salvataggio
+INOTIFY_MASK = 0x8 | 0x40 | 0x80 | 0x100 | 0x200  # IN_CLOSE_WRITE, IN_MOVED_FROM/TO, IN_CREATE, IN_DELETE
+INOTIFY_IS_DIR = 0x40000000  # IN_ISDIR
+
+## STATISTICHE ##
+MONTH_SHORT_NAMES = {
+    "01": "Gen", "02": "Feb", "03": "Mar", "04": "Apr",
+    "05": "Mag", "06": "Giu", "07": "Lug", "08": "Ago",
+    "09": "Set", "10": "Ott", "11": "Nov", "12": "Dic"
+}
+WEEKDAY_NAMES = ["Lunedì", "Martedì", "Mercoledì", "Giovedì", "Venerdì", "Sabato", "Domenica"]
+
+## STATISTICHE DI SCRITTURA ##
+WRITE_STATS = {"written": 0, "unchanged": 0}  # File generati riscritti o lasciati invariati
+FILE_MODE = None  # Permessi dei file nuovi scritti da WriteIndexFile, calcolati alla prima scrittura
+
+## STRUMENTAZIONE ##
+IO_STATS = {"stat": 0, "read": 0, "bytes_read": 0, "write": 0, "bytes_written": 0}  # I/O del comando, riportato da --timings
+PHASE_TIMES = None  # {fase: [secondi, chiamate]} solo con --timings, altrimenti le fasi non vengono misurate
+PHASE_STACK = []    # Fasi in corso, per registrare quelle annidate con il path della fase padre
+TIMED_PHASES = [    # Funzioni misurate come fasi da --timings
+    "UpdateIndex", "CheckConsistency", "ScanVault", "LoadManifest", "LoadNotesData", "SaveManifest",
+    "UpdateMainIndex", "UpdateTagsIndex", "UpdateTagCache", "UpdateAssetIndex", "UpdateTimeIndex", "UpdateYearIndexes",
+    "UpdateTagPages", "UpdateCalendarIndex", "UpdateStatistics", "UpdateYearStatistics", "UpdateSearchIndex", "UpdateDatabase",
+    "PatchIndexesForNote", "AddNewNote", "AddNewNotes", "AddTagToNoteName", "TagList", "FormatVault",
+    "WeekLog", "WeekLogYear", "DeleteWeekLog", "DoBackup", "BackupToStore", "RestoreFromStore",
+    "SearchNotes", "QueryTags", "TimeReport", "AssetReport", "DatabaseReport", "RebuildCache",
+]
+
+## PARALLELISMO ##
+JOBS = min(8, os.cpu_count() or 1)  # Thread usati per leggere le note, modificabile con --jobs
+WORKER_POOL = None  # (thread, pool) creato alla prima lettura parallela e riusato da tutti i comandi e vault
+
+## VAULT ##
+# Path globali che dipendono dal vault attivo, ricalcolati da Vault.Activate() (parti relative alla root)
+VAULT_PATHS = {
+    "MAIN_INDEX_FILE": (F_MAIN_INDEX,),
+    "TAGS_INDEX_FILE": (F_TAGS_INDEX,),
+    "CALE_INDEX_FILE": (F_CALENDAR_INDEX,),
+    "STAT_INFO_FILE": (F_STATISTICS_INFO,),
+    "TIME_INDEX_FILE": (F_TIME_INDEX,),
+    "CACHE_DIR": (D_CACHE,),
+    "MANIFEST_FILE": (D_CACHE, F_MANIFEST),
+    "CONFIG_FILE": (D_CACHE, F_CONFIG),
+    "SEARCH_FILE": (D_CACHE, F_SEARCH),
+    "TAGS_CACHE_FILE": (D_CACHE, F_TAGS_CACHE),
+    "TIME_LEDGER_FILE": (D_CACHE, F_TIME_LEDGER),
+    "BACKUP_MANIFEST_FILE": (D_CACHE, F_BACKUP_MANIFEST),
+    "DATABASE_FILE": (D_CACHE, F_DATABASE),
+    "ASSETS_INDEX_FILE": (D_CACHE, F_ASSETS_INDEX),
+    "TAG_PAGES_DIR": (D_INDEXES, D_TAG_PAGES),
+}
+TEMPLATES = {}  # Template giá letti (path -> righe), condivisi da tutti i vault del processo
+
+###########
+## VAULT ##
+###########
+class Vault:
+    """
+    Un vault del diario: la sua root e i path di indici e cache che ne derivano.
+    I comandi lavorano sul vault attivo, quello dei path globali (VAULT_DIR, MAIN_INDEX_FILE, ...):
+    Activate() li ricalcola per questo vault, cosí uno stesso processo puó servire piú vault
+    di seguito (--vault ripetuto) riusando i template giá letti e i thread di lettura.
+    """
+    def __init__(self, root):
+        self.root = Path(root).resolve()
+        self.paths = {name: self.root.joinpath(*parts) for name, parts in VAULT_PATHS.items()}
+
+    def __repr__(self):
+        return f"Vault('{self.root}')"
+
+    def Activate(self):
+        """
+        Rende questo vault quello attivo, ne legge la configurazione e aggiorna la data di oggi
+        (per i processi che durano piú giorni).
+        """
+        current_day = date.today()
+        globals().update(self.paths)
+        globals().update(VAULT_DIR=self.root, today=current_day, YEAR_DIR=self.root / str(current_day.year))
+        globals().update(VAULT_CONFIG=LoadVaultConfig())
+        return self
+
+def RefreshToday():
+    """
+    Aggiorna la data di oggi (e YEAR_DIR) del vault attivo se è cambiata, per i processi
+    che restano attivi a cavallo della mezzanotte (--watch). Ritorna True se è cambiata.
+    """
+    current_day = date.today()
+    if current_day == today:
+        return False
+    globals().update(today=current_day, YEAR_DIR=VAULT_DIR / str(current_day.year))
+    return True
+
+def ReadVaultList(file_path):
+    """
+    Legge un elenco di vault, uno per riga (righe vuote e commenti # ignorati).
+    I path relativi sono relativi alla cartella del file.
+    """
+    base_dir = os.path.dirname(os.path.abspath(file_path))
+    vaults = []
+    with open(file_path, "r", encoding="utf-8") as list_file:
+        for line in list_file:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                vaults.append(Vault(os.path.join(base_dir, os.path.expanduser(line))))
+    return vaults
 
 #######################
 ## UTILITY FUNCTIONS ##
@@ -67,6 +252,15 @@ def ValidateNoteName(notename):
         print(f"Errore: il file di scelto '{notename}' deve avere estensione .md .")
         sys.exit(1)
         
+def ParseDateOption(value):
+    """
+    Converte una data YYYY-MM-DD passata da riga di comando, con un errore leggibile se non è valida.
+    """
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data '{value}' non valida, usa il formato YYYY-MM-DD")
+
 def GenerateNoteName(date_obj):
     """
     Genera il nome della nota nel formato YYYY-MM-DD.md.
@@ -76,701 +270,1718 @@ def GenerateNoteName(date_obj):
     day = f"{date_obj.day:02d}"      # Formatta il giorno con due cifre
     return f"{year}-{month}-{day}.md"
 
-def FixNoteSpaces(notename):
+def FormatNoteLines(lines):
     """
-    Ottimizza gli spazi in una nota Markdown seguendo le regole:
+    Ottimizza gli spazi di righe Markdown seguendo le regole:
     - Ogni blocco di testo (titolo, elenco o contenuto) deve essere circondato da una riga vuota.
     - Tra due titoli consecutivi (es. # e ##, ## e ##) senza contenuto in mezzo ci deve essere una riga vuota.
+    È un generatore: legge una riga alla volta da qualsiasi iterabile (file aperto, StringIO, lista)
+    e produce le righe formattate, cosí il testo viene formattato prima dell'unica scrittura.
+    """
+    previous_line = ""
+    for line in lines:
+        stripped_line = line.strip()
+
+        # Gestisci righe vuote prima di un titolo
+        if stripped_line.startswith("#"):
+            if previous_line.strip():  # Se la riga precedente non è vuota, aggiungi una riga vuota
+                yield "\n"
+            yield line
+            previous_line = line
+            continue
+
+        # Gestisci righe vuote prima di un elenco
+        if stripped_line.startswith("- ") or stripped_line.startswith("[ ]"):
+            if previous_line.strip() and not previous_line.strip().startswith("- ") and not previous_line.strip().startswith("[ ]"):
+                yield "\n"
+            yield line
+            previous_line = line
+            continue
+
+        # Gestisci righe vuote dopo un titolo o un elenco
+        if previous_line.strip().startswith("#") or previous_line.strip().startswith("- ") or previous_line.strip().startswith("[ ]"):
+            if stripped_line:  # Se la riga corrente non è vuota, aggiungi una riga vuota
+                yield "\n"
+
+        # Gestisci righe vuote consecutive
+        if not stripped_line:
+            if previous_line.strip():  # Aggiungi una sola riga vuota
+                yield line
+            previous_line = line
+            continue
+
+        # Aggiungi la riga corrente
+        yield line
+        previous_line = line
+
+def FormatNoteText(text):
+    """
+    Ritorna il testo di una nota con gli spazi ottimizzati da FormatNoteLines().
+    """
+    return "".join(FormatNoteLines(io.StringIO(text)))
+
+def DefaultFileMode():
+    """
+    Ritorna i permessi di un file nuovo creato con open() (0o666 meno la umask del processo).
+    La umask viene letta una sola volta: os.umask() la puó solo sostituire, non leggere.
+    """
+    global FILE_MODE
+    if FILE_MODE is None:
+        umask = os.umask(0)
+        os.umask(umask)
+        FILE_MODE = 0o666 & ~umask
+    return FILE_MODE
+
+def WriteIndexFile(file_path, content):
     """
+    Scrive un file generato (indici, statistiche, calendari, weekly) solo se il contenuto è cambiato.
+    Il confronto con il file su disco avviene per dimensione e poi per hash del contenuto;
+    la scrittura è atomica: un file temporaneo nella stessa cartella sostituisce l'originale
+    con os.replace, cosí un'interruzione non lascia mai un indice troncato.
+    Il file mantiene i permessi di quello che sostituisce (o quelli di default per un file nuovo).
+    Ritorna True se il file è stato scritto.
+    """
+    data = content.encode("utf-8")
+    mode = None
     try:
-        if not notename:
-            print(f"Errore: La nota '{os.path.relpath(notename, VAULT_DIR)}' non è stata trovata.")
-            return
+        CountStat()
+        st = os.stat(file_path)
+        mode = stat.S_IMODE(st.st_mode)
+        if st.st_size == len(data):
+            CountRead(len(data))
+            with open(file_path, "rb") as f:
+                if hashlib.sha1(f.read()).digest() == hashlib.sha1(data).digest():
+                    WRITE_STATS["unchanged"] += 1
+                    return False
+    except OSError:
+        pass  # Il file non esiste ancora
 
-        # Leggi il contenuto della nota
-        with open(notename, "r", encoding="utf-8") as file:
-            content = file.readlines()
+    dir_path, file_name = os.path.split(os.fspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{file_name}.", suffix=".tmp", dir=dir_path)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # mkstemp crea il file con permessi 0600: senza chmod ogni indice riscritto perderebbe i permessi originali
+        os.chmod(tmp_path, mode if mode is not None else DefaultFileMode())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    CountWrite(len(data))
+    WRITE_STATS["written"] += 1
+    return True
 
-        new_content = []
-        previous_line = ""
-        for i, line in enumerate(content):
-            stripped_line = line.strip()
+def PrintWriteSummary():
+    """
+    Stampa quanti file generati sono stati effettivamente riscritti durante il comando.
+    """
+    total = WRITE_STATS["written"] + WRITE_STATS["unchanged"]
+    if total:
+        print(f"File generati: {WRITE_STATS['written']} scritti, {WRITE_STATS['unchanged']} invariati su {total}.")
 
-            # Gestisci righe vuote prima di un titolo
-            if stripped_line.startswith("#"):
-                if previous_line.strip():  # Se la riga precedente non è vuota, aggiungi una riga vuota
-                    new_content.append("\n")
-                new_content.append(line)
-                previous_line = line
-                continue
+def CountStat(count=1):
+    """
+    Registra in IO_STATS gli stat eseguiti (riportati da --timings).
+    """
+    IO_STATS["stat"] += count
 
-            # Gestisci righe vuote prima di un elenco
-            if stripped_line.startswith("- ") or stripped_line.startswith("[ ]"):
-                if previous_line.strip() and not previous_line.strip().startswith("- ") and not previous_line.strip().startswith("[ ]"):
-                    new_content.append("\n")
-                new_content.append(line)
-                previous_line = line
-                continue
+def CountRead(size, count=1):
+    """
+    Registra in IO_STATS i file letti e i loro byte (riportati da --timings).
+    Chiamata dal thread principale anche per le letture parallele, cosí i contatori restano esatti.
+    """
+    IO_STATS["read"] += count
+    IO_STATS["bytes_read"] += size
 
-            # Gestisci righe vuote dopo un titolo o un elenco
-            if previous_line.strip().startswith("#") or previous_line.strip().startswith("- ") or previous_line.strip().startswith("[ ]"):
-                if stripped_line:  # Se la riga corrente non è vuota, aggiungi una riga vuota
-                    new_content.append("\n")
+def CountWrite(size, count=1):
+    """
+    Registra in IO_STATS i file scritti e i loro byte (riportati da --timings).
+    """
+    IO_STATS["write"] += count
+    IO_STATS["bytes_written"] += size
 
-            # Gestisci righe vuote consecutive
-            if not stripped_line:
-                if previous_line.strip():  # Aggiungi una sola riga vuota
-                    new_content.append(line)
-                previous_line = line
-                continue
+#####################
+## CACHE FUNCTIONS ##
+#####################
+def LoadManifest():
+    """
+    Carica il manifest delle note da MANIFEST_FILE.
+    Il manifest contiene per ogni nota (path relativo) mtime, dimensione, hash del contenuto
+    e i dati giá estratti (tag, ore di ## time, numero di parole), piú le bitmap dei giorni
+    con una nota usate per decidere quali calendari annuali rigenerare.
+    Se il file non esiste, è corrotto o ha una versione diversa ritorna un manifest vuoto.
+    """
+    empty = {"version": MANIFEST_VERSION, "notes": {}, "dirty": False}
+    if not os.path.exists(MANIFEST_FILE):
+        return empty
+    try:
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+            CountRead(f.tell())
+        if manifest.get("version") != MANIFEST_VERSION or not isinstance(manifest.get("notes"), dict):
+            return empty
+        manifest["dirty"] = False
+        return manifest
+    except (OSError, ValueError):
+        return empty
 
-            # Aggiungi la riga corrente
-            new_content.append(line)
-            previous_line = line
+def SaveManifest(manifest):
+    """
+    Salva il manifest in MANIFEST_FILE, solo se è stato modificato durante l'esecuzione.
+    """
+    if not manifest.get("dirty"):
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        data = {key: value for key, value in manifest.items() if key != "dirty"}
+        data["version"] = MANIFEST_VERSION
+        with open(MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            CountWrite(f.tell())
+        manifest["dirty"] = False
+    except Exception as e:
+        print(f"Errore durante il salvataggio della cache delle note: {e}")
+
+def LoadVaultConfig():
+    """
+    Carica la configurazione del vault da CONFIG_FILE, con i valori di default per le chiavi
+    mancanti o non valide (anche se il file non esiste o è corrotto).
+    """
+    config = dict(DEFAULT_CONFIG)
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+            CountRead(f.tell())
+    except (OSError, ValueError):
+        return config
+    if isinstance(saved, dict):
+        for key, choices in CONFIG_CHOICES.items():
+            if saved.get(key) in choices:
+                config[key] = saved[key]
+    return config
+
+def SaveVaultConfig(**changes):
+    """
+    Modifica la configurazione del vault attivo e la salva in CONFIG_FILE.
+    """
+    VAULT_CONFIG.update(changes)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    WriteIndexFile(CONFIG_FILE, json.dumps(VAULT_CONFIG, indent=2) + "\n")
+
+def PruneManifest(manifest, seen_paths):
+    """
+    Rimuove dal manifest le note che non sono piú presenti nel vault.
+    """
+    removed = [rel for rel in manifest["notes"] if rel not in seen_paths]
+    for rel in removed:
+        del manifest["notes"][rel]
+    if removed:
+        manifest["dirty"] = True
+
+def ParseNoteContent(content):
+    """
+    Estrae da una nota i dati usati dagli indici:
+    - tags: lista degli elementi della sezione ## tags
+    - time: dizionario progetto -> ore (ogni elemento della sezione ## time vale un'ora)
+    - words: numero di parole dell'intera nota
+    - links: link agli asset (relativi alla nota), dai link Markdown in tutta la nota
+      e dai path scritti direttamente negli elenchi della sezione ## refs
+    """
+    tags = []
+    time_entries = {}
+    links = []
+    section = None
+    for line in content.split("\n"):
+        stripped_line = line.strip()
+        for bracketed, plain in ASSET_LINK.findall(line):
+            target = bracketed or plain
+            if target not in links:
+                links.append(target)
+        if stripped_line == B_TAGS or stripped_line == B_TIME or stripped_line == B_REFS:
+            section = stripped_line
+            continue
+        if stripped_line.startswith(B_SUBTITLE):  # Fine del blocco ## tags, ## time o ## refs
+            section = None
+            continue
+        if section and line.startswith("- "):  # Considera solo gli elenchi puntati
+            item = stripped_line.lstrip("- ").strip()
+            if section == B_TAGS:
+                tags.append(item)
+            elif section == B_TIME:
+                time_entries[item] = time_entries.get(item, 0) + 1
+            elif f"{D_ASSETS}/" in item and "](" not in item and item not in links:
+                links.append(item)
+    return {"tags": tags, "time": time_entries, "words": len(content.split()), "links": links}
+
+def ReadNoteLines(file_path):
+    """
+    Legge tutte le righe di una nota (usata dai lettori paralleli).
+    """
+    with open(file_path, "r", encoding="utf-8") as note_file:
+        return note_file.readlines()
+
+def IsNoteCached(entry, st):
+    """
+    Ritorna True se la entry del manifest corrisponde allo stat attuale della nota.
+    """
+    return bool(entry) and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size
+
+def ReadNoteFile(file_path):
+    """
+    Legge e analizza una nota senza toccare il manifest, cosí puó essere eseguita in parallelo.
+    Ritorna lo stat della nota e la entry con i dati estratti e l'hash del contenuto.
+    La entry contiene anche "search" (parole e sezioni per la ricerca e il database, da TokenizeNote),
+    ricavato dallo stesso testo giá in memoria: non viene salvato nel manifest ma resta nella nota del modello.
+    """
+    st = os.stat(file_path)
+    with open(file_path, "rb") as note_file:
+        raw = note_file.read()
+    content = raw.decode("utf-8")
+    entry = ParseNoteContent(content)
+    entry["hash"] = hashlib.sha1(raw).hexdigest()
+    entry["search"] = TokenizeNote(content)
+    return st, entry
+
+def StoreNoteData(manifest, relative_path, st, entry):
+    """
+    Salva nel manifest la entry appena letta. Se l'hash coincide con quello giá salvato
+    mantiene la entry esistente aggiornando solo lo stat.
+    """
+    entry.pop("search", None)  # Parole e sezioni restano solo nel modello
+    cached = manifest["notes"].get(relative_path)
+    if cached and cached.get("hash") == entry["hash"]:
+        entry = cached
+    entry["mtime"] = st.st_mtime_ns
+    entry["size"] = st.st_size
+    manifest["notes"][relative_path] = entry
+    manifest["dirty"] = True
+    return entry
 
-        # Scrivi il contenuto ottimizzato nella nota
-        with open(notename, "w", encoding="utf-8") as file:
-            file.writelines(new_content)
+def GetNoteData(manifest, file_path, relative_path):
+    """
+    Ritorna i dati estratti dalla nota, usando il manifest se la nota non è cambiata.
+    Una nota è considerata invariata se mtime e dimensione coincidono con quelli salvati,
+    altrimenti viene letta: se l'hash del contenuto coincide si aggiorna solo lo stat,
+    in caso contrario la nota viene analizzata di nuovo.
+    """
+    entry = manifest["notes"].get(relative_path)
+    CountStat()
+    if IsNoteCached(entry, os.stat(file_path)):
+        return entry
+    st, entry = ReadNoteFile(file_path)
+    CountStat()
+    CountRead(st.st_size)
+    search = entry["search"]
+    return dict(StoreNoteData(manifest, relative_path, st, entry), search=search)
 
-        # print(f"Spazi ottimizzati nella nota '{os.path.relpath(notename, VAULT_DIR)}'.")
+def MapJobs(func, items):
+    """
+    Applica func a ogni elemento di items usando JOBS thread e ritorna i risultati
+    nello stesso ordine degli elementi, cosí l'output non dipende dall'ordine di completamento.
+    Con JOBS <= 1 (o un solo elemento) l'esecuzione è seriale.
+    I thread vengono creati una sola volta e riusati dalle letture successive (anche di altri vault).
+    """
+    global WORKER_POOL
+    items = list(items)
+    if JOBS <= 1 or len(items) < 2:
+        return [func(item) for item in items]
+    if WORKER_POOL is None or WORKER_POOL[0] != JOBS:
+        from concurrent.futures import ThreadPoolExecutor
+        WORKER_POOL = (JOBS, ThreadPoolExecutor(max_workers=JOBS))
+    return list(WORKER_POOL[1].map(func, items))
 
+def RebuildCache():
+    """
+    Elimina la cache delle note, l'indice di ricerca, la cache dei tag, il registro delle ore e l'indice degli asset e rigenera tutti gli indici rileggendo l'intero vault.
+    """
+    try:
+        for cache_file in [MANIFEST_FILE, SEARCH_FILE, TAGS_CACHE_FILE, TIME_LEDGER_FILE, ASSETS_INDEX_FILE]:
+            if os.path.exists(cache_file):
+                os.remove(cache_file)
+                print(f"Cache '{os.path.relpath(cache_file, VAULT_DIR)}' eliminata.")
     except Exception as e:
-        print(f"Errore durante l'ottimizzazione degli spazi nella nota: {e}")
+        print(f"Errore durante l'eliminazione della cache: {e}")
+        sys.exit(1)
+    UpdateIndex()
+
+#########################
+## TRAVERSAL FUNCTIONS ##
+#########################
+def ScanTree(dir_path, rel_prefix="", excluded=()):
+    """
+    Visita ricorsivamente dir_path con os.scandir e genera le coppie (path relativo, DirEntry)
+    dei file, in ordine alfabetico. Le directory con nome in excluded non vengono mai aperte;
+    lo stat dei file è quello in cache nella DirEntry (entry.stat()).
+    """
+    stack = [(os.fspath(dir_path), rel_prefix)]
+    while stack:
+        current, prefix = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except (FileNotFoundError, NotADirectoryError):
+            continue  # Directory sparita o mai creata (es: anno senza assets)
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in excluded:
+                    subdirs.append((entry.path, f"{prefix}{entry.name}/"))
+            elif entry.is_file():
+                yield prefix + entry.name, entry
+        stack.extend(reversed(subdirs))  # La prima sottocartella viene visitata per prima
+
+def WalkVault(excluded=(D_CACHE,)):
+    """
+    Visita tutto il vault saltando le directory escluse (per default solo la cache dello script).
+    """
+    return ScanTree(VAULT_DIR, "", excluded)
+
+def YearDirs():
+    """
+    Ritorna in ordine le directory YYYY presenti nel vault.
+    """
+    with os.scandir(VAULT_DIR) as entries:
+        return sorted(entry.path for entry in entries if entry.is_dir() and re.fullmatch(r"\d{4}", entry.name))
+
+def NotePath(notename):
+    """
+    Ritorna il path di una nota dal suo nome: per YYYY-MM-DD.md è direttamente YYYY/YYYY-MM-DD.md,
+    altrimenti (o se la nota è stata salvata in un altro anno) la cerca nelle sole directory YYYY.
+    Ritorna None se la nota non esiste.
+    """
+    note_date = ParseNoteDate(notename)
+    if note_date is not None:
+        note_path = os.path.join(VAULT_DIR, str(note_date.year), notename)
+        if os.path.isfile(note_path):
+            return note_path
+    for year_dir in YearDirs():
+        note_path = os.path.join(year_dir, notename)
+        if os.path.isfile(note_path):
+            return note_path
+    return None
 
 #########################
 ## PRINCIPAL FUNCTIONS ##
 #########################
+def ParseNoteDate(notename):
+    """
+    Ritorna la data di una nota dal suo nome YYYY-MM-DD.md, o None se il nome non è valido
+    o non corrisponde a una data esistente.
+    """
+    match = re.match(r"(\d{4})-(\d{2})-(\d{2})\.md$", notename)
+    try:
+        return date(*map(int, match.groups())) if match else None
+    except ValueError:
+        return None
+
+def MakeModelNote(relative_path, note_date):
+    """
+    Crea la entry del modello del vault per una nota dato il suo path relativo.
+    """
+    parts = relative_path.split("/")
+    return {
+        "name": parts[-1],
+        "path": os.path.join(VAULT_DIR, *parts),
+        "rel": relative_path,
+        "year": parts[0] if len(parts) >= 2 else str(note_date.year),
+    }
+
+def ScanVault():
+    """
+    Visita il vault una sola volta e costruisce il modello in memoria usato da tutti i comandi.
+    Il modello è un dizionario con:
+    - notes: note valide indicizzate per data (nome, path assoluto, path relativo, anno)
+    - invalid_notes, duplicate_notes, invalid_assets: risultati del check di consistenza
+    La visita usa WalkVault() e non entra nelle cartelle generate (weeks, indexes) né nella cache;
+    il contenuto delle note viene letto da LoadNotesData(), lo stat della visita resta nella nota ("st").
+    """
+    model = {
+        "notes": {},            # date -> dati della nota
+        "invalid_notes": [],    # Lista per raccogliere i file con nomi errati
+        "duplicate_notes": [],  # Lista per raccogliere i file con nomi duplicati
+        "invalid_assets": [],   # File asset con nomi errati
+    }
+    note_names = set()  # Set per tracciare i nomi univoci delle note
+
+    # La cache, la cartella weeks e gli indici annuali generati non vengono visitati
+    for relative_path, entry in WalkVault(excluded=(D_CACHE, D_WEEKS, D_INDEXES)):
+        file = entry.name
+        if file.startswith(".") and file.endswith(".tmp"):
+            continue  # File temporaneo di una scrittura atomica interrotta
+
+        # Check per gli assets
+        if D_ASSETS in relative_path.split("/")[:-1]:
+            # Match per asset: YYYY-MM-DD-nomequalsiasi.estensione
+            if not re.match(r"\d{4}-\d{2}-\d{2}-.+\..+", file):
+                model["invalid_assets"].append(relative_path)
+            continue  # Skip al prossimo file, non serve processare altro
+
+        # Escludi i file weekly
+        if file.startswith("weekly") or re.match(r"\d{4}weekly\d{2}\.md", file):
+            continue
+
+        if not file.endswith(".md"):
+            model["invalid_notes"].append(relative_path)
+            continue
+        if file in LOCKED_FILES:
+            continue
+
+        # Controlla se il nome del file è nel formato YYYY-MM-DD.md ed è una data esistente
+        note_date = ParseNoteDate(file)
+        if note_date is None:
+            model["invalid_notes"].append(relative_path)
+        elif file in note_names:
+            model["duplicate_notes"].append(relative_path)
+        else:
+            note_names.add(file)
+            note = MakeModelNote(relative_path, note_date)
+            note["st"] = entry.stat()
+            CountStat()
+            model["notes"][note_date] = note
+
+    return model
+
+def LoadNotesData(model, manifest):
+    """
+    Completa il modello con i dati estratti da ogni nota (tag, ore, parole),
+    usando il manifest per le note non modificate e rimuovendo dal manifest le note sparite.
+    """
+    # Lo stat (giá fatto dalla visita del vault) resta seriale, solo le note modificate vengono lette (in parallelo)
+    to_read = []
+    for note_date in sorted(model["notes"]):
+        note = model["notes"][note_date]
+        entry = manifest["notes"].get(note["rel"])
+        if "st" not in note:
+            CountStat()
+        if IsNoteCached(entry, note.get("st") or os.stat(note["path"])):
+            note.update(entry)
+        else:
+            to_read.append(note)
+
+    # Unione deterministica dei risultati, nell'ordine delle date
+    for note, (st, entry) in zip(to_read, MapJobs(ReadNoteFile, [note["path"] for note in to_read])):
+        CountStat()
+        CountRead(st.st_size)
+        search = entry["search"]
+        note.update(StoreNoteData(manifest, note["rel"], st, entry))
+        note["search"] = search
+
+    PruneManifest(manifest, {note["rel"] for note in model["notes"].values()})
+    SaveManifest(manifest)
+
+def ReportConsistency(model):
+    """
+    Stampa i risultati del check di consistenza contenuti nel modello del vault.
+    Se ci sono note o asset con nomi errati o duplicati termina lo script.
+    """
+    invalid_notes = model["invalid_notes"]
+    duplicate_notes = model["duplicate_notes"]
+    invalid_assets = model["invalid_assets"]
+
+    # Stampa i risultati
+    if invalid_notes:
+        print("Sono state trovate note con nomi non validi:")
+        for note in invalid_notes:
+            print(f"- {note}")
+        print("\nRinomina manualmente i file sopra elencati per rispettare il formato YYYY-MM-DD.md.")
+
+    if duplicate_notes:
+        print("Sono state trovate note con nomi duplicati:")
+        for note in duplicate_notes:
+            print(f"- {note}")
+        print("\nRinomina manualmente i file sopra elencati per garantire che ogni nota abbia un nome univoco.")
+
+    if invalid_assets:
+        print("Sono stati trovati file asset con nomi non validi:")
+        for asset in invalid_assets:
+            print(f"- {asset}")
+        print("\nRinomina manualmente gli asset sopra elencati per rispettare il formato YYYY-MM-DD-nome.estensione.")
+
+    if invalid_notes or duplicate_notes or invalid_assets:
+        sys.exit(1)
+
 def CheckConsistency():
     """
     Controlla la consistenza dei nomi delle note nel vault.
     Verifica se i nomi delle note sono nel formato YYYY-MM-DD.md.
     Inoltre, verifica che non ci siano nomi duplicati.
     Stampa i nomi delle note con formato errato o duplicati per consentire la correzione manuale.
+    Ritorna il modello del vault, cosí chi lo chiama non deve visitarlo di nuovo.
     """
     try:
-        invalid_notes = []      # Lista per raccogliere i file con nomi errati
-        note_names = set()      # Set per tracciare i nomi univoci delle note
-        duplicate_notes = []    # Lista per raccogliere i file con nomi duplicati
-        invalid_assets = []     # File asset con nomi errati
-
-        for root, dirs, files in os.walk(VAULT_DIR):
-            # Ignora la cartella weeks
-            if D_WEEKS in root:
-                continue
-            
-            for file in files:
-                # Check per gli assets
-                if D_ASSETS in root:
-                    # Match per asset: YYYY-MM-DD-nomequalsiasi.estensione
-                    if not re.match(r"\d{4}-\d{2}-\d{2}-.+\..+", file):
-                        relative_path = os.path.relpath(os.path.join(root, file), VAULT_DIR)
-                        invalid_assets.append(relative_path)
-                    continue  # Skip al prossimo file, non serve processare altro
-                
-                # Escludi i file weekly
-                if file.startswith("weekly") or re.match(r"\d{4}weekly\d{2}\.md", file):
-                    continue
-                
-                if file.endswith(".md"):
-                    if(file in LOCKED_FILES):
-                        continue
-                    # Controlla se il nome del file è nel formato YYYY-MM-DD.md
-                    match = re.match(r"(\d{4})-(\d{2})-(\d{2})\.md", file)
-                    relative_path = os.path.relpath(os.path.join(root, file), VAULT_DIR)
-                    if not match:
-                        invalid_notes.append(relative_path)  # Aggiungi il percorso relativo del file
-                    else:
-                        # Verifica se il nome della nota è già stato visto
-                        if file in note_names:
-                            duplicate_notes.append(relative_path)  # Aggiungi il percorso relativo del file duplicato
-                        else:
-                            note_names.add(file)
-                else:
-                    relative_path = os.path.relpath(os.path.join(root, file), VAULT_DIR)
-                    invalid_notes.append(relative_path)
-
-        # Stampa i risultati
-        if invalid_notes:
-            print("Sono state trovate note con nomi non validi:")
-            for note in invalid_notes:
-                print(f"- {note}")
-            print("\nRinomina manualmente i file sopra elencati per rispettare il formato YYYY-MM-DD.md.")
-
-        if duplicate_notes:
-            print("Sono state trovate note con nomi duplicati:")
-            for note in duplicate_notes:
-                print(f"- {note}")
-            print("\nRinomina manualmente i file sopra elencati per garantire che ogni nota abbia un nome univoco.")
-
-        if invalid_assets:
-            print("Sono stati trovati file asset con nomi non validi:")
-            for asset in invalid_assets:
-                print(f"- {asset}")
-            print("\nRinomina manualmente gli asset sopra elencati per rispettare il formato YYYY-MM-DD-nome.estensione.")
-
-        if invalid_notes or duplicate_notes or invalid_assets:
-            sys.exit(1)
-
+        model = ScanVault()
     except Exception as e:
         print(f"Errore durante il controllo della consistenza: {e}")
         sys.exit(1)
+    ReportConsistency(model)
+    return model
 
-def UpdateMainIndex(notes_by_year):
+def NotesByYear(model):
     """
-    Aggiorna il file MAIN_INDEX_FILE con tutte le note presenti nel vault, organizzate per anno.
+    Raggruppa le note del modello per anno (cartella) come coppie (nome, path relativo).
+    """
+    notes_by_year = {}
+    for note_date in sorted(model["notes"]):
+        note = model["notes"][note_date]
+        notes_by_year.setdefault(note["year"], []).append((note["name"], note["rel"]))
+    return notes_by_year
+
+def RenderMainIndex(model):
+    """
+    Genera il contenuto di MAIN_INDEX_FILE con tutte le note presenti nel vault, organizzate per anno.
     Le note più recenti saranno in cima alla lista di ogni anno.
+    Nel layout diviso per anno genera solo il riepilogo con i link agli indici di ogni anno.
     """
+    if ShardedIndexes():
+        return RenderMainSummary(model)
+    notes_by_year = NotesByYear(model)
 
-    # Controlla se MAIN_INDEX_FILE esiste, altrimenti crealo
+    index_file = io.StringIO()
+    index_file.write("# Indice Principale\n\n")
+    for year, notes in sorted(notes_by_year.items(), reverse=True):  # Anni dal più recente
+        index_file.write(f"# {year}\n\n")
+        for note_name, note_path in sorted(notes, reverse=True):  # Note dalla più recente
+            # Estrai MM-DD dal nome del file
+            date_part = note_name.split(".")[0][5:]  # Prende MM-DD
+            index_file.write(f"- [{date_part}]({note_path})\n")
+        index_file.write("\n")  # Riga vuota tra gli anni
+    return index_file.getvalue()
+
+def UpdateMainIndex(model):
+    """
+    Aggiorna il file MAIN_INDEX_FILE con tutte le note presenti nel vault, organizzate per anno.
+    """
+    # Controlla se MAIN_INDEX_FILE esiste, altrimenti viene creato
     if not os.path.exists(MAIN_INDEX_FILE):
-        with open(MAIN_INDEX_FILE, "w", encoding="utf-8") as index_file:
-            index_file.write("# Indice Principale\n\n")
         print(f"File '{os.path.relpath(MAIN_INDEX_FILE, VAULT_DIR)}' creato con successo.")
         
     try:
-        with open(MAIN_INDEX_FILE, "w", encoding="utf-8") as index_file:
-            index_file.write("# Indice Principale\n\n")
-            for year, notes in sorted(notes_by_year.items(), reverse=True):  # Anni dal più recente
-                index_file.write(f"# {year}\n\n")
-                for note_name, note_path in sorted(notes, reverse=True):  # Note dalla più recente
-                    # Estrai MM-DD dal nome del file
-                    date_part = note_name.split(".")[0][5:]  # Prende MM-DD
-                    index_file.write(f"- [{date_part}]({note_path})\n")
-                index_file.write("\n")  # Riga vuota tra gli anni
+        WriteIndexFile(MAIN_INDEX_FILE, RenderMainIndex(model))
     except Exception as e:
         print(f"Errore durante l'aggiornamento del file principale: {e}")
 
-def UpdateTimeIndex(prog_data):
+def RenderTimeIndex(model):
     """
-    Aggiorna il file TIME_INDEX_FILE con tutti i progetti presenti nei vari giorni,
-    Ne conta le occorrenze (e quindi le ore) e ne calcola la percentuale sul lavoro totale
+    Genera il contenuto di TIME_INDEX_FILE con tutti i progetti presenti nei vari giorni,
+    Ne conta le occorrenze (e quindi le ore) e ne calcola la percentuale sul lavoro totale.
+    I totali sono somme raggruppate sul registro colonnare delle ore (TimeLedger).
+    Nel layout diviso per anno genera solo il riepilogo con i link agli indici di ogni anno.
     """
+    if ShardedIndexes():
+        return RenderTimeSummary(model)
+    ledger = TimeLedger(model)
+
+    # Ore per (anno, mese) e ore dell'anno corrente (WIP)
+    by_month = GroupTime(ledger, lambda o: date.fromordinal(o).strftime("%Y-%m"))
+    current_year = str(today.year)
+    wip_totals = {}
+    for period, group in by_month.items():
+        if period[:4] == current_year:
+            for pid, hours in group.items():
+                wip_totals[pid] = wip_totals.get(pid, 0) + hours
+
+    f = io.StringIO()
+    f.write("# Time Index\n\n")
     
+    # Sezione WIP (anno corrente)
+    if wip_totals:
+        f.write("## Total Time for projects\n\n")
+        f.write(RenderProjectHours(SortedProjectHours(ledger, wip_totals)))
+        f.write("\n")
+    
+    # Sezione per ogni anno e mese (ordinati decrescenti)
+    year = None
+    for period in sorted(by_month, reverse=True):
+        if period[:4] != year:
+            year = period[:4]
+            f.write(f"## {year}\n\n")
+        f.write(f"### {MONTH_SHORT_NAMES[period[5:]]}\n\n")
+        f.write(RenderProjectHours(SortedProjectHours(ledger, by_month[period])))
+        f.write("\n")
+    return f.getvalue()
+
+def UpdateTimeIndex(model):
+    """
+    Aggiorna il file TIME_INDEX_FILE con le ore spese sui progetti e il registro delle ore su disco.
+    """
     try:
-        # Organizza i dati per anno e mese
-        data_by_year_month = {}
-        year_totals = {}
-        wip_totals = {}
-        
-        # Scansiona tutti i progetti
-        for project, notes_dict in prog_data.items():
-            for note_path, hours in notes_dict.items():
-                # Estrai anno e mese dal percorso della nota (es. "2026/2026-04-28.md")
-                parts = note_path.split("/")
-                if len(parts) >= 2:
-                    year = parts[0]
-                    note_name = parts[1]
-                    month = note_name.split("-")[1]  # Estrai il mese da YYYY-MM-DD.md
-                    
-                    # Inizializza strutture se necessarie
-                    if year not in data_by_year_month:
-                        data_by_year_month[year] = {}
-                        year_totals[year] = {}
-                    
-                    if month not in data_by_year_month[year]:
-                        data_by_year_month[year][month] = {}
-                    
-                    if project not in data_by_year_month[year][month]:
-                        data_by_year_month[year][month][project] = 0
-                    
-                    # Aggiungi le ore
-                    data_by_year_month[year][month][project] += hours
-                    
-                    # Aggiungi al totale annuale
-                    if project not in year_totals[year]:
-                        year_totals[year][project] = 0
-                    year_totals[year][project] += hours
-                    
-                    # Aggiungi al totale WIP (anno corrente)
-                    current_year = str(today.year)
-                    if year == current_year:
-                        if project not in wip_totals:
-                            wip_totals[project] = 0
-                        wip_totals[project] += hours
-        
-        # Calcola il totale ore dell'anno corrente per le percentuali WIP
-        current_year = str(today.year)
-        total_wip_hours = sum(wip_totals.values()) if wip_totals else 1
-        
-        # Scrivi il file TIME_INDEX_FILE
-        with open(TIME_INDEX_FILE, "w", encoding="utf-8") as f:
-            f.write("# Time Index\n\n")
-            
-            # Sezione WIP (anno corrente)
-            if wip_totals:
-                f.write("## Total Time for projects\n\n")
-                # Ordina i progetti per ore decrescenti
-                sorted_wip = sorted(wip_totals.items(), key=lambda x: x[1], reverse=True)
-                
-                # Calcola la lunghezza massima del nome del progetto per l'allineamento
-                max_project_len = max(len(project) for project, _ in sorted_wip) if sorted_wip else 0
-                
-                for project, hours in sorted_wip:
-                    percentage = (hours / total_wip_hours * 100) if total_wip_hours > 0 else 0
-                    f.write(f"- {project:<{max_project_len}}: {hours:>3} ore | {percentage:>5.1f}%\n")
-                f.write("\n")
-            
-            # Sezione per ogni anno (ordinati decrescenti)
-            for year in sorted(data_by_year_month.keys(), reverse=True):
-                f.write(f"## {year}\n\n")
-                
-                months_dict = data_by_year_month[year]
-                
-                # Calcola il totale ore dell'anno per le percentuali
-                total_year_hours = sum(year_totals[year].values()) if year in year_totals else 1
-                
-                # Scrivi il resoconto annuale
-                # f.write(f"### Totale {year}\n\n")
-                # sorted_year_projects = sorted(year_totals[year].items(), key=lambda x: x[1], reverse=True)
-                # for project, hours in sorted_year_projects:
-                #     percentage = (hours / total_year_hours * 100) if total_year_hours > 0 else 0
-                #     f.write(f"- {project}: {hours} ore | {percentage:.1f}%\n")
-                # f.write("\n")
-                
-                # Ordina i mesi decrescenti
-                for month in sorted(months_dict.keys(), reverse=True):
-                    # Converti il numero del mese in nome (01 -> gennaio, etc.)
-                    month_names = {
-                        "01": "Gen", "02": "Feb", "03": "Mar", "04": "Apr",
-                        "05": "Mag", "06": "Giu", "07": "Lug", "08": "Ago",
-                        "09": "Set", "10": "Ott", "11": "Nov", "12": "Dic"
-                    }
-                    month_name = month_names.get(month, month)
-                    
-                    f.write(f"### {month_name}\n\n")
-                    
-                    # Calcola il totale ore del mese
-                    month_data = months_dict[month]
-                    total_month_hours = sum(month_data.values())
-                    
-                    # Calcola la lunghezza massima del nome del progetto
-                    max_project_len = max(len(project) for project, _ in month_data.items()) if month_data else 0
-                    
-                    # Ordina i progetti per ore decrescenti
-                    sorted_projects = sorted(month_data.items(), key=lambda x: x[1], reverse=True)
-                    for project, hours in sorted_projects:
-                        percentage = (hours / total_month_hours * 100) if total_month_hours > 0 else 0
-                        f.write(f"- {project:<{max_project_len}}: {hours:>3} ore | {percentage:>5.1f}%\n")
-                    f.write("\n")
-        
+        WriteIndexFile(TIME_INDEX_FILE, RenderTimeIndex(model))
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        WriteIndexFile(TIME_LEDGER_FILE, RenderTimeLedger(model))
         # print(f"File {TIME_INDEX_FILE} aggiornato con successo!")
         
     except Exception as e:
         print(f"Errore durante l'aggiornamento del time index: {e}")
 
-def UpdateTagsIndex(tags_data):
+def TagsData(model):
+    """
+    Raggruppa i path relativi delle note del modello per tag.
+    """
+    tags_data = {}
+    for note_date in sorted(model["notes"]):
+        note = model["notes"][note_date]
+        for tag in note["tags"]:
+            tags_data.setdefault(tag, []).append(note["rel"])
+    return tags_data
+
+def RenderTagsIndex(model):
+    """
+    Genera il contenuto di TAGS_INDEX_FILE con tutti i tag presenti nel vault e le note associate.
+    Nei layout a pagine genera solo l'elenco dei tag, nel layout diviso per anno solo il riepilogo
+    con i link agli indici di ogni anno.
+    """
+    layout = TagsLayout()
+    if layout != "single":
+        return RenderTagDirectory(model, layout)
+    if ShardedIndexes():
+        return RenderTagsSummary(model)
+    tags_data = TagsData(model)
+
+    tags_file = io.StringIO()
+    tags_file.write("# Indice TAGS\n\n")
+    for tag, notes in sorted(tags_data.items()):
+        tags_file.write(f"## {tag}\n\n")
+        for note_path in sorted(notes):
+            tags_file.write(f"- [{os.path.basename(note_path)}]({note_path})\n")
+        tags_file.write("\n")
+    return tags_file.getvalue()
+
+def UpdateTagsIndex(model):
     """
     Aggiorna il file TAGS_INDEX_FILE con tutti i tag presenti nel vault e le note associate.
     """
-    
-    # Controlla se TAGS_INDEX_FILE esiste, altrimenti crealo
+    # Controlla se TAGS_INDEX_FILE esiste, altrimenti viene creato
     if not os.path.exists(TAGS_INDEX_FILE):
-        with open(TAGS_INDEX_FILE, "w", encoding="utf-8") as tags_file:
-            tags_file.write("# Indice TAGS\n\n")
         print(f"File '{os.path.relpath(TAGS_INDEX_FILE, VAULT_DIR)}' creato con successo.")
 
     try:
-        with open(TAGS_INDEX_FILE, "w", encoding="utf-8") as tags_file:
-            tags_file.write("# Indice TAGS\n\n")
-            for tag, notes in sorted(tags_data.items()):
-                tags_file.write(f"## {tag}\n\n")
-                for note_path in sorted(notes):
-                    tags_file.write(f"- [{os.path.basename(note_path)}]({note_path})\n")
-                tags_file.write("\n")
+        WriteIndexFile(TAGS_INDEX_FILE, RenderTagsIndex(model))
         #print(f"Indice dei tag aggiornato con successo in '{os.path.relpath(TAGS_INDEX_FILE, VAULT_DIR)}'.")
     except Exception as e:
         print(f"Errore durante l'aggiornamento del file dei tag: {e}")
 
-def UpdateCalendarIndex(notes_by_year):
+def ShardedIndexes():
     """
-    Aggiorna il file CALENDAR_INDEX_FILE con i calendari annuali.
-    I mesi sono ordinati in modo decrescente (da dicembre a gennaio) per avere l'ultimo mese sempre in alto.
+    Ritorna True se il vault usa il layout degli indici diviso per anno (scelto con --index-layout).
     """
+    return VAULT_CONFIG["index_layout"] == "year"
 
-    # Se non esiste, crealo
-    if not os.path.exists(CALE_INDEX_FILE):
-        with open(CALE_INDEX_FILE, "w", encoding="utf-8") as f:
-            f.write("# Calendar Index\n\n")
-        print(f"File '{os.path.relpath(CALE_INDEX_FILE, VAULT_DIR)}' creato con successo.")
-
-    try:
-        import calendar
-        from datetime import datetime
+def YearIndexFile(file_format, year):
+    """
+    Path di un indice di un solo anno (es: YYYY/indexes/main-YYYY.md).
+    """
+    return Path(os.path.join(VAULT_DIR, str(year), D_INDEXES, file_format.format(year=year)))
 
-        with open(CALE_INDEX_FILE, "w", encoding="utf-8") as f:
-            f.write("# Calendar Index\n\n")
+def YearIndexLink(file_format, year):
+    """
+    Link relativo alla root del vault verso l'indice di un anno.
+    """
+    return f"{year}/{D_INDEXES}/{file_format.format(year=year)}"
 
-            # Anni in ordine decrescente (imita ai due anni più recenti)
-            sorted_years = sorted(notes_by_year.keys(), reverse=True)
-            recent_years = set(sorted_years[:2])
-            for year, notes in sorted(notes_by_year.items(), reverse=True):
-                if year not in recent_years:
-                    continue
-                
-                f.write(f"# {year}\n\n")
-
-                # Estrai tutte le date valide dall'anno
-                dates = []
-                for note_name, note_path in notes:
-                    try:
-                        d = datetime.strptime(note_name.replace(".md", ""), "%Y-%m-%d")
-                        dates.append((d, note_path))
-                    except ValueError:
-                        continue
+def NotesByDateYear(model):
+    """
+    Raggruppa le note del modello per anno della data, in ordine di data.
+    """
+    notes_by_year = {}
+    for note_date in sorted(model["notes"]):
+        notes_by_year.setdefault(note_date.year, []).append(model["notes"][note_date])
+    return notes_by_year
 
-                if not dates:
-                    continue
+def LedgerYearRange(ledger, year):
+    """
+    Ritorna le righe [start, end) del registro delle ore che appartengono a un anno.
+    """
+    days = ledger["days"]
+    start = bisect.bisect_left(days, date(year, 1, 1).toordinal())
+    return start, bisect.bisect_left(days, date(year + 1, 1, 1).toordinal(), start)
 
-                last_month = max(d.month for d, _ in dates)
-                cal = calendar.Calendar(firstweekday=0)  # Lunedì
+def RenderYearMainIndex(year, notes):
+    """
+    Genera l'indice delle note di un anno, dalla più recente, con link relativi a YYYY/indexes/.
+    """
+    shard_dir = f"{year}/{D_INDEXES}"
+    f = io.StringIO()
+    f.write(f"# Indice {year}\n\n")
+    for note in reversed(notes):
+        f.write(f"- [{note['name'].split('.')[0][5:]}]({posixpath.relpath(note['rel'], shard_dir)})\n")
+    return f.getvalue()
 
-                # ---- Indice dei mesi ----
-                f.write("### Indice dei mesi\n")
-                for month in range(last_month, 0, -1):
-                    mese_nome = calendar.month_name[month].capitalize()
-                    # Link Markdown al titolo del mese
-                    link = f"#{mese_nome.lower()}-{year}"
-                    f.write(f"- [{mese_nome}](#{mese_nome.lower()}-{year})\n")
-                f.write("\n")
-                
-                # Ciclo mesi in ordine decrescente
-                for month in range(last_month, 0, -1):
-                    mese_nome = calendar.month_name[month].capitalize()
-                    f.write(f"## {mese_nome} {year}\n\n")
-                    f.write("| Lu | Ma | Me | Gi | Ve | Sa | Do |\n")
-                    f.write("|----|----|----|----|----|----|----|\n")
-
-                    month_days = cal.monthdayscalendar(int(year), month)
-
-                    for week in month_days:
-                        row = []
-                        for day in week:
-                            if day == 0:
-                                row.append(" ")
-                            else:
-                                note_file = f"{year}-{month:02d}-{day:02d}.md"
-                                # Verifica se la nota c’è in notes_by_year
-                                note_path = None
-                                for d, relpath in dates:
-                                    if d.year == int(year) and d.month == month and d.day == day:
-                                        note_path = relpath
-                                        break
-                                if note_path:
-                                    row.append(f"[{day}]({note_path})")
-                                else:
-                                    row.append(str(day))
-                        f.write("| " + " | ".join(row) + " |\n")
-                    f.write("\n")  # Riga vuota tra i mesi
+def RenderYearTagsIndex(year, notes):
+    """
+    Genera l'indice dei tag delle note di un anno, con link relativi a YYYY/indexes/.
+    """
+    shard_dir = f"{year}/{D_INDEXES}"
+    tags_data = {}
+    for note in notes:
+        for tag in note["tags"]:
+            tags_data.setdefault(tag, []).append(note["rel"])
 
-    except Exception as e:
-        print(f"Errore durante l'aggiornamento del calendario: {e}")
+    f = io.StringIO()
+    f.write(f"# Indice TAGS {year}\n\n")
+    for tag, note_paths in sorted(tags_data.items()):
+        f.write(f"## {tag}\n\n")
+        for note_path in sorted(note_paths):
+            f.write(f"- [{posixpath.basename(note_path)}]({posixpath.relpath(note_path, shard_dir)})\n")
+        f.write("\n")
+    return f.getvalue()
 
-def UpdateStatistics():
+def RenderYearTimeIndex(ledger, year):
     """
-    Aggiorna il file STATISTICS_FILE con tutte le statistiche del vault.
-    Include:
-    - Numero di note per anno
-    - Media parole per nota (Spostato prima delle mensili)
-    - Numero di parole per mese negli ultimi due anni
+    Genera l'indice delle ore di un anno: il totale per progetto e poi i mesi dal più recente.
     """
-    # Dizionari per raccogliere dati
-    notes_by_year = {}
-    words_by_year_month = {}
-    all_dates = []
-    
-    # Raccogli tutti i conteggi di parole per il calcolo della media
-    all_word_counts = []
+    start, end = LedgerYearRange(ledger, year)
+    totals = GroupTime(ledger, lambda o: year, start, end).get(year, {})
+    by_month = GroupTime(ledger, lambda o: date.fromordinal(o).strftime("%m"), start, end)
 
-    # Scansiona il VAULT_DIR
-    for root, dirs, files in os.walk(VAULT_DIR):
-        if D_WEEKS in root or D_ASSETS in root:
-            continue
+    f = io.StringIO()
+    f.write(f"# Time Index {year}\n\n")
+    if totals:
+        f.write("## Total Time for projects\n\n")
+        f.write(RenderProjectHours(SortedProjectHours(ledger, totals)))
+        f.write("\n")
+    for month in sorted(by_month, reverse=True):
+        f.write(f"### {MONTH_SHORT_NAMES[month]}\n\n")
+        f.write(RenderProjectHours(SortedProjectHours(ledger, by_month[month])))
+        f.write("\n")
+    return f.getvalue()
 
-        for file in files:
-            if file.endswith(".md") and not file.startswith("weekly"):
-                file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(file_path, VAULT_DIR).replace("\\", "/")
-                
-                # Estrai anno e mese
-                match = re.match(r"(\d{4})-(\d{2})-(\d{2})\.md", file)
-                if match:
-                    year, month, day = match.groups()
-                    year = int(year)
-                    month = int(month)
-                    day = int(day)
-
-                    # Aggiungi nota all'anno
-                    if year not in notes_by_year:
-                        notes_by_year[year] = []
-                    notes_by_year[year].append(relative_path)
-
-                    # Conta parole
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        content = f.read()
-                        word_count = len(content.split())
-                        
-                    all_word_counts.append(word_count)
-
-                    if year not in words_by_year_month:
-                        words_by_year_month[year] = {}
-                    if month not in words_by_year_month[year]:
-                        words_by_year_month[year][month] = 0
-                    words_by_year_month[year][month] += word_count
-
-                    # Memorizza date per streak
-                    all_dates.append(datetime(year, month, int(day)))
-
-    # ... Logica streak omessa per brevità ...
-    if all_dates:
-        last_date = all_dates[-1]
-        streak_now = 1
-        for d in reversed(all_dates[:-1]):
-            if (last_date - d).days == 1:
-                streak_now += 1
-                last_date = d
-            else:
-                break
+def RenderMainSummary(model):
+    """
+    Genera MAIN_INDEX_FILE nel layout diviso per anno: un link all'indice di ogni anno con il numero di note.
+    """
+    f = io.StringIO()
+    f.write(SHARDED_MAIN_TITLE + "\n")
+    for year, notes in sorted(NotesByDateYear(model).items(), reverse=True):
+        f.write(f"- [{year}]({YearIndexLink(F_YEAR_MAIN_INDEX, year)}): {len(notes)} note\n")
+    return f.getvalue()
 
+def RenderTagsSummary(model):
+    """
+    Genera TAGS_INDEX_FILE nel layout diviso per anno: per ogni tag gli anni in cui compare,
+    con il link all'indice dei tag dell'anno e il numero di note.
+    """
+    counts = {}
+    for note_date in sorted(model["notes"]):
+        for tag in model["notes"][note_date]["tags"]:
+            years = counts.setdefault(tag, {})
+            years[note_date.year] = years.get(note_date.year, 0) + 1
 
-    # Calcola media parole per nota
-    total_notes = sum(len(notes_by_year[y]) for y in notes_by_year)
-    total_words = sum(all_word_counts)
-    avg_words_per_note = total_words // total_notes if total_notes else 0
-    
-    # Determina gli anni da includere nelle statistiche mensili (massimo gli ultimi due)
-    all_years = sorted(notes_by_year.keys(), reverse=True)
-    years_for_monthly_stats = all_years[:2]
+    f = io.StringIO()
+    f.write("# Indice TAGS per anno\n\n")
+    for tag, years in sorted(counts.items()):
+        f.write(f"## {tag}\n\n")
+        for year, count in sorted(years.items(), reverse=True):
+            f.write(f"- [{year}]({YearIndexLink(F_YEAR_TAGS_INDEX, year)}): {count} note\n")
+        f.write("\n")
+    return f.getvalue()
 
+def RenderTimeSummary(model):
+    """
+    Genera TIME_INDEX_FILE nel layout diviso per anno: il totale per progetto dell'anno corrente (WIP)
+    e il link all'indice delle ore di ogni anno con le ore totali.
+    """
+    ledger = TimeLedger(model)
+    by_year = GroupTime(ledger, lambda o: date.fromordinal(o).year)
 
-    # Scrive statistics.md
-    try:
-        with open(STAT_INFO_FILE, "w", encoding="utf-8") as f:
-            f.write("# Statistiche complessive\n\n")
+    f = io.StringIO()
+    f.write("# Time Index per anno\n\n")
+    if by_year.get(today.year):
+        f.write("## Total Time for projects\n\n")
+        f.write(RenderProjectHours(SortedProjectHours(ledger, by_year[today.year])))
+        f.write("\n")
+    if by_year:
+        f.write("## Anni\n\n")
+        for year in sorted(by_year, reverse=True):
+            f.write(f"- [{year}]({YearIndexLink(F_YEAR_TIME_INDEX, year)}): {sum(by_year[year].values())} ore\n")
+        f.write("\n")
+    return f.getvalue()
 
-            # Note per anno (Tutti gli anni)
-            f.write("## Note per anno\n")
-            # Trova il conteggio massimo di note per scalare correttamente la barra (nuova logica mantenuta)
-            max_notes_count = max(len(notes_by_year[y]) for y in notes_by_year) if notes_by_year else 1
-            
-            for year in all_years:
-                count = len(notes_by_year[year])
-                bar_length = 50 
-                bar = "█" * (count * bar_length // max_notes_count)
-                f.write(f"{year}: {bar} {count} note\n")
-            f.write("\n")
-            
-            # Media parole per nota (Prima delle mensili)
-            f.write("## Media parole per nota\n")
-            f.write(f"Media generale: {avg_words_per_note} parole per nota\n\n")
+def UpdateYearIndexes(model, manifest):
+    """
+    Aggiorna gli indici di ogni anno (YYYY/indexes/main-, tags- e time-YYYY.md) nel layout diviso per anno.
+    Viene sempre rigenerato l'anno corrente; gli anni passati solo se un file manca o se le loro note
+    sono cambiate, confrontando l'impronta (path e hash delle note) con quella salvata nel manifest.
+    Con il layout unico non fa nulla.
+    """
+    if not ShardedIndexes():
+        return
+    saved = manifest.get("shards", {})
+    current = {}
+    ledger = None
+    for year, notes in sorted(NotesByDateYear(model).items()):
+        signature = hashlib.sha1("".join(f"{note['rel']}={note['hash']};" for note in notes).encode("utf-8")).hexdigest()
+        current[str(year)] = signature
+        files = [YearIndexFile(file_format, year) for file_format in (F_YEAR_MAIN_INDEX, F_YEAR_TAGS_INDEX, F_YEAR_TIME_INDEX)]
+        if year != today.year and saved.get(str(year)) == signature and all(os.path.exists(f) for f in files):
+            continue
+        if ledger is None:
+            ledger = TimeLedger(model)
+        os.makedirs(os.path.dirname(files[0]), exist_ok=True)
+        WriteIndexFile(files[0], RenderYearMainIndex(year, notes))
+        WriteIndexFile(files[1], RenderYearTagsIndex(year, notes))
+        WriteIndexFile(files[2], RenderYearTimeIndex(ledger, year))
 
+    if current != saved:
+        manifest["shards"] = current
+        manifest["dirty"] = True
 
-            # Statistiche mensili ultimi due anni con indentazione originale
-            for current_year in years_for_monthly_stats:
-                f.write(f"## Statistiche mensili {current_year}\n")
-                
-                for month in range(1, 13):
-                    words = words_by_year_month.get(current_year, {}).get(month, 0)
-                    # Usa la scala fissa come richiesto: 1 blocco ogni 1000 parole
-                    bar = "█" * (words // 1000 if words else 0) 
-                    
-                    # Conta le note di quell'anno e mese specifico
-                    note_count = sum(1 for n in notes_by_year.get(current_year, []) if f"{current_year}-{month:02}" in n)
-                    
-                    month_name = datetime(current_year, month, 1).strftime("%B") 
-                    
-                    # Usa la formattazione originale per l'indentazione
-                    f.write(f"{month_name:<9} | {bar:<10} {words} parole, {note_count} note\n")
+def TagsLayout():
+    """
+    Ritorna il layout di TAGS_INDEX_FILE scelto con --tags-layout: "single" (tutti i tag e le note
+    in un file), "tag" (una pagina per tag) o "letter" (una pagina per iniziale).
+    """
+    return VAULT_CONFIG["tags_layout"]
+
+def TagPageName(tag, layout):
+    """
+    Nome del file della pagina di un tag in TAG_PAGES_DIR: l'iniziale per il layout "letter",
+    altrimenti il tag in minuscolo con i caratteri non validi sostituiti da "_"
+    (e un suffisso di hash se il nome è cambiato, cosí due tag non finiscono nella stessa pagina).
+    """
+    if layout == "letter":
+        initial = tag[:1].lower()
+        return f"{initial if initial.isalnum() else '_'}.md"
+    slug = re.sub(r"[^\w-]", "_", tag).lower()
+    if slug != tag:
+        slug += "-" + hashlib.sha1(tag.encode("utf-8")).hexdigest()[:6]
+    return f"{slug}.md"
+
+def TagSortKey(tag, layout):
+    """
+    Chiave di ordinamento dei tag nei layout a pagine: per pagina (cosí ogni iniziale compare
+    una sola volta anche con tag maiuscoli e minuscoli) e poi alfabetico senza distinguere le maiuscole.
+    """
+    return (TagPageName(tag, layout) if layout == "letter" else "", tag.lower(), tag)
+
+def TagPageLink(page):
+    """
+    Link relativo alla root del vault verso la pagina di un tag.
+    """
+    return f"{D_INDEXES}/{D_TAG_PAGES}/{page}"
+
+def RenderTagDirectory(model, layout):
+    """
+    Genera TAGS_INDEX_FILE nei layout a pagine: l'elenco dei tag con il numero di note
+    e il link alla loro pagina (per il layout "letter" raggruppati per iniziale).
+    """
+    tags_data = TagsData(model)
+
+    f = io.StringIO()
+    f.write(TAG_PAGES_TITLES[layout] + "\n")
+    page = None
+    for tag, notes in sorted(tags_data.items(), key=lambda item: TagSortKey(item[0], layout)):
+        tag_page = TagPageName(tag, layout)
+        if layout == "letter" and tag_page != page:
+            if page is not None:
                 f.write("\n")
-                
+            page = tag_page
+            f.write(f"## {page[:-3]}\n\n")
+        f.write(f"- [{tag}]({TagPageLink(tag_page)}) ({len(notes)})\n")
+    return f.getvalue()
+
+def RenderTagPage(tags, tags_data, layout):
+    """
+    Genera la pagina di un tag (o di tutti i tag di un'iniziale) con le sue note,
+    con link relativi a TAG_PAGES_DIR.
+    """
+    f = io.StringIO()
+    if layout == "letter":
+        f.write(f"# Tag {TagPageName(tags[0], layout)[:-3]}\n\n")
+    for tag in tags:
+        f.write(f"## {tag}\n\n" if layout == "letter" else f"# {tag}\n\n")
+        for note_path in sorted(tags_data[tag]):
+            f.write(f"- [{posixpath.basename(note_path)}](../../{note_path})\n")
+        f.write("\n")
+    return f.getvalue()
+
+def UpdateTagPages(model, manifest):
+    """
+    Aggiorna le pagine dei tag in TAG_PAGES_DIR nei layout a pagine ("tag" o "letter").
+    Una pagina viene riscritta solo se l'insieme delle note dei suoi tag è cambiato rispetto
+    all'impronta salvata nel manifest (o se il file manca); le pagine dei tag spariti vengono eliminate.
+    Con il layout unico non fa nulla.
+    """
+    layout = TagsLayout()
+    if layout == "single":
+        return
+    tags_data = TagsData(model)
+    pages = {}
+    for tag in sorted(tags_data, key=lambda tag: TagSortKey(tag, layout)):
+        pages.setdefault(TagPageName(tag, layout), []).append(tag)
+
+    saved = manifest.get("tag_pages", {})
+    current = {}
+    for page, tags in pages.items():
+        signature = "\n".join(f"{tag}:{','.join(sorted(tags_data[tag]))}" for tag in tags)
+        current[page] = hashlib.sha1(signature.encode("utf-8")).hexdigest()
+        file_path = Path(TAG_PAGES_DIR, page)
+        if saved.get(page) == current[page] and os.path.exists(file_path):
+            continue
+        os.makedirs(TAG_PAGES_DIR, exist_ok=True)
+        WriteIndexFile(file_path, RenderTagPage(tags, tags_data, layout))
+
+    for page in saved:
+        if page not in current and os.path.exists(Path(TAG_PAGES_DIR, page)):
+            os.remove(Path(TAG_PAGES_DIR, page))
+    if current != saved:
+        manifest["tag_pages"] = current
+        manifest["dirty"] = True
+
+def SetTagsLayout(layout):
+    """
+    Sceglie il layout di TAGS_INDEX_FILE e rigenera gli indici:
+    - single: un unico file con tutti i tag e le loro note (default)
+    - tag: un elenco dei tag con il numero di note e una pagina per tag in indexes/tags/
+    - letter: come tag, ma con una pagina per iniziale
+    """
+    if not os.path.exists(VAULT_DIR):
+        print(f"Errore: La directory '{VAULT_DIR}' non esiste.")
+        return
+    manifest = LoadManifest()
+    if manifest.pop("tag_pages", None) is not None:
+        manifest["dirty"] = True
+        SaveManifest(manifest)
+    if os.path.exists(TAG_PAGES_DIR):
+        shutil.rmtree(TAG_PAGES_DIR)
+        if not os.listdir(os.path.dirname(TAG_PAGES_DIR)):
+            os.rmdir(os.path.dirname(TAG_PAGES_DIR))
+    SaveVaultConfig(tags_layout=layout)
+    UpdateIndex()
+
+def SetIndexLayout(layout):
+    """
+    Sceglie il layout di main-, tags- e time-index.md e rigenera gli indici:
+    - single: un unico file con tutta la storia del vault (default)
+    - year: un indice per anno in YYYY/indexes/ e in cima al vault solo un riepilogo con i link agli anni
+    """
+    if not os.path.exists(VAULT_DIR):
+        print(f"Errore: La directory '{VAULT_DIR}' non esiste.")
+        return
+    manifest = LoadManifest()
+    if manifest.pop("shards", None) is not None:
+        manifest["dirty"] = True
+        SaveManifest(manifest)
+    if layout == "single":
+        for year_dir in YearDirs():
+            year = os.path.basename(year_dir)
+            for file_format in (F_YEAR_MAIN_INDEX, F_YEAR_TAGS_INDEX, F_YEAR_TIME_INDEX):
+                if os.path.exists(YearIndexFile(file_format, year)):
+                    os.remove(YearIndexFile(file_format, year))
+            shard_dir = os.path.join(year_dir, D_INDEXES)
+            if os.path.isdir(shard_dir) and not os.listdir(shard_dir):
+                os.rmdir(shard_dir)
+    SaveVaultConfig(index_layout=layout)
+    UpdateIndex()
+
+def DayPresence(model):
+    """
+    Costruisce per ogni anno una bitmap compatta dei giorni che hanno una nota:
+    un bytearray di 46 byte (366 bit) in cui il bit i indica il giorno dell'anno i + 1.
+    """
+    presence = {}
+    for note_date in model["notes"]:
+        bits = presence.setdefault(note_date.year, bytearray(46))
+        day_index = note_date.timetuple().tm_yday - 1
+        bits[day_index >> 3] |= 1 << (day_index & 7)
+    return presence
+
+def HasDay(bits, day_index):
+    """
+    Ritorna True se il giorno dell'anno day_index (da 0) è presente nella bitmap.
+    """
+    return bool(bits[day_index >> 3] >> (day_index & 7) & 1)
+
+def RenderYearCalendar(model, year, bits, base_dir):
+    """
+    Genera i calendari mensili di un anno a partire dalla sua bitmap dei giorni, in tempo lineare.
+    I link alle note sono relativi a base_dir, la cartella del file che conterrá il calendario.
+    """
+    import calendar
+
+    f = io.StringIO()
+    last_day = max(i for i in range(366) if HasDay(bits, i))
+    last_month = (date(year, 1, 1) + timedelta(days=last_day)).month
+    cal = calendar.Calendar(firstweekday=0)  # Lunedì
+    year_start = date(year, 1, 1).toordinal()
+
+    # ---- Indice dei mesi ----
+    f.write("### Indice dei mesi\n")
+    for month in range(last_month, 0, -1):
+        mese_nome = calendar.month_name[month].capitalize()
+        # Link Markdown al titolo del mese
+        f.write(f"- [{mese_nome}](#{mese_nome.lower()}-{year})\n")
+    f.write("\n")
+    
+    # Ciclo mesi in ordine decrescente
+    for month in range(last_month, 0, -1):
+        mese_nome = calendar.month_name[month].capitalize()
+        f.write(f"## {mese_nome} {year}\n\n")
+        f.write("| Lu | Ma | Me | Gi | Ve | Sa | Do |\n")
+        f.write("|----|----|----|----|----|----|----|\n")
+
+        month_start = date(year, month, 1).toordinal() - year_start
+        for week in cal.monthdayscalendar(year, month):
+            row = []
+            for day in week:
+                if day == 0:
+                    row.append(" ")
+                elif HasDay(bits, month_start + day - 1):
+                    note = model["notes"][date(year, month, day)]
+                    note_path = os.path.relpath(note["path"], base_dir).replace("\\", "/")
+                    row.append(f"[{day}]({note_path})")
+                else:
+                    row.append(str(day))
+            f.write("| " + " | ".join(row) + " |\n")
+        f.write("\n")  # Riga vuota tra i mesi
+    return f.getvalue()
+
+def YearCalendarFile(year):
+    """
+    Path del calendario completo di un anno (YYYY/indexes/calendar-YYYY.md).
+    """
+    return Path(os.path.join(VAULT_DIR, str(year), D_INDEXES, F_YEAR_CALENDAR.format(year=year)))
+
+def RenderCalendarIndex(model):
+    """
+    Genera il contenuto di CALENDAR_INDEX_FILE: i link ai calendari di tutti gli anni
+    e i calendari dei due anni più recenti.
+    I mesi sono ordinati in modo decrescente (da dicembre a gennaio) per avere l'ultimo mese sempre in alto.
+    """
+    presence = DayPresence(model)
+
+    f = io.StringIO()
+    f.write("# Calendar Index\n\n")
+
+    # Link ai calendari completi di ogni anno
+    if presence:
+        f.write("### Calendari per anno\n")
+        for year in sorted(presence, reverse=True):
+            f.write(f"- [{year}]({os.path.relpath(YearCalendarFile(year), VAULT_DIR).replace(os.sep, '/')})\n")
+        f.write("\n")
+
+    # Anni in ordine decrescente (limita ai due anni più recenti)
+    for year in sorted(presence, reverse=True)[:2]:
+        f.write(f"# {year}\n\n")
+        f.write(RenderYearCalendar(model, year, presence[year], VAULT_DIR))
+    return f.getvalue()
+
+def UpdateYearCalendars(model, manifest):
+    """
+    Aggiorna i calendari completi per anno (YYYY/indexes/calendar-YYYY.md).
+    Viene sempre rigenerato l'anno corrente; gli anni passati solo se il file manca
+    o se la loro bitmap dei giorni è cambiata rispetto a quella salvata nel manifest.
+    """
+    presence = DayPresence(model)
+    saved = manifest.get("presence", {})
+    for year, bits in sorted(presence.items()):
+        file_path = YearCalendarFile(year)
+        if year != today.year and saved.get(str(year)) == bits.hex() and os.path.exists(file_path):
+            continue
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        content = f"# Calendario {year}\n\n" + RenderYearCalendar(model, year, bits, os.path.dirname(file_path))
+        WriteIndexFile(file_path, content)
+
+    current = {str(year): bits.hex() for year, bits in presence.items()}
+    if current != saved:
+        manifest["presence"] = current
+        manifest["dirty"] = True
+
+def UpdateCalendarIndex(model, manifest=None):
+    """
+    Aggiorna il file CALENDAR_INDEX_FILE e i calendari completi di ogni anno.
+    """
+    # Se non esiste, viene creato
+    if not os.path.exists(CALE_INDEX_FILE):
+        print(f"File '{os.path.relpath(CALE_INDEX_FILE, VAULT_DIR)}' creato con successo.")
+
+    try:
+        WriteIndexFile(CALE_INDEX_FILE, RenderCalendarIndex(model))
+        if manifest is not None:
+            UpdateYearCalendars(model, manifest)
+            SaveManifest(manifest)
+    except Exception as e:
+        print(f"Errore durante l'aggiornamento del calendario: {e}")
+
+def StatsArrays(model):
+    """
+    Costruisce gli array giornalieri usati dalle statistiche, indicizzati per ordinale del giorno
+    (indice = date.toordinal() - base), dalla prima nota fino a oggi (o all'ultima nota se è futura):
+    - words: array di interi con le parole della nota del giorno (0 se manca)
+    - present: bytearray con 1 nei giorni che hanno una nota
+    Tutti i conteggi successivi sono somme e count() su slice di questi array.
+    """
+    if not model["notes"]:
+        return {"base": today.toordinal(), "words": array("L"), "present": bytearray()}
+    base = min(model["notes"]).toordinal()
+    span = max(max(model["notes"]).toordinal(), today.toordinal()) - base + 1
+    words = array("L", [0]) * span
+    present = bytearray(span)
+    for note_date, note in model["notes"].items():
+        i = note_date.toordinal() - base
+        words[i] = note["words"]
+        present[i] = 1
+    return {"base": base, "words": words, "present": present}
+
+def StatsSlice(stats, start, end):
+    """
+    Ritorna gli indici [a, b) degli array per l'intervallo di date [start, end), limitati agli array.
+    """
+    size = len(stats["present"])
+    a = min(max(start.toordinal() - stats["base"], 0), size)
+    b = min(max(end.toordinal() - stats["base"], 0), size)
+    return a, b
+
+def PeriodTotals(stats, start, end):
+    """
+    Ritorna (note, parole) nell'intervallo di date [start, end).
+    """
+    a, b = StatsSlice(stats, start, end)
+    return stats["present"].count(1, a, b), sum(stats["words"][a:b])
+
+def WeekdayTotals(stats, start=None, end=None):
+    """
+    Ritorna per ogni giorno della settimana (0 = lunedì) la coppia (note, parole),
+    usando slice con passo 7 degli array giornalieri.
+    """
+    a, b = StatsSlice(stats, start, end) if start else (0, len(stats["present"]))
+    first_weekday = date.fromordinal(stats["base"] + a).weekday()
+    present, words = stats["present"][a:b], stats["words"][a:b]
+    totals = []
+    for weekday in range(7):
+        offset = (weekday - first_weekday) % 7
+        totals.append((present[offset::7].count(1), sum(words[offset::7])))
+    return totals
+
+def WordPercentiles(stats, start=None, end=None, percentiles=(25, 50, 75, 90, 99)):
+    """
+    Ritorna i percentili (nearest rank) delle parole per nota nell'intervallo indicato.
+    """
+    a, b = StatsSlice(stats, start, end) if start else (0, len(stats["present"]))
+    present = stats["present"]
+    counts = sorted(stats["words"][i] for i in range(a, b) if present[i])
+    if not counts:
+        return {}
+    return {p: counts[max(0, -(-p * len(counts) // 100) - 1)] for p in percentiles}
+
+def StreakInfo(stats):
+    """
+    Calcola dagli array giornalieri le statistiche di continuitá del diario:
+    - current: giorni consecutivi con una nota fino a oggi (o fino a ieri se oggi manca)
+    - longest, longest_start, longest_end: streak piú lunga e le sue date
+    - missing: giorni senza nota tra la prima e l'ultima nota
+    - longest_gap: pausa piú lunga (in giorni) tra due note
+    """
+    present, base = stats["present"], stats["base"]
+    info = {"current": 0, "longest": 0, "longest_start": None, "longest_end": None, "missing": 0, "longest_gap": 0}
+    first, last = present.find(1), present.rfind(1)
+    if first < 0:
+        return info
+
+    # Le streak sono le sequenze di 1, le pause le sequenze di 0 tra la prima e l'ultima nota
+    days = present[first:last + 1]
+    info["longest"] = max(len(run) for run in days.split(b"\x00"))
+    start = first + days.find(b"\x01" * info["longest"])
+    info["longest_start"] = date.fromordinal(base + start)
+    info["longest_end"] = date.fromordinal(base + start + info["longest"] - 1)
+    info["missing"] = len(days) - days.count(1)
+    info["longest_gap"] = max(len(gap) for gap in days.split(b"\x01"))
+
+    end = min(today.toordinal() - base + 1, len(present))  # Indice successivo a oggi
+    if end <= 0:
+        return info  # Tutte le note sono successive a oggi: nessuna streak in corso
+    if not present[end - 1]:
+        end -= 1  # La streak puó arrivare fino a ieri
+    if 0 < end <= len(present) and present[end - 1]:
+        info["current"] = end - (present.rfind(0, 0, end) + 1)
+    return info
+
+def RenderWeekdayTable(weekdays):
+    """
+    Genera la tabella di note e media parole per giorno della settimana.
+    """
+    f = io.StringIO()
+    max_count = max(count for count, _ in weekdays) or 1
+    for weekday, (count, words) in enumerate(weekdays):
+        bar = "█" * (count * 20 // max_count)
+        avg = words // count if count else 0
+        f.write(f"{WEEKDAY_NAMES[weekday]:<9} | {bar:<20} {count} note, media {avg} parole\n")
+    return f.getvalue()
+
+def RenderPercentiles(percentiles):
+    """
+    Genera la riga con i percentili delle parole per nota.
+    """
+    return " | ".join(f"p{p}: {words}" for p, words in percentiles.items()) + "\n"
+
+def RenderMonthlyStatistics(stats, year):
+    """
+    Genera le righe mensili (parole e note) di un anno, con la scala fissa di 1 blocco ogni 1000 parole.
+    """
+    f = io.StringIO()
+    for month in range(1, 13):
+        start = date(year, month, 1)
+        end = date(year + month // 12, month % 12 + 1, 1)
+        note_count, words = PeriodTotals(stats, start, end)
+        bar = "█" * (words // 1000 if words else 0)
+        month_name = datetime(year, month, 1).strftime("%B")
+        f.write(f"{month_name:<9} | {bar:<10} {words} parole, {note_count} note\n")
+    return f.getvalue()
+
+def YearStatisticsFile(year):
+    """
+    Path delle statistiche complete di un anno (YYYY/indexes/statistics-YYYY.md).
+    """
+    return Path(os.path.join(VAULT_DIR, str(year), D_INDEXES, F_YEAR_STATISTICS.format(year=year)))
+
+def RenderYearStatistics(stats, year):
+    """
+    Genera le statistiche di un singolo anno: totali, mesi, giorni della settimana e percentili.
+    """
+    start, end = date(year, 1, 1), date(year + 1, 1, 1)
+    note_count, words = PeriodTotals(stats, start, end)
+
+    f = io.StringIO()
+    f.write(f"# Statistiche {year}\n\n")
+    f.write("## Totale\n")
+    f.write(f"{note_count} note, {words} parole (media {words // note_count if note_count else 0} parole per nota)\n\n")
+    f.write("## Statistiche mensili\n")
+    f.write(RenderMonthlyStatistics(stats, year))
+    f.write("\n## Note per giorno della settimana\n")
+    f.write(RenderWeekdayTable(WeekdayTotals(stats, start, end)))
+    percentiles = WordPercentiles(stats, start, end)
+    if percentiles:
+        f.write("\n## Parole per nota (percentili)\n")
+        f.write(RenderPercentiles(percentiles))
+    return f.getvalue()
+
+def UpdateYearStatistics(model, stats=None):
+    """
+    Aggiorna le statistiche complete di ogni anno (YYYY/indexes/statistics-YYYY.md),
+    scrivendo solo i file il cui contenuto è cambiato.
+    """
+    if stats is None:
+        stats = StatsArrays(model)
+    for year in sorted({note_date.year for note_date in model["notes"]}):
+        file_path = YearStatisticsFile(year)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        WriteIndexFile(file_path, RenderYearStatistics(stats, year))
+
+def RenderStatistics(model, stats=None):
+    """
+    Genera il contenuto di STATISTICS_FILE con tutte le statistiche del vault.
+    Include:
+    - Numero di note per anno
+    - Media parole per nota (Spostato prima delle mensili) e percentili
+    - Streak attuale e più lunga, giorni senza nota
+    - Note per giorno della settimana e medie mobili degli ultimi 7, 30 e 365 giorni
+    - Numero di parole per mese negli ultimi due anni (gli altri anni in YYYY/indexes/statistics-YYYY.md)
+    I conteggi arrivano dagli array giornalieri di StatsArrays(), senza rileggere le note.
+    """
+    if stats is None:
+        stats = StatsArrays(model)
+
+    # Note per anno come slice degli array giornalieri
+    all_years = sorted({note_date.year for note_date in model["notes"]}, reverse=True)
+    notes_by_year = {year: PeriodTotals(stats, date(year, 1, 1), date(year + 1, 1, 1))[0] for year in all_years}
+
+    # Streak calcolate sugli array dei giorni, indipendenti dall'ordine delle note
+    streak = StreakInfo(stats)
+
+    # Calcola media parole per nota
+    total_notes = stats["present"].count(1)
+    total_words = sum(stats["words"])
+    avg_words_per_note = total_words // total_notes if total_notes else 0
+
+    # Determina gli anni da includere nelle statistiche mensili (massimo gli ultimi due)
+    years_for_monthly_stats = all_years[:2]
+
+
+    f = io.StringIO()
+    f.write("# Statistiche complessive\n\n")
+
+    # Note per anno (Tutti gli anni)
+    f.write("## Note per anno\n")
+    # Trova il conteggio massimo di note per scalare correttamente la barra (nuova logica mantenuta)
+    max_notes_count = max(notes_by_year.values()) if notes_by_year else 1
+    
+    for year in all_years:
+        count = notes_by_year[year]
+        bar_length = 50 
+        bar = "█" * (count * bar_length // max_notes_count)
+        f.write(f"{year}: {bar} {count} note\n")
+    f.write("\n")
+    
+    # Media parole per nota (Prima delle mensili)
+    f.write("## Media parole per nota\n")
+    f.write(f"Media generale: {avg_words_per_note} parole per nota\n")
+    percentiles = WordPercentiles(stats)
+    if percentiles:
+        f.write(f"Percentili: {RenderPercentiles(percentiles)}")
+    f.write("\n")
+
+    # Continuitá del diario
+    f.write("## Streak\n")
+    f.write(f"Streak attuale: {streak['current']} giorni\n")
+    if streak["longest"]:
+        f.write(f"Streak più lunga: {streak['longest']} giorni (dal {streak['longest_start']} al {streak['longest_end']})\n")
+    f.write(f"Giorni senza nota: {streak['missing']} (pausa più lunga: {streak['longest_gap']} giorni)\n\n")
+
+    # Abitudini di scrittura
+    if total_notes:
+        f.write("## Note per giorno della settimana\n")
+        f.write(RenderWeekdayTable(WeekdayTotals(stats)))
+        f.write("\n")
+
+        f.write("## Medie mobili\n")
+        for days in (7, 30, 365):
+            note_count, words = PeriodTotals(stats, today - timedelta(days=days - 1), today + timedelta(days=1))
+            avg = words // note_count if note_count else 0
+            f.write(f"Ultimi {days:>3} giorni: {note_count} note ({note_count * 100 // days}% dei giorni), media {avg} parole per nota\n")
+        f.write("\n")
+
+        # Link alle statistiche complete di ogni anno
+        f.write("## Statistiche per anno\n")
+        for year in all_years:
+            f.write(f"- [{year}]({os.path.relpath(YearStatisticsFile(year), VAULT_DIR).replace(os.sep, '/')})\n")
+        f.write("\n")
+
+
+    # Statistiche mensili ultimi due anni con indentazione originale
+    for current_year in years_for_monthly_stats:
+        f.write(f"## Statistiche mensili {current_year}\n")
+        f.write(RenderMonthlyStatistics(stats, current_year))
+        f.write("\n")
+    return f.getvalue()
+
+def UpdateStatistics(model):
+    """
+    Aggiorna il file STATISTICS_FILE con tutte le statistiche del vault
+    e le statistiche complete di ogni anno.
+    """
+    # Scrive statistics.md
+    try:
+        stats = StatsArrays(model)
+        WriteIndexFile(STAT_INFO_FILE, RenderStatistics(model, stats))
+        UpdateYearStatistics(model, stats)
     except Exception as e:
         print(f"Errore durante l'aggiornamento delle statistiche: {e}")
         
 def UpdateIndex():
     """
     Aggiorna gli indici principali e dei tag leggendo le note presenti nel vault.
+    Il vault viene visitato una sola volta: lo stesso modello serve al check di consistenza,
+    a tutti gli indici e alle statistiche.
     """
+    # Controlla se VAULT_DIR esiste
+    if not os.path.exists(VAULT_DIR):
+        print(f"Errore: La directory '{VAULT_DIR}' non esiste.")
+        return
+
     # Check di consistenza del nome preventivo per evitare nomi di file manuali non corretti
-    CheckConsistency()
+    model = CheckConsistency()
 
     try:
-        # Controlla se VAULT_DIR esiste
-        if not os.path.exists(VAULT_DIR):
-            print(f"Errore: La directory '{VAULT_DIR}' non esiste.")
-            return
-
-        # Dizionario per organizzare le note per anno
-        notes_by_year = {}
-        tags_data = {}  # Dizionario per organizzare i tag e le note associate
-        prog_data = {}  # Dizionario dei progetti per organizzare il time index
-
-        # Scansiona il VAULT_DIR per trovare tutte le note
-        for root, dirs, files in os.walk(VAULT_DIR):
-            # Ignora la cartella weeks
-            if D_WEEKS in root:
-                continue
-            if D_ASSETS in root:
-                continue
-            for file in files:
-                # Escludi i file weekly
-                if file.startswith("weekly") or re.match(r"\d{4}weekly\d{2}\.md", file):
-                    continue
-                if file.endswith(".md"):  # Considera solo i file Markdown
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, VAULT_DIR).replace("\\", "/")
-
-                    # Estrai anno e nome del file
-                    parts = relative_path.split("/")
-                    if len(parts) >= 2:  # Assicura che ci sia almeno una cartella (anno)
-                        year = parts[0]
-                        note_name = parts[-1]
-                        if year not in notes_by_year:
-                            notes_by_year[year] = []
-                        notes_by_year[year].append((note_name, relative_path))
-
-                    # Leggi i tag dalla nota se contiene il blocco "## tags" e "## time"
-                    with open(file_path, "r", encoding="utf-8") as note_file:
-                        content = note_file.readlines()
-                        tags_section_found = False
-                        time_section_found = False
-                        for i, line in enumerate(content):
-                            # "## tags"
-                            if line.strip() == B_TAGS:
-                                tags_section_found = True
-                                j = i + 1
-                                while j < len(content):
-                                    if content[j].startswith("- "):  # Considera solo gli elenchi puntati
-                                        tag = content[j].strip().lstrip("- ").strip()
-                                        if tag not in tags_data:
-                                            tags_data[tag] = []
-                                        tags_data[tag].append(relative_path)
-                                    elif content[j].strip().startswith(B_SUBTITLE):  # Fine del blocco ## tags
-                                        break
-                                    j += 1
-                                continue
-                            # "## time"
-                            if line.strip() == B_TIME:
-                                time_section_found = True
-                                j = i + 1
-                                while j < len(content):
-                                    if content[j].startswith("- "):  # Considera solo gli elenchi puntati
-                                        prog = content[j].strip().lstrip("- ").strip()
-                                        if prog not in prog_data:
-                                            prog_data[prog] = {}  # Cambia da lista a dizionario
-                                        # Incrementa il conteggio per questo progetto in questa nota
-                                        if relative_path not in prog_data[prog]:
-                                            prog_data[prog][relative_path] = 0
-                                        prog_data[prog][relative_path] += 1
-                                    elif content[j].strip().startswith(B_SUBTITLE):  # Fine del blocco ## time
-                                        break
-                                    j += 1
-                                continue
+        # Leggi tag, ore e parole dalle note (dal manifest se la nota non è cambiata)
+        manifest = LoadManifest()
+        LoadNotesData(model, manifest)
 
         # Aggiorna i file degli indici
-        UpdateMainIndex(notes_by_year)
-        UpdateTagsIndex(tags_data)
-        UpdateTimeIndex(prog_data)
-        UpdateCalendarIndex(notes_by_year)
-        UpdateStatistics()
+        UpdateMainIndex(model)
+        UpdateTagsIndex(model)
+        UpdateTagCache(model)
+        UpdateAssetIndex(model)
+        UpdateTimeIndex(model)
+        UpdateYearIndexes(model, manifest)
+        UpdateTagPages(model, manifest)
+        UpdateCalendarIndex(model, manifest)
+        UpdateStatistics(model)
+
+        # Aggiorna l'indice di ricerca e il database (se attivo) per le sole note cambiate
+        UpdateSearchIndex(model)
+        UpdateDatabase(model)
 
     except Exception as e:
         print(f"Errore durante l'aggiornamento degli indici: {e}")
 
-def AddNewNote():
+def ModelFromManifest(manifest):
     """
-    Aggiunge una nuova nota al path YYYY/YYYY-MM-DD.md.
-    Se l'anno esiste ma la nota no, aggiunge la nota del giorno.
-    La nota è una copia di templates/void-notes.md con il titolo modificato.
+    Costruisce il modello del vault direttamente dal manifest, senza visitare il vault.
+    Usato dagli aggiornamenti incrementali, che si fidano della cache per le note non toccate.
     """
-    # ######################## # 
-    # Ottieni la data di oggi
-    # ######################## # 
-    today = date.today()
-    note_filename = GenerateNoteName(today)
-    year, month, day = note_filename.split(".")[0].split("-")
-    year_dir = YEAR_DIR
-    note_path = os.path.join(year_dir, note_filename)
+    model = {"notes": {}, "invalid_notes": [], "duplicate_notes": [], "invalid_assets": []}
+    for relative_path, entry in manifest["notes"].items():
+        note_date = ParseNoteDate(relative_path.split("/")[-1])
+        if note_date is None:
+            continue
+        note = MakeModelNote(relative_path, note_date)
+        note.update(entry)
+        model["notes"][note_date] = note
+    return model
 
-    # ######################## # 
-    # Path del template
-    # ######################## # 
-    template_path = os.path.join(SCRIPT_DIR, "templates", "void-notes.md")
+def InsertSortedEntry(content, heading_idx, new_line, is_before):
+    """
+    Inserisce new_line nell'elenco puntato che segue il titolo content[heading_idx].
+    L'elenco termina al titolo successivo dello stesso livello; la riga viene inserita
+    prima del primo elemento per cui is_before(elemento) è vero, altrimenti in fondo all'elenco.
+    """
+    level = content[heading_idx].split(" ", 1)[0] + " "  # "# " oppure "## "
+    j = heading_idx + 1
+    while j < len(content) and not content[j].startswith(level):
+        if content[j].startswith("- ") and is_before(content[j]):
+            content.insert(j, new_line)
+            return
+        j += 1
+    # In fondo all'elenco: prima delle righe vuote che lo separano dal titolo successivo
+    while j > heading_idx + 2 and not content[j - 1].strip():
+        j -= 1
+    content.insert(j, new_line)
 
-    # ######################## # 
-    # Controlla se la directory dell'anno esiste, altrimenti creala
-    # ######################## # 
-    if not os.path.exists(year_dir):
-        os.makedirs(year_dir)
+def InsertSortedBlock(content, level, heading, new_line, is_before):
+    """
+    Crea un nuovo blocco "titolo + elenco" prima del primo titolo dello stesso livello
+    per cui is_before(titolo) è vero, altrimenti in fondo al file.
+    """
+    block = [heading, "\n", new_line, "\n"]
+    for i, line in enumerate(content[1:], start=1):
+        if line.startswith(level) and is_before(line[len(level):].rstrip("\n")):
+            content[i:i] = block
+            return
+    if content and content[-1].strip():
+        content.append("\n")
+    content.extend(block)
 
-    # ######################## # 
-    # Controlla se la nota esiste già
-    # ######################## # 
-    if os.path.exists(note_path):
-        print(f"La nota '{os.path.relpath(note_path, VAULT_DIR)}' esiste già. Nessuna azione necessaria.")
+def PatchMainIndex(note):
+    """
+    Inserisce una sola nota in MAIN_INDEX_FILE, sotto il titolo del suo anno e in ordine decrescente.
+    Ritorna False se il file non ha la struttura attesa e va rigenerato.
+    """
+    with open(MAIN_INDEX_FILE, "r", encoding="utf-8") as index_file:
+        content = index_file.readlines()
+    if not content or content[0] != "# Indice Principale\n":
+        return False
+
+    date_part = note["name"].split(".")[0][5:]  # Prende MM-DD
+    new_line = f"- [{date_part}]({note['rel']})\n"
+    if new_line in content:
+        return True  # Nota giá presente
+
+    year_heading = f"# {note['year']}\n"
+    if year_heading in content:
+        # Note dalla più recente: prima della prima nota più vecchia
+        InsertSortedEntry(content, content.index(year_heading), new_line, lambda entry: entry[3:8] < date_part)
+    else:
+        # Anni dal più recente: prima del primo anno più vecchio
+        InsertSortedBlock(content, "# ", year_heading, new_line, lambda year: year < note["year"])
+
+    WriteIndexFile(MAIN_INDEX_FILE, "".join(content))
+    return True
+
+def PatchTagsIndex(tag, note):
+    """
+    Aggiunge una sola nota sotto un tag in TAGS_INDEX_FILE, creando il titolo del tag se manca.
+    Ritorna False se il file non ha la struttura attesa e va rigenerato.
+    """
+    with open(TAGS_INDEX_FILE, "r", encoding="utf-8") as tags_file:
+        content = tags_file.readlines()
+    if not content or content[0] != "# Indice TAGS\n":
+        return False
+
+    new_line = f"- [{note['name']}]({note['rel']})\n"
+    tag_heading = f"{B_SUBTITLE}{tag}\n"
+    if tag_heading in content:
+        start = content.index(tag_heading)
+        end = start + 1
+        while end < len(content) and not content[end].startswith(B_SUBTITLE):
+            end += 1
+        if new_line in content[start:end]:
+            return True  # Nota giá presente sotto il tag
+        # Note del tag in ordine crescente di path
+        InsertSortedEntry(content, start, new_line, lambda entry: entry.rstrip("\n")[:-1].split("](", 1)[-1] > note["rel"])
+    else:
+        # Tag in ordine alfabetico
+        InsertSortedBlock(content, B_SUBTITLE, tag_heading, new_line, lambda other: other > tag)
+
+    WriteIndexFile(TAGS_INDEX_FILE, "".join(content))
+    return True
+
+def PatchCalendarIndex(model, note_date, note):
+    """
+    Trasforma in link la cella del giorno della nota in CALE_INDEX_FILE.
+    Ritorna False se il mese o l'anno non sono ancora presenti nel calendario e va rigenerato.
+    """
+    import calendar
+
+    recent_years = sorted(DayPresence(model), reverse=True)[:2]
+    if note_date.year not in recent_years:
+        return True  # Il calendario mostra solo gli ultimi due anni
+
+    with open(CALE_INDEX_FILE, "r", encoding="utf-8") as f:
+        content = f.readlines()
+
+    mese_nome = calendar.month_name[note_date.month].capitalize()
+    month_heading = f"## {mese_nome} {note_date.year}\n"
+    if month_heading not in content:
+        return False
+
+    day = str(note_date.day)
+    i = content.index(month_heading) + 1
+    while i < len(content) and not content[i].startswith("#"):
+        line = content[i]
+        if line.startswith("| ") and line.rstrip("\n").endswith(" |"):
+            cells = line.rstrip("\n")[2:-2].split(" | ")
+            if day in cells:
+                cells[cells.index(day)] = f"[{day}]({note['rel']})"
+                content[i] = "| " + " | ".join(cells) + " |\n"
+                WriteIndexFile(CALE_INDEX_FILE, "".join(content))
+                return True
+            if f"[{day}]({note['rel']})" in cells:
+                return True  # Giorno giá collegato
+        i += 1
+    return False
+
+def PatchIndexesForNote(note_path, new_note=False):
+    """
+    Aggiorna gli indici dopo la creazione o la modifica di una sola nota, senza rileggere il vault:
+    - main-index.md: inserisce la riga della nota (solo per una nota nuova)
+    - tags-index.md: aggiunge la nota sotto i suoi tag
+    - calendar-index.md: trasforma in link la cella del giorno (solo per una nota nuova)
+    - time-index.md e statistiche: rigenerati dai dati in cache
+    Se manca la cache o un indice non ha la struttura attesa si ripiega sull'aggiornamento completo.
+    """
+    manifest = LoadManifest()
+    index_files = [MAIN_INDEX_FILE, TAGS_INDEX_FILE, CALE_INDEX_FILE]
+    if not manifest["notes"] or not all(os.path.exists(f) for f in index_files):
+        UpdateIndex()
         return
-    
-    # ######################## # 
-    # Prima di copiare il template estrae dalla nota piú recente il blocco ## next per le note che si vogliono ricordare dal giorno prima
-    # ######################## # 
-    md_files = []
-    for file in os.listdir(year_dir):
-        if file.endswith(".md") and file != note_filename:
-            if re.match(r"\d{4}-\d{2}-\d{2}\.md", file):
-                md_files.append(file)
-
-    md_files = sorted(md_files)
-    prev_note = None
-
-    # 1. Cerca nell'anno corrente
-    for f in reversed(md_files):
-        if f < note_filename:
-            prev_note = os.path.join(year_dir, f)
-            break
 
-    # 2. Se non trovata, cerca nell'anno precedente
-    if prev_note is None:
-        current_year = int(note_filename[:4])
-        prev_year_dir = os.path.join(os.path.dirname(year_dir), str(current_year - 1))
+    try:
+        relative_path = os.path.relpath(note_path, VAULT_DIR).replace("\\", "/")
+        old_tags = set(manifest["notes"].get(relative_path, {}).get("tags", []))
+        GetNoteData(manifest, note_path, relative_path)
+        SaveManifest(manifest)
 
-        if os.path.exists(prev_year_dir):
-            prev_md_files = []
-            for file in os.listdir(prev_year_dir):
-                if re.match(r"\d{4}-\d{2}-\d{2}\.md", file):
-                    prev_md_files.append(file)
+        model = ModelFromManifest(manifest)
+        note_date = datetime.strptime(os.path.basename(note_path), "%Y-%m-%d.md").date()
+        note = model["notes"][note_date]
 
-            if prev_md_files:
-                prev_md_files = sorted(prev_md_files)
-                prev_note = os.path.join(prev_year_dir, prev_md_files[-1])
-    
-    # ######################## #
-    # Estrai il contenuto della sezione B_NEXT dalla nota precedente
-    # ######################## #
+        if new_note and not PatchMainIndex(note):
+            UpdateMainIndex(model)
+        if old_tags - set(note["tags"]):
+            UpdateTagsIndex(model)  # Tag rimossi dalla nota: le righe vanno tolte, si rigenera
+        else:
+            for tag in note["tags"]:
+                if not PatchTagsIndex(tag, note):
+                    UpdateTagsIndex(model)
+                    break
+        if new_note:
+            if PatchCalendarIndex(model, note_date, note):
+                UpdateYearCalendars(model, manifest)  # Solo l'anno della nota (e quelli mancanti)
+                SaveManifest(manifest)
+            else:
+                UpdateCalendarIndex(model, manifest)
+        UpdateTagCache(model)
+        UpdateAssetIndex(model)
+        UpdateTimeIndex(model)
+        UpdateYearIndexes(model, manifest)
+        UpdateTagPages(model, manifest)
+        SaveManifest(manifest)
+        UpdateStatistics(model)
+        if os.path.exists(SEARCH_FILE):
+            UpdateSearchIndex(model)
+        UpdateDatabase(model)
+
+    except Exception as e:
+        print(f"Aggiornamento incrementale non riuscito ({e}), aggiornamento completo degli indici...")
+        UpdateIndex()
+
+def NoteDateIndex():
+    """
+    Ritorna l'indice {data: path} delle note del vault, letto dal manifest senza elencare le directory.
+    Se la cache è vuota (vault nuovo o cache eliminata) elenca una sola volta le directory YYYY.
+    """
+    index = {}
+    for relative_path in LoadManifest()["notes"]:
+        note_date = ParseNoteDate(relative_path.split("/")[-1])
+        if note_date is not None:
+            index[note_date] = os.path.join(VAULT_DIR, *relative_path.split("/"))
+    if not index:
+        for year_dir in YearDirs():
+            for file in os.listdir(year_dir):
+                note_date = ParseNoteDate(file)
+                if note_date is not None:
+                    index[note_date] = os.path.join(year_dir, file)
+    return index
+
+def PreviousNotePath(index, note_date):
+    """
+    Ritorna il path della nota più recente precedente a note_date, o None se non esiste.
+    L'indice (dal manifest) è solo un suggerimento: le note cancellate dal disco vengono saltate
+    e le directory YYYY dall'anno di note_date fino a quello del candidato vengono elencate
+    (di solito una sola), cosí una nota creata o copiata a mano dopo l'ultimo -u non viene ignorata.
+    """
+    best = None  # (data, path) della nota precedente piú recente trovata finora
+    dates = sorted(index)
+    for i in range(bisect.bisect_left(dates, note_date) - 1, -1, -1):
+        if os.path.exists(index[dates[i]]):
+            best = (dates[i], index[dates[i]])
+            break
+
+    for year_dir in reversed(YearDirs()):
+        year = int(os.path.basename(year_dir))
+        if year > note_date.year:
+            continue
+        if best and year < best[0].year:
+            break
+        with os.scandir(year_dir) as entries:
+            for entry in entries:
+                entry_date = ParseNoteDate(entry.name)
+                if entry_date and entry_date < note_date and (best is None or entry_date > best[0]) and entry.is_file():
+                    best = (entry_date, entry.path)
+    return best[1] if best else None
+
+def ReadNextBlock(note_path):
+    """
+    Estrae da una nota il contenuto della sezione B_NEXT, da riportare nella nota successiva.
+    """
     next_content = []
-    if prev_note:
-        with open(prev_note, "r", encoding="utf-8") as prev_file:
-            lines = prev_file.readlines()
-        in_next = False
-        for line in lines:
-            if line.strip() == B_NEXT:
-                in_next = True
-                continue
-            if in_next and line.strip().startswith(B_SUBTITLE) and line.strip() != B_NEXT:
-                break
-            if in_next:
-                next_content.append(line)
-        if next_content and next_content[-1].strip() != "":
-            next_content.append("\n")
+    with open(note_path, "r", encoding="utf-8") as prev_file:
+        lines = prev_file.readlines()
+        CountRead(prev_file.tell())
+    in_next = False
+    for line in lines:
+        if line.strip() == B_NEXT:
+            in_next = True
+            continue
+        if in_next and line.strip().startswith(B_SUBTITLE) and line.strip() != B_NEXT:
+            break
+        if in_next:
+            next_content.append(line)
+    if next_content and next_content[-1].strip() != "":
+        next_content.append("\n")
+    return next_content
 
-    # ######################## #
-    # Copia il template nella posizione della nuova nota
-    # ######################## #
+def ReadNoteTemplate():
+    """
+    Legge templates/void-notes.md, il modello di ogni nuova nota (una sola volta per processo).
+    """
+    template_path = os.path.join(SCRIPT_DIR, "templates", "void-notes.md")
+    if template_path not in TEMPLATES:
+        with open(template_path, "r", encoding="utf-8") as template_file:
+            TEMPLATES[template_path] = template_file.readlines()
+    return TEMPLATES[template_path]
+
+def CreateNote(note_path, note_date, template, next_content):
+    """
+    Scrive una nuova nota dal template con il titolo DD-MM-YYYY e il blocco B_NEXT
+    della nota precedente inserito prima di B_NOTE. Ritorna False in caso di errore.
+    """
     try:
-        shutil.copy(template_path, note_path)
-        with open(note_path, "r", encoding="utf-8") as file:
-            content = file.readlines()
+        os.makedirs(os.path.dirname(note_path), exist_ok=True)
 
         # Sostituisci #TITOLO con #DD-MM-YYYY
-        new_title = f"# {day}-{month}-{year}"
-        content = [line.replace("# TITOLO", new_title) for line in content]
+        new_title = f"# {note_date.day:02d}-{note_date.month:02d}-{note_date.year}"
+        content = [line.replace("# TITOLO", new_title) for line in template]
 
         # Inserisci il contenuto di B_NEXT prima di ## note
         if next_content:
@@ -779,29 +1990,103 @@ def AddNewNote():
                     content = content[:idx] + [B_NEXT + "\n"] + next_content + content[idx:]
                     break
 
-        # Scrivi il contenuto aggiornato nella nota
         with open(note_path, "w", encoding="utf-8") as file:
             file.writelines(content)
+            CountWrite(file.tell())
 
         print(f"Nota creata con successo: {os.path.relpath(note_path, VAULT_DIR)}")
+        return True
 
     except Exception as e:
         print(f"Errore durante la creazione della nota: {e}")
-    
-    # ######################## #
-    # Aggiorna istantaneamente l'indice
-    # ######################## #
-    UpdateIndex()
+        return False
 
-def InitVault():
+def AddNewNote(note_date=None):
     """
-    Inizializza la struttura del vault copiando i file e le cartelle necessarie.
+    Aggiunge una nuova nota al path YYYY/YYYY-MM-DD.md per il giorno indicato (default oggi).
+    Se l'anno esiste ma la nota no, aggiunge la nota del giorno.
+    La nota è una copia di templates/void-notes.md con il titolo modificato.
     """
-    setup_dir = Path(os.path.join(SCRIPT_DIR, "templates", "setup-vault")).resolve()
-    parent_dir = Path(os.path.join(SCRIPT_DIR, "..")).resolve()
-    vault_dir = VAULT_DIR
+    note_date = note_date or date.today()
+    note_path = os.path.join(VAULT_DIR, str(note_date.year), GenerateNoteName(note_date))
 
-    # Controlla se esiste già una cartella chiamata 'myjournal'
+    # ######################## # 
+    # Controlla se la nota esiste già
+    # ######################## # 
+    if os.path.exists(note_path):
+        print(f"La nota '{os.path.relpath(note_path, VAULT_DIR)}' esiste già. Nessuna azione necessaria.")
+        return
+
+    # ######################## # 
+    # Prima di copiare il template estrae dalla nota piú recente il blocco ## next per le note che si vogliono ricordare dal giorno prima
+    # ######################## # 
+    try:
+        template = ReadNoteTemplate()
+        prev_note = PreviousNotePath(NoteDateIndex(), note_date)
+        next_content = ReadNextBlock(prev_note) if prev_note else []
+    except Exception as e:
+        print(f"Errore durante la creazione della nota: {e}")
+        return
+
+    if not CreateNote(note_path, note_date, template, next_content):
+        return
+
+    # ######################## #
+    # Aggiorna istantaneamente l'indice (solo la nota appena creata)
+    # ######################## #
+    PatchIndexesForNote(note_path, new_note=True)
+
+def AddNewNotes(date_from, date_until=None):
+    """
+    Crea in un colpo solo le note mancanti tra date_from e date_until compresi (default oggi),
+    ad esempio dopo una vacanza. Il blocco B_NEXT viene portato avanti in memoria lungo la catena:
+    le note nuove lo copiano, una nota già esistente lo sostituisce con il proprio.
+    Gli indici vengono aggiornati una sola volta alla fine.
+    """
+    date_until = date_until or date.today()
+    if date_from > date_until:
+        print(f"Errore: la data iniziale {date_from} è successiva a quella finale {date_until}.")
+        sys.exit(1)
+
+    try:
+        template = ReadNoteTemplate()
+        index = NoteDateIndex()
+        prev_note = PreviousNotePath(index, date_from)
+        next_content = ReadNextBlock(prev_note) if prev_note else []
+    except Exception as e:
+        print(f"Errore durante la creazione delle note: {e}")
+        return
+
+    created = 0
+    note_date = date_from
+    while note_date <= date_until:
+        note_path = os.path.join(VAULT_DIR, str(note_date.year), GenerateNoteName(note_date))
+        existing_path = note_path if os.path.exists(note_path) else index.get(note_date)
+        if existing_path and os.path.exists(existing_path):
+            print(f"La nota '{os.path.relpath(existing_path, VAULT_DIR)}' esiste già.")
+            try:
+                next_content = ReadNextBlock(existing_path)
+            except Exception as e:
+                print(f"Errore durante la lettura di '{os.path.relpath(existing_path, VAULT_DIR)}': {e}")
+        elif CreateNote(note_path, note_date, template, next_content):
+            created += 1
+        else:
+            break
+        note_date += timedelta(days=1)
+
+    print(f"{created} note create tra il {date_from} e il {date_until}.")
+    if created:
+        UpdateIndex()
+
+def InitVault():
+    """
+    Inizializza la struttura del vault copiando i file e le cartelle necessarie.
+    """
+    setup_dir = Path(os.path.join(SCRIPT_DIR, "templates", "setup-vault")).resolve()
+    parent_dir = Path(VAULT_DIR).parent
+    vault_dir = VAULT_DIR
+
+    # Controlla se esiste già una cartella chiamata 'myjournal'
     if os.path.exists(vault_dir):
         # Ottieni il contenuto della cartella 'myjournal'
         vault_contents = os.listdir(vault_dir)
@@ -845,346 +2130,1699 @@ def InitVault():
 def AddTagToNoteName(tagname, notename):
     """
     Aggiunge un tag a una nota specificata.
-    Cerca la nota nel repository, se non la trova si ferma.
+    Ricava il path della nota dal suo nome, se non la trova si ferma.
     Se la trova, aggiunge il tag nella sezione ## tags. Se la sezione non esiste, la crea.
     """
-    # Cerca la nota nel repository
-    note_path = None
-    for root, dirs, files in os.walk(VAULT_DIR):
-        # Controlla se la directory corrente rappresenta un anno (YYYY)
-        relative_path = os.path.relpath(root, VAULT_DIR)
-        if not relative_path.isdigit() or len(relative_path) != 4:
-            continue  # Salta le directory che non rappresentano un anno
-
-        for file in files:
-            if file == notename:
-                note_path = os.path.join(root, file)
-                break
-        if note_path:
-            break
+    # Il path della nota si ricava dal nome (YYYY/YYYY-MM-DD.md), senza visitare il vault
+    note_path = NotePath(notename)
+
+    # Se la nota non è stata trovata, interrompi
+    if not note_path:
+        print(f"Errore: La nota '{os.path.relpath(notename, VAULT_DIR)}' non è stata trovata nel repository.")
+        sys.exit(1)
+
+    try:
+        # Leggi il contenuto della nota
+        with open(note_path, "r", encoding="utf-8") as file:
+            content = file.readlines()
+            CountRead(file.tell())
+
+        # Cerca la sezione ## tags
+        tags_section_found = False
+        for i, line in enumerate(content):
+            if line.strip() == B_TAGS:
+                tags_section_found = True
+                # Controlla se il tag è già presente
+                j = i + 1
+                while j < len(content):
+                    line = content[j].strip()  # Rimuove spazi e caratteri di nuova linea
+                    if not line:  # Salta le righe vuote
+                        j += 1
+                        continue
+                    if line.startswith("- "):  # Controlla se la riga è un elemento dell'elenco
+                        existing_tag = line.lstrip("- ").strip()
+                        if existing_tag.lower() == tagname.lower():  # Confronto case-insensitive
+                            print(f"Il tag '{tagname}' è già presente nella nota '{notename}'. Nessuna azione necessaria.")
+                            return
+                    elif line.startswith(B_SUBTITLE):  # Fine del blocco ## tags
+                        break
+                    j += 1
+                # Aggiungi il nuovo tag all'elenco puntato
+                content.insert(j, f"\n- {tagname}")
+                break
+
+        # Se la sezione ## tags non esiste, creala in fondo al file
+        if not tags_section_found:
+            content.append("\n## tags\n\n")
+            content.append(f"- {tagname}\n")
+
+        # Ottimizza gli spazi e scrivi il contenuto aggiornato nella nota con un'unica scrittura
+        with open(note_path, "w", encoding="utf-8") as file:
+            file.write(FormatNoteText("".join(content)))
+            CountWrite(file.tell())
+
+        # Aggiorna il tag-index.md con la nota appena taggata
+        PatchIndexesForNote(note_path)
+
+        print(f"Tag '{tagname}' aggiunto con successo alla nota '{notename}'.")
+
+    except Exception as e:
+        print(f"Errore durante l'aggiunta del tag: {e}")
+        
+def AddTagToTodayNote(tagname):
+    """
+    Aggiunge un tag alla nota di oggi.
+    """	
+    note_name = GenerateNoteName(date.today())
+    AddTagToNoteName(tagname, note_name)
+    
+def TagList():
+    """
+    Stampa la lista di tutti i tag presenti nel vault con il numero di note associate,
+    leggendoli dalla cache dei tag.
+    """
+    try:
+        tags = LoadTagCache()["tags"]
+
+        # Stampa la lista dei tag
+        if tags:
+            print("Tag presenti nel vault:")
+            for tag, postings in tags.items():
+                print(f"- {tag} ({len(postings)})")
+        else:
+            print("Nessun tag trovato nel vault.")
+
+    except Exception as e:
+        print(f"Errore durante la lettura dei tag: {e}")
+        
+def FormatVault(date_from=None, date_until=None):
+    """
+    Ottimizza gli spazi di tutte le note del vault (o di quelle in un intervallo di date).
+    Le note giá formattate sono segnate nel manifest ("formatted") e vengono saltate finché
+    il loro hash non cambia; vengono riscritte solo le note il cui testo formattato è diverso.
+    """
+    model = CheckConsistency()
+
+    try:
+        manifest = LoadManifest()
+        LoadNotesData(model, manifest)
+
+        checked = 0
+        written = 0
+        for note_date in sorted(model["notes"]):
+            if (date_from and note_date < date_from) or (date_until and note_date > date_until):
+                continue
+            note = model["notes"][note_date]
+            if manifest["notes"][note["rel"]].get("formatted"):
+                continue
+
+            checked += 1
+            with open(note["path"], "rb") as note_file:
+                raw = note_file.read()
+            CountRead(len(raw))
+            content = raw.decode("utf-8")
+            formatted = FormatNoteText(content)
+            if formatted != content:
+                WriteIndexFile(note["path"], formatted)
+                raw = formatted.encode("utf-8")
+                written += 1
+                print(f"Nota formattata: {note['rel']}")
+
+            # La entry nel manifest segue il nuovo contenuto, cosí la nota non viene riletta
+            entry = ParseNoteContent(raw.decode("utf-8"))
+            entry["hash"] = hashlib.sha1(raw).hexdigest()
+            CountStat()
+            entry = StoreNoteData(manifest, note["rel"], os.stat(note["path"]), entry)
+            entry["formatted"] = True
+
+        SaveManifest(manifest)
+        print(f"{written} note riscritte su {checked} controllate ({len(model['notes']) - checked} giá formattate o fuori intervallo).")
+
+    except Exception as e:
+        print(f"Errore durante la formattazione delle note: {e}")
+
+def WeeklySignature(notes_in_week):
+    """
+    Ritorna la riga di commento salvata in fondo a un file settimanale con le note sorgenti
+    e il loro hash: se non cambia, il file settimanale non va rigenerato.
+    Sta in fondo e non in testa perché la prima riga deve restare il titolo (regola MD041 di markdownlint).
+    """
+    sources = " ".join(f"{note['name']}={note['hash'][:12]}" for note in notes_in_week)
+    return f"<!-- journalscript weekly v{WEEKLY_VERSION}: {sources} -->\n"
+
+def ReadWeeklySignature(weekly_file_path):
+    """
+    Legge la riga di commento con le note sorgenti di un file settimanale giá generato (l'ultima riga),
+    leggendo solo la coda del file.
+    """
+    try:
+        with open(weekly_file_path, "rb") as weekly_file:
+            weekly_file.seek(0, os.SEEK_END)
+            weekly_file.seek(max(0, weekly_file.tell() - 4096))
+            tail = weekly_file.read()
+        CountRead(len(tail))
+        return tail.decode("utf-8", errors="replace").rsplit("\n", 2)[-2] + "\n" if tail.endswith(b"\n") else None
+    except (OSError, IndexError):
+        return None
+
+def WeekNumber(start_of_week, year):
+    """
+    Ritorna il numero della settimana usato nel nome del file settimanale.
+    Gli ultimi giorni di dicembre che secondo ISO appartengono alla settimana 1 dell'anno
+    successivo diventano la settimana 53, cosí non sovrascrivono la prima settimana dell'anno.
+    """
+    iso_year, week_number, _ = start_of_week.isocalendar()
+    if iso_year > int(year):
+        return 53
+    return week_number
+
+def RenderWeekLog(year, start_of_week, notes_in_week, notes_lines):
+    """
+    Genera il contenuto di un file settimanale unendo per sezione il contenuto delle note della settimana.
+    """
+    end_of_week = start_of_week + timedelta(days=6) # Calcola la domenica della settimana
+    week_number = WeekNumber(start_of_week, year) # Ottiene il numero della settimana corrente
+    weeks_dir = os.path.join(VAULT_DIR, year, D_WEEKS)
+
+    # Dizionario per raggruppare il contenuto delle note per sezione
+    sections = {}
+    weekly_time_counts = {}
+
+    # Unisci il contenuto delle note della settimana
+    for note in notes_in_week:
+        for project, hours in note["time"].items():
+            weekly_time_counts[project] = weekly_time_counts.get(project, 0) + hours
+
+        current_section = B_UNSORTED  # Sezione predefinita per contenuti senza intestazione
+        for line in notes_lines[note["path"]]:
+            stripped_line = line.strip()
+            if stripped_line.startswith("# "):  # Ignora i titoli delle note giornaliere
+                continue
+            if stripped_line.startswith(B_SUBTITLE):  # Identifica una nuova sezione
+                if stripped_line == B_TAGS or stripped_line == B_NEXT:  # Salta la sezione ## tags e ## next
+                    current_section = None
+                    continue
+                current_section = stripped_line
+                if current_section not in sections:
+                    sections[current_section] = []
+                continue  # Non aggiungere il titolo della sezione al contenuto
+
+            if current_section == B_TIME:  # Riassunto calcolato dal manifest
+                continue
+
+            if current_section:  # Aggiungi contenuto solo se la sezione è valida
+                # Correggi i link Markdown che puntano a file asset
+                line = re.sub(r'\]\((assets/[^)]+)\)', r'](../\1)', line) # Trasforma i link markdown da `](assets/file.md)` a `](../assets/file.md)`
+                sections.setdefault(current_section, []).append(line)
+
+    # Costruisci il riassunto settimanale per ## time
+    if weekly_time_counts:
+        total_week_hours = sum(weekly_time_counts.values())
+        max_project_len = max(len(project) for project in weekly_time_counts)
+        summary_lines = []
+        for project, hours in sorted(weekly_time_counts.items(), key=lambda x: x[1], reverse=True):
+            percentage = (hours / total_week_hours) * 100 if total_week_hours else 0
+            summary_lines.append(f"- {project:<{max_project_len}}: {hours:>3} ore | {percentage:>5.1f}%\n")
+        sections[B_TIME] = summary_lines
+
+    # Componi in memoria il contenuto unito del file settimanale
+    weekly_file = io.StringIO()
+    # Scrivi il titolo della settimana
+    weekly_file.write(f"# Week {week_number} ({start_of_week} - {end_of_week})\n\n")
+    
+    # Aggiungi l'elenco puntato con i link alle note della settimana
+    for note in notes_in_week:
+        relative_path = os.path.relpath(note["path"], weeks_dir).replace("\\", "/")
+        weekly_file.write(f"- [{note['name'].split('.')[0]}]({relative_path})\n")
+    weekly_file.write("\n")
+    
+    # Scrivi le sezioni raggruppate
+    written_sections = set()  # Traccia delle sezioni già scritte
+    for section, content in sections.items():
+        if section not in written_sections:  # Scrivi la sezione solo se non è già stata scritta
+            weekly_file.write(f"{section}\n")
+            written_sections.add(section)  # Aggiungi la sezione al set
+        weekly_file.writelines(content)
+
+    # Ottimizza gli spazi, la firma delle note sorgenti resta come ultima riga
+    return FormatNoteText(weekly_file.getvalue()).rstrip("\n") + "\n\n" + WeeklySignature(notes_in_week)
+
+def WeekLogYear(model, year):
+    """
+    Genera i file settimanali di un anno, rigenerando solo le settimane in cui una nota
+    è stata aggiunta, rimossa o modificata rispetto alla firma salvata nel file settimanale.
+    """
+    # Dizionario per raggruppare le note per settimana
+    weeks_data = {}
+    for file_date in sorted(model["notes"]):
+        note = model["notes"][file_date]
+        if note["year"] != year:
+            continue
+        # Calcola il lunedì della settimana corrente e raggruppa le note per settimana
+        start_of_week = file_date - timedelta(days=file_date.weekday())
+        weeks_data.setdefault(start_of_week, []).append(note)
+
+    # Se non ci sono note, interrompi
+    if not weeks_data:
+        print(f"Nessuna nota trovata per l'anno {year}.")
+        return
+
+    weeks_dir = os.path.join(VAULT_DIR, year, D_WEEKS)
+    os.makedirs(weeks_dir, exist_ok=True)
+
+    # Settimane da rigenerare: la firma delle note sorgenti non coincide con quella salvata
+    to_build = []
+    for start_of_week in sorted(weeks_data):
+        notes_in_week = sorted(weeks_data[start_of_week], key=lambda note: note["path"])
+        weekly_filename = f"{year}weekly{WeekNumber(start_of_week, year):02d}.md"
+        weekly_file_path = os.path.join(weeks_dir, weekly_filename)
+        if ReadWeeklySignature(weekly_file_path) == WeeklySignature(notes_in_week):
+            WRITE_STATS["unchanged"] += 1
+            continue
+        to_build.append((start_of_week, notes_in_week, weekly_file_path))
+
+    # Legge in parallelo solo le note delle settimane da rigenerare
+    week_notes = [note["path"] for _, notes_in_week, _ in to_build for note in notes_in_week]
+    notes_lines = dict(zip(week_notes, MapJobs(ReadNoteLines, week_notes)))
+    CountRead(sum(note["size"] for _, notes_in_week, _ in to_build for note in notes_in_week), len(week_notes))
+
+    # Genera un file settimanale per ogni settimana cambiata
+    for start_of_week, notes_in_week, weekly_file_path in to_build:
+        content = RenderWeekLog(year, start_of_week, notes_in_week, notes_lines)
+        if WriteIndexFile(weekly_file_path, content):
+            print(f"File settimanale aggiornato: {os.path.relpath(weekly_file_path, VAULT_DIR)}")
+
+    print(f"Anno {year}: {len(to_build)} settimane rigenerate su {len(weeks_data)}.")
+
+def WeekLog(year=None):
+    """
+    Genera file settimanali con le note raggruppate per settimana (da lunedì a domenica).
+    Crea un file per ogni settimana presente nel vault, unendo il contenuto delle note della settimana.
+    Se l'anno non é specificato, usa l'anno corrente; con "all" processa tutti gli anni del vault.
+    """
+    # Check di consistenza preventivo (la stessa visita fornisce l'elenco delle note)
+    model = CheckConsistency()
+
+    try:
+        # Hash e ore di ## time dalla cache delle note, vengono lette solo le note modificate
+        manifest = LoadManifest()
+        LoadNotesData(model, manifest)
+
+        # Determina gli anni da processare
+        if year == "all":
+            years = sorted({note["year"] for note in model["notes"].values()})
+        else:
+            years = [str(year if year is not None else date.today().year)]
+
+        for year in years:
+            # Considera solo le note della cartella dell'anno specificato
+            if not os.path.exists(os.path.join(VAULT_DIR, year)):
+                print(f"Nessuna nota trovata per l'anno {year}.")
+                continue
+            WeekLogYear(model, year)
+
+    except Exception as e:
+        print(f"Errore durante la generazione dei file settimanali: {e}")
+
+def DeleteWeekLog():
+    """
+    Elimina tutte le cartelle 'weeks' presenti all'interno delle cartelle 'YYYY/'.
+    """
+    try:
+        # Le cartelle 'weeks' vengono generate solo dentro le cartelle degli anni
+        for year_dir in YearDirs():
+            weeks_dir_path = os.path.join(year_dir, D_WEEKS)
+            if os.path.isdir(weeks_dir_path):
+                # Elimina la cartella 'weeks' e tutto il suo contenuto
+                shutil.rmtree(weeks_dir_path)
+                print(f"Cartella eliminata: {os.path.relpath(weeks_dir_path, VAULT_DIR)}")
+    except Exception as e:
+        print(f"Errore durante l'eliminazione delle cartelle 'weeks': {e}")
+
+def LoadBackupManifest():
+    """
+    Carica il manifest dei backup da BACKUP_MANIFEST_FILE, con una catena di backup separata
+    per i backup con assets ("assets") e senza ("notes"), ognuna con:
+    - full: stato dei file (path relativo -> [dimensione, mtime, hash]) all'ultimo backup completo
+    - last: stato dei file all'ultimo backup di qualsiasi tipo
+    Se il file non esiste o non è valido ritorna un manifest vuoto.
+    """
+    empty = {
+        "version": BACKUP_MANIFEST_VERSION,
+        "assets": {"full": None, "last": None},
+        "notes": {"full": None, "last": None},
+    }
+    try:
+        with open(BACKUP_MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+            CountRead(f.tell())
+        if manifest.get("version") == BACKUP_MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return empty
+
+def HashFile(file_path):
+    """
+    Ritorna lo sha1 di un file letto a blocchi, senza caricarlo tutto in memoria.
+    """
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+        CountRead(f.tell())
+    return digest.hexdigest()
+
+def BackupFiles(includeAssets):
+    """
+    Ritorna i file del vault da salvare come dizionario path relativo -> stat.
+    Le cartelle weeks/ e la cache sono sempre escluse, assets/ solo se includeAssets è False.
+    """
+    excluded = (D_WEEKS, D_CACHE) if includeAssets else (D_ASSETS, D_WEEKS, D_CACHE)
+    files = {relative_path: entry.stat() for relative_path, entry in WalkVault(excluded)}
+    CountStat(len(files))
+    return files
+
+def BackupState(files, reference, known=None):
+    """
+    Calcola lo stato [dimensione, mtime, hash] dei file e quali sono cambiati rispetto a reference.
+    Un file con stessa dimensione e mtime del riferimento o di known (stati giá calcolati,
+    usati solo per non ricalcolare l'hash) non viene riletto; se cambia solo l'mtime
+    ma l'hash coincide non viene considerato modificato.
+    Ritorna (stato, file cambiati, file eliminati).
+    """
+    reference = reference or {}
+    known = known or {}
+    state = {}
+    changed = []
+    for rel, st in files.items():
+        old = reference.get(rel)
+        for entry in (old, known.get(rel)):
+            if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+                state[rel] = entry
+                break
+        else:
+            state[rel] = [st.st_size, st.st_mtime_ns, HashFile(os.path.join(VAULT_DIR, *rel.split("/")))]
+        if not old or old[2] != state[rel][2]:
+            changed.append(rel)
+    deleted = sorted(rel for rel in reference if rel not in files)
+    return state, changed, deleted
+
+def DoBackup(includeAssets, file_path=None, mode="full", compression=None):
+    """
+    Crea un backup in formato .tar del diario.
+    Senza file_path mostra una finestra grafica per scegliere nome e percorso di salvataggio.
+    
+    :param include_assets: se False esclude assets/ e weeks/
+    :param file_path: file (o cartella) di destinazione, per i backup senza interazione (es: da cron)
+    :param mode: full (tutti i file), diff (file cambiati dall'ultimo full), incr (file cambiati dall'ultimo backup)
+    :param compression: None, "gz", "bz2" o "xz"
+    """
+    import tarfile
+
+    # Data odierna in formato YYYY-MM-DD
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    # Nome file con data inclusa
+    extension = ".tar" + (f".{compression}" if compression else "")
+    default_name = f"backup-journal-{today}{'' if mode == 'full' else '-' + mode}{extension}"
+
+    if file_path is None:
+        try:
+            import tkinter as tk
+            from tkinter import filedialog
+        except ImportError:
+            print("Errore: il backup richiede tkinter per la finestra di salvataggio, non disponibile in questo ambiente. Usa --backup-to PATH.")
+            sys.exit(1)
+
+        # Nasconde la finestra principale Tk
+        root = tk.Tk()
+        root.withdraw()
+        
+        root.attributes('-topmost', True) # sempre in primo piano
+        
+        # Finestra "Salva con nome"
+        file_path = filedialog.asksaveasfilename(
+            title="Salva backup",
+            defaultextension=extension,
+            filetypes=[("Tar archive", f"*{extension}")],
+            initialdir=os.getcwd(),
+            initialfile=default_name
+        )
+
+        if not file_path:
+            print("Backup annullato.")
+            sys.exit(1)
+    elif os.path.isdir(file_path):
+        file_path = os.path.join(file_path, default_name)
+
+    # File da salvare: per diff e incr solo quelli cambiati rispetto al backup di riferimento
+    # della stessa catena (con o senza assets); gli hash giá noti vengono riusati anche per un full
+    manifest = LoadBackupManifest()
+    chain = manifest["assets" if includeAssets else "notes"]
+    if mode != "full" and chain["full"] is None:
+        print("Nessun backup completo precedente, viene eseguito un backup completo.")
+        mode = "full"
+    reference = None if mode == "full" else chain["full"] if mode == "diff" else chain["last"]
+    known = dict(manifest["notes"]["last"] or {})
+    known.update(manifest["assets"]["last"] or {})
+    state, changed, deleted = BackupState(BackupFiles(includeAssets), reference, known)
+
+    # Creazione archivio tar, con l'elenco dei file eliminati per il ripristino
+    info = {"mode": mode, "date": today, "files": len(changed), "deleted": deleted}
+    info_data = json.dumps(info, ensure_ascii=False, indent=2).encode("utf-8")
+    with tarfile.open(file_path, "w:" + (compression or "")) as tar:
+        for rel in changed:
+            # Path relativo per mantenere struttura dentro il tar
+            arcname = os.path.relpath(os.path.join(VAULT_DIR, *rel.split("/")), start=os.path.dirname(VAULT_DIR))
+            tar.add(os.path.join(VAULT_DIR, *rel.split("/")), arcname=arcname, recursive=False)
+        member = tarfile.TarInfo(F_BACKUP_INFO)
+        member.size = len(info_data)
+        member.mtime = int(time.time())
+        tar.addfile(member, io.BytesIO(info_data))
+    CountRead(sum(state[rel][0] for rel in changed), len(changed))
+    CountWrite(os.path.getsize(file_path))
+
+    # Il manifest viene aggiornato solo dopo che l'archivio è stato scritto
+    if mode == "full":
+        chain["full"] = state
+    chain["last"] = state
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    WriteIndexFile(BACKUP_MANIFEST_FILE, json.dumps(manifest, ensure_ascii=False, separators=(",", ":")))
+    print(f"Backup {mode} '{file_path}': {len(changed)} file salvati, {len(deleted)} eliminati dal backup di riferimento.")
+
+
+def StoreBlob(store_dir, file_path, digest):
+    """
+    Copia un file nell'archivio a contenuto (objects/ab/cdef...) se il suo hash non è giá presente.
+    La copia avviene a blocchi e passa da un file temporaneo, cosí un blob è sempre completo.
+    Ritorna True se il blob è stato scritto.
+    """
+    blob_path = os.path.join(store_dir, D_OBJECTS, digest[:2], digest[2:])
+    if os.path.exists(blob_path):
+        return False
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".blob.", suffix=".tmp", dir=os.path.dirname(blob_path))
+    try:
+        with os.fdopen(fd, "wb") as blob, open(file_path, "rb") as source:
+            shutil.copyfileobj(source, blob, 1 << 20)
+            CountRead(source.tell())
+            CountWrite(blob.tell())
+        os.replace(tmp_path, blob_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+def StoreSnapshots(store_dir):
+    """
+    Ritorna in ordine cronologico i nomi degli snapshot presenti nell'archivio a contenuto.
+    """
+    snapshots_dir = os.path.join(store_dir, D_SNAPSHOTS)
+    if not os.path.isdir(snapshots_dir):
+        return []
+    return sorted(name for name in os.listdir(snapshots_dir) if name.endswith(".json"))
+
+def LoadSnapshot(store_dir, name):
+    """
+    Carica uno snapshot: path relativo del vault -> [dimensione, mtime, hash del blob].
+    """
+    with open(os.path.join(store_dir, D_SNAPSHOTS, name), "r", encoding="utf-8") as f:
+        return json.load(f)["files"]
+
+def BackupToStore(includeAssets, store_dir):
+    """
+    Salva il vault nell'archivio a contenuto store_dir: ogni file viene salvato una sola volta
+    come blob identificato dal suo hash, quindi le copie dello stesso asset in anni diversi
+    e i file invariati tra un backup e l'altro non occupano altro spazio.
+    Ogni backup aggiunge solo uno snapshot (snapshots/*.json) con la mappa path -> blob.
+    Gli hash dell'ultimo snapshot vengono riusati per i file con stessa dimensione e mtime.
+    """
+    snapshots = StoreSnapshots(store_dir)
+    reference = LoadSnapshot(store_dir, snapshots[-1]) if snapshots else None
+    state, changed, deleted = BackupState(BackupFiles(includeAssets), reference)
+
+    # Un blob per ogni contenuto distinto, letto e copiato a blocchi
+    stored = 0
+    for rel, (size, mtime, digest) in state.items():
+        if StoreBlob(store_dir, os.path.join(VAULT_DIR, *rel.split("/")), digest):
+            stored += 1
+
+    # Microsecondi nel nome: due backup nello stesso secondo non si sovrascrivono (e restano in ordine cronologico)
+    name = None
+    while name is None or os.path.exists(os.path.join(store_dir, D_SNAPSHOTS, name)):
+        name = f"backup-journal-{datetime.now():%Y-%m-%d-%H%M%S-%f}.json"
+    os.makedirs(os.path.join(store_dir, D_SNAPSHOTS), exist_ok=True)
+    snapshot = {"date": datetime.now().isoformat(timespec="seconds"), "assets": includeAssets, "files": state}
+    WriteIndexFile(os.path.join(store_dir, D_SNAPSHOTS, name), json.dumps(snapshot, ensure_ascii=False, indent=1))
+
+    blobs = len({entry[2] for entry in state.values()})
+    print(f"Snapshot '{name}': {len(state)} file ({blobs} contenuti distinti), {stored} nuovi blob salvati, "
+          f"{len(changed)} file cambiati e {len(deleted)} eliminati dall'ultimo backup.")
+
+def RestoreFromStore(store_dir, target_dir, snapshot=None):
+    """
+    Ricostruisce la cartella myjournal/ in target_dir a partire da uno snapshot dell'archivio
+    a contenuto (l'ultimo se non specificato), verificando l'hash di ogni blob copiato.
+    """
+    snapshots = StoreSnapshots(store_dir)
+    if not snapshots:
+        print(f"Errore: nessuno snapshot trovato in '{store_dir}'.")
+        sys.exit(1)
+    name = snapshot or snapshots[-1]
+    if name not in snapshots:
+        print(f"Errore: snapshot '{name}' non trovato. Snapshot disponibili:")
+        for available in snapshots:
+            print(f"- {available}")
+        sys.exit(1)
+
+    vault_dir = os.path.join(target_dir, os.path.basename(VAULT_DIR))
+    if os.path.exists(vault_dir) and os.listdir(vault_dir):
+        print(f"Errore: la cartella '{vault_dir}' esiste giá e non è vuota, ripristino annullato.")
+        sys.exit(1)
+
+    files = LoadSnapshot(store_dir, name)
+    # Uno snapshot modificato non deve poter scrivere fuori dalla cartella di destinazione
+    # (path assoluti, con unitá, con ".." o con "\\" che su Windows è un separatore) né leggere blob fuori da objects/
+    unsafe = [rel for rel, entry in files.items()
+              if os.path.isabs(rel) or rel.startswith("/") or os.path.splitdrive(rel)[0] or "\\" in rel
+              or ".." in rel.split("/") or not re.fullmatch(r"[0-9a-f]{40}", str(entry[2]))]
+    if unsafe:
+        print(f"Errore: lo snapshot '{name}' contiene path non validi, ripristino annullato:")
+        for rel in unsafe:
+            print(f"- {rel}")
+        sys.exit(1)
+    for rel, (size, mtime, digest) in sorted(files.items()):
+        blob_path = os.path.join(store_dir, D_OBJECTS, digest[:2], digest[2:])
+        dest_path = os.path.join(vault_dir, *rel.split("/"))
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        shutil.copyfile(blob_path, dest_path)
+        if HashFile(dest_path) != digest:
+            print(f"Errore: il blob di '{rel}' è danneggiato, ripristino interrotto.")
+            sys.exit(1)
+        os.utime(dest_path, ns=(mtime, mtime))
+    print(f"Ripristinati {len(files)} file dallo snapshot '{name}' in '{vault_dir}'.")
+
+######################
+## SEARCH FUNCTIONS ##
+######################
+def TokenizeNote(content):
+    """
+    Divide una nota in parole normalizzate (minuscole) per l'indice di ricerca.
+    Ritorna:
+    - postings: dizionario parola -> lista delle posizioni (ordinate) nella nota
+    - sections: lista [posizione iniziale, titolo] delle sezioni, i titoli non vengono indicizzati
+    """
+    postings = {}
+    sections = []
+    position = 0
+    for line in content.split("\n"):
+        stripped_line = line.strip()
+        if stripped_line.startswith("#"):
+            sections.append([position, stripped_line])
+            continue
+        for word in SEARCH_TOKEN.findall(stripped_line.lower()):
+            postings.setdefault(word, []).append(position)
+            position += 1
+    return postings, sections
+
+def ReadSearchDoc(file_path):
+    """
+    Legge e divide in parole una nota (usata dai lettori paralleli).
+    """
+    with open(file_path, "r", encoding="utf-8") as note_file:
+        return TokenizeNote(note_file.read())
+
+def NoteSearchDocs(notes):
+    """
+    Ritorna (parole, sezioni) di ogni nota, nello stesso ordine.
+    Per le note appena lette da ReadNoteFile sono giá nel modello ("search"); solo le altre
+    (invariate secondo il manifest ma non ancora indicizzate) vengono rilette, in parallelo.
+    """
+    missing = [note for note in notes if "search" not in note]
+    read = dict(zip((note["rel"] for note in missing), MapJobs(ReadSearchDoc, [note["path"] for note in missing])))
+    CountRead(sum(note["size"] for note in missing), len(missing))
+    return [note["search"] if "search" in note else read[note["rel"]] for note in notes]
+
+def LoadSearchIndex():
+    """
+    Carica l'indice di ricerca da SEARCH_FILE.
+    L'indice contiene:
+    - docs: lista delle note indicizzate (path, data, hash, tag, sezioni e parole), l'indice nella lista è l'id
+    - terms: dizionario parola -> "id:pos,pos;id:pos", decodificato solo per le parole cercate
+    Se il file non esiste, è corrotto o ha una versione diversa ritorna un indice vuoto.
+    """
+    index = {"version": SEARCH_VERSION, "docs": [], "terms": {}}
+    if os.path.exists(SEARCH_FILE):
+        try:
+            with open(SEARCH_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                CountRead(f.tell())
+            if data.get("version") == SEARCH_VERSION:
+                index = data
+        except (OSError, ValueError):
+            pass
+    index["ids"] = {doc["rel"]: doc_id for doc_id, doc in enumerate(index["docs"]) if doc}
+    index["dirty"] = False
+    return index
+
+def SaveSearchIndex(index):
+    """
+    Salva l'indice di ricerca in SEARCH_FILE, solo se è stato modificato durante l'esecuzione.
+    """
+    if not index.get("dirty"):
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        data = {key: value for key, value in index.items() if key not in ("dirty", "ids")}
+        with open(SEARCH_FILE, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            CountWrite(f.tell())
+        index["dirty"] = False
+    except Exception as e:
+        print(f"Errore durante il salvataggio dell'indice di ricerca: {e}")
+
+def DecodePostings(encoded):
+    """
+    Decodifica le occorrenze di una parola: "id:pos,pos;id:pos" -> {id: [pos, ...]}.
+    """
+    postings = {}
+    for chunk in encoded.split(";"):
+        doc_id, positions = chunk.split(":")
+        postings[int(doc_id)] = [int(p) for p in positions.split(",")]
+    return postings
+
+def RemoveSearchDoc(index, doc_id):
+    """
+    Toglie dall'indice di ricerca una nota e tutte le sue occorrenze.
+    """
+    prefix = f"{doc_id}:"
+    for term in index["docs"][doc_id]["terms"]:
+        chunks = [c for c in index["terms"].get(term, "").split(";") if c and not c.startswith(prefix)]
+        if chunks:
+            index["terms"][term] = ";".join(chunks)
+        else:
+            index["terms"].pop(term, None)
+    del index["ids"][index["docs"][doc_id]["rel"]]
+    index["docs"][doc_id] = None
+    index["dirty"] = True
+
+def AddSearchDoc(index, note, postings, sections):
+    """
+    Aggiunge una nota all'indice di ricerca, riusando il primo id libero.
+    """
+    try:
+        doc_id = index["docs"].index(None)
+    except ValueError:
+        doc_id = len(index["docs"])
+        index["docs"].append(None)
+    index["docs"][doc_id] = {
+        "rel": note["rel"],
+        "date": ParseNoteDate(note["name"]).isoformat(),
+        "hash": note["hash"],
+        "tags": note["tags"],
+        "sections": sections,
+        "terms": sorted(postings),
+    }
+    index["ids"][note["rel"]] = doc_id
+    for term, positions in postings.items():
+        chunk = f"{doc_id}:{','.join(map(str, positions))}"
+        index["terms"][term] = f"{index['terms'][term]};{chunk}" if term in index["terms"] else chunk
+    index["dirty"] = True
+
+def UpdateSearchIndex(model, index=None):
+    """
+    Allinea l'indice di ricerca al modello del vault (con i dati giá letti da LoadNotesData).
+    Indicizza solo le note il cui hash è cambiato rispetto a quello indicizzato (con le parole
+    giá estratte alla lettura della nota) e toglie quelle non piú presenti. Ritorna l'indice, cosí il watch puó tenerlo in memoria.
+    """
+    if index is None:
+        index = LoadSearchIndex()
+    notes = {note["rel"]: note for note in model["notes"].values()}
+
+    for rel, doc_id in list(index["ids"].items()):
+        note = notes.get(rel)
+        if not note or note.get("hash") != index["docs"][doc_id]["hash"]:
+            RemoveSearchDoc(index, doc_id)
+
+    # Unione deterministica dei risultati, nell'ordine delle date
+    to_read = [model["notes"][d] for d in sorted(model["notes"]) if model["notes"][d]["rel"] not in index["ids"]]
+    for note, (postings, sections) in zip(to_read, NoteSearchDocs(to_read)):
+        AddSearchDoc(index, note, postings, sections)
+
+    SaveSearchIndex(index)
+    return index
+
+def SectionAt(sections, position):
+    """
+    Ritorna il titolo della sezione che contiene la parola alla posizione indicata.
+    """
+    starts = [start for start, _ in sections]
+    i = bisect.bisect_right(starts, position) - 1
+    return sections[i][1] if i >= 0 else None
+
+def MatchPhrase(index, words):
+    """
+    Cerca una sequenza di parole consecutive nell'indice.
+    Ritorna il dizionario id -> posizioni di inizio della frase.
+    """
+    encoded = [index["terms"].get(word) for word in words]
+    if not all(encoded):
+        return {}
+    # Si parte dalla parola piú rara, cosí le intersezioni restano piccole
+    postings = [DecodePostings(e) for e in encoded]
+    rarest = min(range(len(words)), key=lambda i: len(postings[i]))
+    matches = {}
+    for doc_id, positions in postings[rarest].items():
+        doc_positions = [p.get(doc_id) for p in postings]
+        if not all(doc_positions):
+            continue
+        following = [set(p) for p in doc_positions]
+        starts = [p - rarest for p in positions
+                  if all(p - rarest + i in following[i] for i in range(len(words)))]
+        if starts:
+            matches[doc_id] = starts
+    return matches
+
+def SearchNotes(query, date_from=None, date_until=None, tags=None):
+    """
+    Risponde a una ricerca usando solo l'indice, senza aprire le note.
+    La query è un elenco di parole e di frasi tra virgolette, che devono comparire tutte nella nota.
+    Ritorna una lista di (data, path relativo, occorrenze, sezioni) ordinata per data.
+    """
+    index = LoadSearchIndex()
+    clauses = [SEARCH_TOKEN.findall((phrase or word).lower()) for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query)]
+    clauses = [words for words in clauses if words]
+    if not clauses:
+        return []
+
+    results = None
+    for words in clauses:
+        matches = MatchPhrase(index, words)
+        if results is None:
+            results = {doc_id: [(p, len(words)) for p in starts] for doc_id, starts in matches.items()}
+        else:
+            results = {doc_id: hits + [(p, len(words)) for p in matches[doc_id]] for doc_id, hits in results.items() if doc_id in matches}
+        if not results:
+            return []
+
+    found = []
+    for doc_id, hits in results.items():
+        doc = index["docs"][doc_id]
+        if date_from and doc["date"] < date_from.isoformat():
+            continue
+        if date_until and doc["date"] > date_until.isoformat():
+            continue
+        if tags and not set(tags) <= set(doc["tags"]):
+            continue
+        sections = sorted({SectionAt(doc["sections"], p) or "-" for p, _ in hits})
+        found.append((doc["date"], doc["rel"], len(hits), sections))
+    return sorted(found)
+
+def SearchVault(query, date_from=None, date_until=None, tags=None):
+    """
+    Stampa i risultati di una ricerca nel contenuto delle note.
+    Se l'indice di ricerca non esiste ancora viene costruito con un aggiornamento completo.
+    """
+    if not os.path.exists(SEARCH_FILE):
+        print("Indice di ricerca non presente, aggiornamento degli indici...")
+        UpdateIndex()
+    try:
+        start = time.perf_counter()
+        found = SearchNotes(query, date_from, date_until, tags)
+        elapsed = (time.perf_counter() - start) * 1000
+    except Exception as e:
+        print(f"Errore durante la ricerca: {e}")
+        sys.exit(1)
+
+    for note_date, relative_path, count, sections in found:
+        print(f"- {note_date} ({relative_path}): {count} occorrenze in {', '.join(sections)}")
+    print(f"{len(found)} note trovate in {elapsed:.1f} ms.")
+
+
+####################
+## TIME FUNCTIONS ##
+####################
+def TimeLedger(model):
+    """
+    Costruisce il registro colonnare delle ore dalle sezioni ## time delle note, ordinato per data.
+    Ogni riga i è (days[i], projects[i], hours[i]): ordinale del giorno, id del progetto e ore;
+    gli id indicizzano names, nell'ordine in cui i progetti compaiono per la prima volta.
+    """
+    ledger = {"names": [], "days": array("L"), "projects": array("L"), "hours": array("L")}
+    ids = {}
+    for note_date in sorted(model["notes"]):
+        for project, hours in model["notes"][note_date]["time"].items():
+            if project not in ids:
+                ids[project] = len(ledger["names"])
+                ledger["names"].append(project)
+            ledger["days"].append(note_date.toordinal())
+            ledger["projects"].append(ids[project])
+            ledger["hours"].append(hours)
+    return ledger
+
+def RenderTimeLedger(model):
+    """
+    Genera il contenuto di TIME_LEDGER_FILE, la copia su disco del registro delle ore usata da --time.
+    """
+    ledger = TimeLedger(model)
+    data = {"version": TIME_LEDGER_VERSION, "names": ledger["names"]}
+    data.update({column: ledger[column].tolist() for column in ("days", "projects", "hours")})
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+def LoadTimeLedger():
+    """
+    Carica il registro delle ore. Se non esiste o non è valido viene rigenerato con un aggiornamento completo.
+    """
+    for attempt in range(2):
+        try:
+            with open(TIME_LEDGER_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                CountRead(f.tell())
+            if data.get("version") == TIME_LEDGER_VERSION:
+                ledger = {"names": data["names"]}
+                ledger.update({column: array("L", data[column]) for column in ("days", "projects", "hours")})
+                return ledger
+        except (OSError, ValueError, KeyError):
+            pass
+        if attempt == 0:
+            print("Registro delle ore non presente, aggiornamento degli indici...")
+            UpdateIndex()
+    print("Errore: impossibile costruire il registro delle ore.")
+    sys.exit(1)
+
+def GroupTime(ledger, key, start=0, end=None, projects=None):
+    """
+    Somma le ore del registro tra le righe [start, end) raggruppandole per (key(ordinale), id progetto).
+    Ritorna il dizionario periodo -> {id progetto: ore}.
+    """
+    days, ids, hours = ledger["days"], ledger["projects"], ledger["hours"]
+    groups = {}
+    for i in range(start, len(days) if end is None else end):
+        if projects is not None and ids[i] not in projects:
+            continue
+        group = groups.setdefault(key(days[i]), {})
+        group[ids[i]] = group.get(ids[i], 0) + hours[i]
+    return groups
+
+def SortedProjectHours(ledger, group):
+    """
+    Ritorna le coppie (progetto, ore) di un gruppo ordinate per ore decrescenti;
+    a paritá di ore vale l'ordine di prima comparsa del progetto.
+    """
+    return [(ledger["names"][pid], h) for pid, h in sorted(group.items(), key=lambda x: (-x[1], x[0]))]
+
+def RenderProjectHours(project_hours):
+    """
+    Genera le righe "- progetto: ore | percentuale" di un gruppo di ore giá ordinato.
+    """
+    total = sum(hours for _, hours in project_hours)
+    max_project_len = max(len(project) for project, _ in project_hours) if project_hours else 0
+    lines = []
+    for project, hours in project_hours:
+        percentage = (hours / total * 100) if total > 0 else 0
+        lines.append(f"- {project:<{max_project_len}}: {hours:>3} ore | {percentage:>5.1f}%\n")
+    return "".join(lines)
+
+def TimePeriodKey(group, origin):
+    """
+    Ritorna la funzione che associa l'ordinale di un giorno al suo periodo di aggregazione:
+    day, week (settimana ISO), month, year, total o Nd (periodi di N giorni a partire da origin).
+    Le etichette dei periodi sono ordinabili come stringhe.
+    """
+    if group == "day":
+        return lambda o: date.fromordinal(o).isoformat()
+    if group == "week":
+        return lambda o: "{0}-W{1:02d}".format(*date.fromordinal(o).isocalendar())
+    if group == "month":
+        return lambda o: date.fromordinal(o).strftime("%Y-%m")
+    if group == "year":
+        return lambda o: str(date.fromordinal(o).year)
+    if group == "total":
+        return lambda o: "Totale"
+    days = int(group[:-1])
+
+    def CustomPeriod(o):
+        start = origin + (o - origin) // days * days
+        return f"{date.fromordinal(start)} - {date.fromordinal(start + days - 1)}"
+    return CustomPeriod
+
+def ParseTimeGroup(value):
+    """
+    Valida il raggruppamento di --group: day, week, month, year, total o Nd (es: 14d).
+    """
+    if value in ("day", "week", "month", "year", "total") or re.fullmatch(r"[1-9]\d*d", value):
+        return value
+    raise argparse.ArgumentTypeError(f"raggruppamento '{value}' non valido, usa day, week, month, year, total o Nd (es: 14d)")
+
+def TimeReport(group="month", date_from=None, date_until=None, projects=None):
+    """
+    Stampa le ore per progetto raggruppate per periodo, calcolate dal registro delle ore
+    senza leggere le note. L'intervallo di date viene cercato con una bisezione sulla colonna dei giorni.
+    """
+    ledger = LoadTimeLedger()
+    days = ledger["days"]
+    start = bisect.bisect_left(days, date_from.toordinal()) if date_from else 0
+    end = bisect.bisect_right(days, date_until.toordinal()) if date_until else len(days)
+
+    project_ids = None
+    if projects:
+        project_ids = {pid for pid, name in enumerate(ledger["names"]) if name in projects}
+        for project in sorted(set(projects) - set(ledger["names"])):
+            print(f"Attenzione: il progetto '{project}' non compare in nessuna nota.")
+
+    if start >= end:
+        print("Nessuna ora registrata nell'intervallo scelto.")
+        return
+    origin = date_from.toordinal() if date_from else days[start]
+    groups = GroupTime(ledger, TimePeriodKey(group, origin), start, end, project_ids)
+
+    totals = {}
+    for period in sorted(groups):
+        print(f"## {period}")
+        print(RenderProjectHours(SortedProjectHours(ledger, groups[period])), end="")
+        for pid, hours in groups[period].items():
+            totals[pid] = totals.get(pid, 0) + hours
+    print(f"Totale: {sum(totals.values())} ore su {len(totals)} progetti in {len(groups)} periodi.")
+
+#########################
+## TAG QUERY FUNCTIONS ##
+#########################
+def RenderTagCache(model):
+    """
+    Genera il contenuto di TAGS_CACHE_FILE: per ogni tag la lista ordinata degli ordinali
+    (date.toordinal()) delle note che lo contengono, piú la lista di tutte le note del vault
+    usata dall'operatore NOT.
+    """
+    tags = {}
+    for note_date in sorted(model["notes"]):
+        for tag in model["notes"][note_date]["tags"]:
+            postings = tags.setdefault(tag, [])
+            if not postings or postings[-1] != note_date.toordinal():  # Tag ripetuto nella stessa nota
+                postings.append(note_date.toordinal())
+    data = {
+        "version": TAGS_CACHE_VERSION,
+        "all": [note_date.toordinal() for note_date in sorted(model["notes"])],
+        "tags": dict(sorted(tags.items())),
+    }
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+def UpdateTagCache(model):
+    """
+    Aggiorna TAGS_CACHE_FILE con le note associate a ogni tag (solo se è cambiato).
+    """
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        WriteIndexFile(TAGS_CACHE_FILE, RenderTagCache(model))
+    except Exception as e:
+        print(f"Errore durante l'aggiornamento della cache dei tag: {e}")
+
+def LoadTagCache():
+    """
+    Carica la cache dei tag. Se non esiste o non è valida viene rigenerata con un aggiornamento completo.
+    """
+    for attempt in range(2):
+        try:
+            with open(TAGS_CACHE_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                CountRead(f.tell())
+            if data.get("version") == TAGS_CACHE_VERSION:
+                return data
+        except (OSError, ValueError):
+            pass
+        if attempt == 0:
+            print("Cache dei tag non presente, aggiornamento degli indici...")
+            UpdateIndex()
+    print("Errore: impossibile costruire la cache dei tag.")
+    sys.exit(1)
+
+def TokenizeTagQuery(query):
+    """
+    Divide una query sui tag in parentesi, operatori (AND, OR, NOT) e nomi di tag.
+    """
+    return re.findall(r"\(|\)|[^\s()]+", query)
+
+def ParseTagQuery(tokens, tags, universe):
+    """
+    Valuta una query sui tag con precedenza NOT > AND > OR; due tag vicini senza operatore valgono AND.
+    tags: dizionario tag -> ordinali, universe: insieme di tutte le note (per NOT).
+    Ritorna l'insieme degli ordinali delle note che soddisfano la query.
+    """
+    pos = 0
 
-    # Se la nota non è stata trovata, interrompi
-    if not note_path:
-        print(f"Errore: La nota '{os.path.relpath(notename, VAULT_DIR)}' non è stata trovata nel repository.")
-        sys.exit(1)
+    def Peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def Next():
+        nonlocal pos
+        token = Peek()
+        if token is None:
+            raise ValueError("query incompleta")
+        pos += 1
+        return token
+
+    def Expression():
+        result = Term()
+        while Peek() == "OR":
+            Next()
+            result = result | Term()
+        return result
 
+    def Term():
+        result = Factor()
+        while Peek() not in (None, "OR", ")"):
+            if Peek() == "AND":
+                Next()
+            result = result & Factor()
+        return result
+
+    def Factor():
+        token = Next()
+        if token == "NOT":
+            return universe - Factor()
+        if token == "(":
+            result = Expression()
+            if Next() != ")":
+                raise ValueError("parentesi non chiusa")
+            return result
+        if token in ("AND", "OR", ")"):
+            raise ValueError(f"'{token}' inatteso")
+        return set(tags.get(token, []))
+
+    result = Expression()
+    if Peek() is not None:
+        raise ValueError(f"'{Peek()}' inatteso")
+    return result
+
+def QueryTags(query, date_from=None, date_until=None):
+    """
+    Stampa le note che soddisfano una query booleana sui tag (es: "lavoro AND NOT (ferie OR malattia)"),
+    eventualmente limitate a un intervallo di date, e i tag che compaiono insieme nelle note trovate.
+    Usa solo la cache dei tag, senza leggere le note né tags-index.md.
+    """
+    cache = LoadTagCache()
+    universe = set(cache["all"])
     try:
-        # Leggi il contenuto della nota
-        with open(note_path, "r", encoding="utf-8") as file:
-            content = file.readlines()
+        found = ParseTagQuery(TokenizeTagQuery(query), cache["tags"], universe)
+    except ValueError as e:
+        print(f"Errore nella query '{query}': {e}")
+        sys.exit(1)
+    if date_from:
+        found = {o for o in found if o >= date_from.toordinal()}
+    if date_until:
+        found = {o for o in found if o <= date_until.toordinal()}
 
-        # Cerca la sezione ## tags
-        tags_section_found = False
-        for i, line in enumerate(content):
-            if line.strip() == B_TAGS:
-                tags_section_found = True
-                # Controlla se il tag è già presente
-                j = i + 1
-                while j < len(content):
-                    line = content[j].strip()  # Rimuove spazi e caratteri di nuova linea
-                    if not line:  # Salta le righe vuote
-                        j += 1
-                        continue
-                    if line.startswith("- "):  # Controlla se la riga è un elemento dell'elenco
-                        existing_tag = line.lstrip("- ").strip()
-                        if existing_tag.lower() == tagname.lower():  # Confronto case-insensitive
-                            print(f"Il tag '{tagname}' è già presente nella nota '{notename}'. Nessuna azione necessaria.")
-                            return
-                    elif line.startswith(B_SUBTITLE):  # Fine del blocco ## tags
-                        break
-                    j += 1
-                # Aggiungi il nuovo tag all'elenco puntato
-                content.insert(j, f"\n- {tagname}")
-                break
+    for ordinal in sorted(found):
+        print(f"- {GenerateNoteName(date.fromordinal(ordinal))}")
+    print(f"{len(found)} note trovate.")
 
-        # Se la sezione ## tags non esiste, creala in fondo al file
-        if not tags_section_found:
-            content.append("\n## tags\n\n")
-            content.append(f"- {tagname}\n")
+    # Co-occorrenza: quante delle note trovate hanno ciascun tag
+    counts = {tag: len(found.intersection(postings)) for tag, postings in cache["tags"].items()}
+    counts = sorted(((n, tag) for tag, n in counts.items() if n), key=lambda c: (-c[0], c[1]))
+    if counts:
+        print("Tag presenti nelle note trovate:")
+        for n, tag in counts:
+            print(f"- {tag}: {n}")
 
-        # Scrivi il contenuto aggiornato nella nota
-        with open(note_path, "w", encoding="utf-8") as file:
-            file.writelines(content)
+#####################
+## ASSET FUNCTIONS ##
+#####################
+def ScanAssets():
+    """
+    Ritorna i file nelle cartelle YYYY/assets del vault come dizionario path relativo -> stat.
+    Le cartelle vengono visitate con ScanTree() e lo stat arriva dalle DirEntry (in cache).
+    """
+    assets = {}
+    for year_dir in YearDirs():
+        rel_prefix = f"{os.path.basename(year_dir)}/{D_ASSETS}/"
+        for relative_path, entry in ScanTree(os.path.join(year_dir, D_ASSETS), rel_prefix):
+            assets[relative_path] = entry.stat()
+    CountStat(len(assets))
+    return assets
 
-        # Aggiorna il tag-index.md con le note che contengono il tag
-        UpdateIndex()
-        FixNoteSpaces(note_path)
+def ResolveAssetLink(note_rel, target):
+    """
+    Converte un link a un asset scritto in una nota nel path relativo al vault.
+    Ritorna None se il link punta fuori dal vault.
+    """
+    target = unquote(target.split("#")[0])
+    resolved = os.path.normpath(os.path.join(os.path.dirname(note_rel), target)).replace("\\", "/")
+    return None if resolved.startswith("..") or os.path.isabs(resolved) else resolved
 
-        print(f"Tag '{tagname}' aggiunto con successo alla nota '{notename}'.")
+def AssetIndex(model):
+    """
+    Costruisce l'indice bidirezionale tra note e asset dai link estratti da ParseNoteContent():
+    - notes: path della nota -> asset collegati
+    - assets: path dell'asset -> note che lo collegano
+    """
+    index = {"notes": {}, "assets": {}}
+    for note_date in sorted(model["notes"]):
+        note = model["notes"][note_date]
+        linked = []
+        for target in note.get("links", []):
+            asset = ResolveAssetLink(note["rel"], target)
+            if asset and asset not in linked:
+                linked.append(asset)
+                index["assets"].setdefault(asset, []).append(note["rel"])
+        if linked:
+            index["notes"][note["rel"]] = linked
+    index["assets"] = dict(sorted(index["assets"].items()))
+    return index
 
-    except Exception as e:
-        print(f"Errore durante l'aggiunta del tag: {e}")
-        
-def AddTagToTodayNote(tagname):
+def RenderAssetIndex(model):
     """
-    Aggiunge un tag alla nota di oggi.
-    """	
-    note_name = GenerateNoteName(date.today())
-    AddTagToNoteName(tagname, note_name)
-    
-def TagList():
+    Genera il contenuto di ASSETS_INDEX_FILE, l'indice note <-> asset su disco per altri strumenti.
     """
-    Legge il file TAGS_INDEX_FILE e restituisce la lista di tutti i tag presenti.
+    data = {"version": ASSETS_INDEX_VERSION}
+    data.update(AssetIndex(model))
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+def UpdateAssetIndex(model):
+    """
+    Aggiorna ASSETS_INDEX_FILE con i collegamenti tra note e asset (solo se è cambiato).
     """
-    
-    # Prima aggiorna tutti i tag verificare che si siano tutti aggiornati
-    # UpdateAllTags()
-    
     try:
-        # Controlla se il file TAGS_INDEX_FILE esiste
-        if not os.path.exists(TAGS_INDEX_FILE):
-            print(f"Errore: Il file '{TAGS_INDEX_FILE}' non esiste. Nessun tag trovato.")
-            return
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        WriteIndexFile(ASSETS_INDEX_FILE, RenderAssetIndex(model))
+    except Exception as e:
+        print(f"Errore durante l'aggiornamento dell'indice degli asset: {e}")
 
-        # Leggi il contenuto del file
-        with open(TAGS_INDEX_FILE, "r", encoding="utf-8") as tag_file:
-            content = tag_file.readlines()
+def FormatSize(size):
+    """
+    Formatta una dimensione in byte in modo leggibile.
+    """
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
 
-        # Cerca i titoli dei tag (## {tagname})
-        tags = []
-        for line in content:
-            if line.startswith(B_SUBTITLE):  # Identifica i titoli dei tag
-                tagname = line.strip().replace(B_SUBTITLE, "")
-                tags.append(tagname)
+def AssetReport(kind="all"):
+    """
+    Stampa il resoconto degli asset del vault:
+    - orphans: asset che nessuna nota collega
+    - broken: link di una nota verso un asset che non esiste
+    - usage: numero e spazio occupato dagli asset per anno, di cui orfani
+    I link arrivano dal manifest (le note non cambiate non vengono rilette).
+    """
+    model = CheckConsistency()
+    manifest = LoadManifest()
+    LoadNotesData(model, manifest)
+    index = AssetIndex(model)
+    assets = ScanAssets()
+    orphans = sorted(rel for rel in assets if rel not in index["assets"])
 
-        # Stampa la lista dei tag
-        if tags:
-            print("Tag presenti nel vault:")
-            for tag in tags:
-                print(f"- {tag}")
-        else:
-            print("Nessun tag trovato nel file TAGS_INDEX_FILE.")
+    if kind in ("orphans", "all"):
+        print("## Asset orfani")
+        for rel in orphans:
+            print(f"- {rel} ({FormatSize(assets[rel].st_size)})")
+        print(f"{len(orphans)} asset orfani, {FormatSize(sum(assets[rel].st_size for rel in orphans))}.\n")
 
-    except Exception as e:
-        print(f"Errore durante la lettura dei tag: {e}")
-        
-def WeekLog(year=None):
+    if kind in ("broken", "all"):
+        print("## Link non validi")
+        broken = [(note_rel, asset) for note_rel, linked in index["notes"].items() for asset in linked if asset not in assets]
+        for note_rel, asset in broken:
+            print(f"- {note_rel} -> {asset}")
+        print(f"{len(broken)} link verso asset inesistenti.\n")
+
+    if kind in ("usage", "all"):
+        print("## Spazio occupato per anno")
+        usage = {}
+        for rel, st in assets.items():
+            year = usage.setdefault(rel.split("/")[0], [0, 0, 0, 0])  # file, byte, orfani, byte orfani
+            year[0] += 1
+            year[1] += st.st_size
+            if rel not in index["assets"]:
+                year[2] += 1
+                year[3] += st.st_size
+        for year, (count, size, orphan_count, orphan_size) in sorted(usage.items()):
+            print(f"- {year}: {count} asset, {FormatSize(size)} (orfani: {orphan_count}, {FormatSize(orphan_size)})")
+        print(f"Totale: {len(assets)} asset, {FormatSize(sum(st.st_size for st in assets.values()))}.")
+
+########################
+## DATABASE FUNCTIONS ##
+########################
+DATABASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (rel TEXT PRIMARY KEY, date TEXT NOT NULL, year TEXT NOT NULL, words INTEGER NOT NULL, hash TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS tags (rel TEXT NOT NULL, tag TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS time_entries (rel TEXT NOT NULL, project TEXT NOT NULL, hours INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS sections (rel TEXT NOT NULL, position INTEGER NOT NULL, title TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS asset_links (rel TEXT NOT NULL, asset TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS assets (rel TEXT PRIMARY KEY, year TEXT NOT NULL, date TEXT, size INTEGER NOT NULL, mtime INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS notes_date ON notes(date);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags(tag);
+CREATE INDEX IF NOT EXISTS tags_rel ON tags(rel);
+CREATE INDEX IF NOT EXISTS time_project ON time_entries(project);
+CREATE INDEX IF NOT EXISTS time_rel ON time_entries(rel);
+CREATE INDEX IF NOT EXISTS sections_rel ON sections(rel);
+CREATE INDEX IF NOT EXISTS sections_title ON sections(title);
+CREATE INDEX IF NOT EXISTS assets_year ON assets(year);
+CREATE INDEX IF NOT EXISTS asset_links_rel ON asset_links(rel);
+CREATE INDEX IF NOT EXISTS asset_links_asset ON asset_links(asset);
+"""
+
+def OpenDatabase(create=False):
     """
-    Genera file settimanali con le note raggruppate per settimana (da lunedì a domenica).
-    Crea un file per ogni settimana presente nel vault, unendo il contenuto delle note della settimana.
-    Se l'anno non é specificato, usa l'anno corrente.
+    Apre il database SQLite dei metadati del vault (DATABASE_FILE).
+    Il database è opzionale: se non esiste e create è False ritorna None.
+    Se la versione dello schema è diversa le tabelle vengono ricreate da zero.
     """
-    # Check di consistenza preventivo
-    CheckConsistency()
+    if not create and not os.path.exists(DATABASE_FILE):
+        return None
+    try:
+        import sqlite3
+    except ImportError:
+        print("Errore: il database richiede il modulo sqlite3, non disponibile in questo ambiente.")
+        sys.exit(1)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    db = sqlite3.connect(DATABASE_FILE)
+    if db.execute("PRAGMA user_version").fetchone()[0] != DATABASE_VERSION:
+        for table in ["notes", "tags", "time_entries", "sections", "asset_links", "assets"]:
+            db.execute(f"DROP TABLE IF EXISTS {table}")
+        db.execute(f"PRAGMA user_version = {DATABASE_VERSION}")
+    db.executescript(DATABASE_SCHEMA)
+    return db
 
+def UpdateDatabase(model, create=False):
+    """
+    Allinea il database al modello del vault (con i dati giá letti da LoadNotesData).
+    Le righe di una nota vengono riscritte solo se il suo hash è cambiato; le sezioni,
+    che non sono nel manifest, sono quelle giá estratte alla lettura della nota.
+    Senza database (e con create False) non fa nulla.
+    """
+    db = OpenDatabase(create)
+    if db is None:
+        return
     try:
-        # Dizionario per raggruppare le note per settimana
-        weeks_data = {}
-        # Determina l'anno da processare
-        if year is None:
-            year = date.today().year
-        year = str(year)
-
-        # Scansiona solo la cartella dell'anno specificato
-        year_dir = os.path.join(VAULT_DIR, year)
-        if not os.path.exists(year_dir):
-            print(f"Nessuna nota trovata per l'anno {year}.")
-            return
+        with db:
+            notes = {note["rel"]: (note_date, note) for note_date, note in model["notes"].items()}
+            stored = dict(db.execute("SELECT rel, hash FROM notes"))
+            stale = [rel for rel, note_hash in stored.items() if rel not in notes or notes[rel][1]["hash"] != note_hash]
+            for table in ["notes", "tags", "time_entries", "sections", "asset_links"]:
+                db.executemany(f"DELETE FROM {table} WHERE rel = ?", [(rel,) for rel in stale])
 
-        for root, dirs, files in os.walk(year_dir):
-            if D_WEEKS in root:
-                continue
-            if D_ASSETS in root:
-                continue
-            for file in files:
-                # Escludi i file weekly
-                if file.startswith("weekly") or re.match(r"\d{4}weekly\d{2}\.md", file):
+            to_write = sorted((v for rel, v in notes.items() if rel not in stored or rel in stale), key=lambda v: v[0])
+            docs = NoteSearchDocs([note for _, note in to_write])
+            for (note_date, note), (_, sections) in zip(to_write, docs):
+                rel = note["rel"]
+                db.execute("INSERT INTO notes VALUES (?, ?, ?, ?, ?)", (rel, note_date.isoformat(), note["year"], note["words"], note["hash"]))
+                db.executemany("INSERT INTO tags VALUES (?, ?)", [(rel, tag) for tag in note["tags"]])
+                db.executemany("INSERT INTO time_entries VALUES (?, ?, ?)", [(rel, project, hours) for project, hours in note["time"].items()])
+                db.executemany("INSERT INTO sections VALUES (?, ?, ?)", [(rel, position, title) for position, title in sections])
+                linked = {ResolveAssetLink(rel, target) for target in note.get("links", [])} - {None}
+                db.executemany("INSERT INTO asset_links VALUES (?, ?)", [(rel, asset) for asset in sorted(linked)])
+
+            # Gli asset non hanno hash: si confrontano dimensione e mtime
+            assets = ScanAssets()
+            stored_assets = {rel: (size, mtime) for rel, size, mtime in db.execute("SELECT rel, size, mtime FROM assets")}
+            db.executemany("DELETE FROM assets WHERE rel = ?", [(rel,) for rel in stored_assets if rel not in assets])
+            for rel, st in assets.items():
+                if stored_assets.get(rel) == (st.st_size, st.st_mtime_ns):
                     continue
-                if file.endswith(".md"):  # Considera solo i file Markdown
-                    file_path = os.path.join(root, file)
-                    file_date_str = os.path.basename(file).split(".")[0]  # Estrai YYYY-MM-DD
-                    try:
-                        # Converte la data del file in un oggetto datetime
-                        file_date = datetime.strptime(file_date_str, "%Y-%m-%d").date()
-                        # Calcola il lunedì della settimana corrente
-                        start_of_week = file_date - timedelta(days=file_date.weekday())
-                        # Raggruppa le note per settimana
-                        if start_of_week not in weeks_data:
-                            weeks_data[start_of_week] = []
-                        weeks_data[start_of_week].append(file_path)
-                    except ValueError:
-                        continue  # Ignora file con nomi non validi
-
-        # Se non ci sono note, interrompi
-        if not weeks_data:
-            print(f"Nessuna nota trovata per l'anno {year}.")
-            return
+                match = re.match(r"(\d{4}-\d{2}-\d{2})-", os.path.basename(rel))
+                db.execute("INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?)",
+                           (rel, rel.split("/")[0], match.group(1) if match else None, st.st_size, st.st_mtime_ns))
+    except Exception as e:
+        print(f"Errore durante l'aggiornamento del database: {e}")
+    finally:
+        db.close()
 
-        # Ordina le settimane
-        sorted_weeks = sorted(weeks_data.keys())
-
-        # Genera un file settimanale per ogni settimana
-        for start_of_week in sorted_weeks:
-            end_of_week = start_of_week + timedelta(days=6) # Calcola la domenica della settimana
-            week_number = start_of_week.isocalendar()[1] # Ottiene il numero della settimana corrente
-            weeks_dir = os.path.join(VAULT_DIR, year, D_WEEKS)
-            os.makedirs(weeks_dir, exist_ok=True)
-
-            # Nome del file settimanale
-            weekly_filename = f"{year}weekly{week_number:02d}.md"
-            weekly_file_path = os.path.join(weeks_dir, weekly_filename)
-
-            # Dizionario per raggruppare il contenuto delle note per sezione
-            sections = {}
-            weekly_time_counts = {}
-
-            # Unisci il contenuto delle note della settimana
-            notes_in_week = sorted(weeks_data[start_of_week])
-            for note_path in notes_in_week:
-                with open(note_path, "r", encoding="utf-8") as note_file:
-                    current_section = B_UNSORTED  # Sezione predefinita per contenuti senza intestazione
-                    for line in note_file:
-                        stripped_line = line.strip()
-                        if stripped_line.startswith("# "):  # Ignora i titoli delle note giornaliere
-                            continue
-                        if stripped_line.startswith(B_SUBTITLE):  # Identifica una nuova sezione
-                            if stripped_line == B_TAGS or stripped_line == B_NEXT:  # Salta la sezione ## tags e ## next
-                                current_section = None
-                                continue
-                            current_section = stripped_line
-                            if current_section not in sections:
-                                sections[current_section] = []
-                            continue  # Non aggiungere il titolo della sezione al contenuto
-
-                        if current_section == B_TIME:
-                            if stripped_line.startswith("- "):
-                                project = stripped_line.lstrip("- ").strip()
-                                weekly_time_counts[project] = weekly_time_counts.get(project, 0) + 1
-                            continue
-
-                        if current_section:  # Aggiungi contenuto solo se la sezione è valida
-                            # Correggi i link Markdown che puntano a file asset
-                            line = re.sub(r'\]\((assets/[^)]+)\)', r'](../\1)', line) # Trasforma i link markdown da `](assets/file.md)` a `](../assets/file.md)`
-                            sections.setdefault(current_section, []).append(line)
-
-            # Costruisci il riassunto settimanale per ## time
-            if weekly_time_counts:
-                total_week_hours = sum(weekly_time_counts.values())
-                max_project_len = max(len(project) for project in weekly_time_counts)
-                summary_lines = []
-                for project, hours in sorted(weekly_time_counts.items(), key=lambda x: x[1], reverse=True):
-                    percentage = (hours / total_week_hours) * 100 if total_week_hours else 0
-                    summary_lines.append(f"- {project:<{max_project_len}}: {hours:>3} ore | {percentage:>5.1f}%\n")
-                sections[B_TIME] = summary_lines
-
-            # Scrivi il contenuto unito nel file settimanale
-            with open(weekly_file_path, "w", encoding="utf-8") as weekly_file:
-                # Scrivi il titolo della settimana
-                weekly_file.write(f"# Week {week_number} ({start_of_week} - {end_of_week})\n\n")
-                
-                # Aggiungi l'elenco puntato con i link alle note della settimana
-                for note_path in notes_in_week:
-                    note_name = os.path.basename(note_path)
-                    relative_path = os.path.relpath(note_path, weeks_dir).replace("\\", "/")
-                    weekly_file.write(f"- [{note_name.split('.')[0]}]({relative_path})\n")
-                weekly_file.write("\n")
-                
-                # Scrivi le sezioni raggruppate
-                written_sections = set()  # Traccia delle sezioni già scritte
-                for section, content in sections.items():
-                    if section not in written_sections:  # Scrivi la sezione solo se non è già stata scritta
-                        weekly_file.write(f"{section}\n")
-                        written_sections.add(section)  # Aggiungi la sezione al set
-                    weekly_file.writelines(content)
-            FixNoteSpaces(weekly_file_path)
+def EnableDatabase():
+    """
+    Crea (o riallinea) il database dei metadati del vault. Una volta creato
+    viene mantenuto aggiornato da -u, -n, -t, -ft e --watch.
+    """
+    model = CheckConsistency()
+    manifest = LoadManifest()
+    LoadNotesData(model, manifest)
+    UpdateDatabase(model, create=True)
+    print(f"Database '{os.path.relpath(DATABASE_FILE, VAULT_DIR)}' aggiornato.")
 
-            print(f"File settimanale aggiornato: {os.path.relpath(weekly_file_path, VAULT_DIR)}")
+def DateFilter(date_from, date_until, column="notes.date"):
+    """
+    Ritorna la clausola WHERE e i parametri per limitare una query a un intervallo di date.
+    """
+    clauses, params = [], []
+    if date_from:
+        clauses.append(f"{column} >= ?")
+        params.append(date_from.isoformat())
+    if date_until:
+        clauses.append(f"{column} <= ?")
+        params.append(date_until.isoformat())
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
 
+def DatabaseReport(kind, date_from=None, date_until=None):
+    """
+    Stampa un resoconto (tags, time o stats) calcolato con query SQL sul database,
+    eventualmente limitato a un intervallo di date.
+    """
+    db = OpenDatabase()
+    if db is None:
+        print("Errore: database non presente, crealo con --db.")
+        sys.exit(1)
+    where, params = DateFilter(date_from, date_until)
+    try:
+        if kind == "tags":
+            rows = db.execute(f"SELECT tag, COUNT(DISTINCT tags.rel) FROM tags JOIN notes ON notes.rel = tags.rel{where} "
+                              "GROUP BY tag ORDER BY tag", params).fetchall()
+            for tag, count in rows:
+                print(f"- {tag}: {count}")
+            print(f"{len(rows)} tag.")
+        elif kind == "time":
+            rows = db.execute(f"SELECT project, SUM(hours), COUNT(DISTINCT time_entries.rel) FROM time_entries "
+                              f"JOIN notes ON notes.rel = time_entries.rel{where} GROUP BY project ORDER BY SUM(hours) DESC, project", params).fetchall()
+            for project, hours, days in rows:
+                print(f"- {project}: {hours} ore in {days} giorni")
+            print(f"Totale: {sum(row[1] for row in rows)} ore.")
+        else:
+            rows = db.execute(f"SELECT year, COUNT(*), SUM(words), MIN(date), MAX(date) FROM notes{where} "
+                              "GROUP BY year ORDER BY year", params).fetchall()
+            for year, count, words, first, last in rows:
+                print(f"- {year}: {count} note, {words} parole (media {words // count}), dal {first} al {last}")
+            where_assets, params_assets = DateFilter(date_from, date_until, "assets.date")
+            assets, size = db.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM assets{where_assets}", params_assets).fetchone()
+            print(f"Totale: {sum(row[1] for row in rows)} note, {sum(row[2] for row in rows)} parole, {assets} asset ({size / 1024 / 1024:.1f} MB).")
     except Exception as e:
-        print(f"Errore durante la generazione dei file settimanali: {e}")
+        print(f"Errore durante la lettura del database: {e}")
+    finally:
+        db.close()
 
-def DeleteWeekLog():
+#####################
+## WATCH FUNCTIONS ##
+#####################
+def IndexRenderers():
     """
-    Elimina tutte le cartelle 'weeks' presenti all'interno delle cartelle 'YYYY/'.
+    Ritorna le coppie (file generato, funzione che ne produce il contenuto dal modello).
+    """
+    return [
+        (MAIN_INDEX_FILE, RenderMainIndex),
+        (TAGS_INDEX_FILE, RenderTagsIndex),
+        (TIME_INDEX_FILE, RenderTimeIndex),
+        (CALE_INDEX_FILE, RenderCalendarIndex),
+        (STAT_INFO_FILE, RenderStatistics),
+        (TAGS_CACHE_FILE, RenderTagCache),
+        (TIME_LEDGER_FILE, RenderTimeLedger),
+        (ASSETS_INDEX_FILE, RenderAssetIndex),
+    ]
+
+def RefreshIndexes(model, written):
+    """
+    Rigenera in memoria tutti gli indici e scrive solo quelli il cui contenuto è cambiato
+    rispetto all'ultima versione scritta (written: file -> contenuto).
+    """
+    for file_path, render in IndexRenderers():
+        content = render(model)
+        if written.get(file_path) == content:
+            continue
+        written[file_path] = content
+        if not WriteIndexFile(file_path, content):
+            continue
+        print(f"[{datetime.now():%H:%M:%S}] Aggiornato '{os.path.relpath(file_path, VAULT_DIR)}'")
+
+def ApplyNoteChange(model, manifest, file_path):
+    """
+    Aggiorna il modello dopo la modifica, creazione o cancellazione di un solo file del vault.
+    Rilegge solo la nota toccata. Ritorna True se il modello è cambiato.
+    """
+    notename = os.path.basename(file_path)
+    if not notename.endswith(".md") or notename in LOCKED_FILES:
+        return False
+    relative_path = os.path.relpath(file_path, VAULT_DIR).replace("\\", "/")
+    note_date = ParseNoteDate(notename)
+    if note_date is None:
+        if os.path.exists(file_path):
+            print(f"Attenzione: la nota '{relative_path}' non rispetta il formato YYYY-MM-DD.md, viene ignorata.")
+        return False
+
+    current = model["notes"].get(note_date)
+    if not os.path.exists(file_path):
+        # Nota cancellata o rinominata
+        if not current or current["rel"] != relative_path:
+            return False
+        del model["notes"][note_date]
+        manifest["notes"].pop(relative_path, None)
+        manifest["dirty"] = True
+        return True
+
+    if current and current["rel"] != relative_path and os.path.exists(current["path"]):
+        print(f"Attenzione: la nota '{relative_path}' è un duplicato di '{current['rel']}', viene ignorata.")
+        return False
+    note = MakeModelNote(relative_path, note_date)
+    note.update(GetNoteData(manifest, file_path, relative_path))
+    model["notes"][note_date] = note
+    return True
+
+def OpenInotify():
     """
+    Apre un'istanza inotify tramite la libc (solo Linux).
+    Ritorna un dizionario con la libc, il file descriptor e le directory osservate,
+    oppure None se inotify non è disponibile.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
     try:
-        # Scansiona il VAULT_DIR per trovare tutte le cartelle 'weeks'
-        for root, dirs, files in os.walk(VAULT_DIR):
-            for dir_name in dirs:
-                if dir_name == D_WEEKS:
-                    weeks_dir_path = os.path.join(root, dir_name)
-                    # Elimina la cartella 'weeks' e tutto il suo contenuto
-                    shutil.rmtree(weeks_dir_path)
-                    print(f"Cartella eliminata: {os.path.relpath(weeks_dir_path, VAULT_DIR)}")
-    except Exception as e:
-        print(f"Errore durante l'eliminazione delle cartelle 'weeks': {e}")
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    return {"libc": libc, "fd": fd, "dirs": {}}
 
-def DoBackup(includeAssets):
+def InotifyAddWatch(watcher, dir_path):
     """
-    Crea un backup in formato .tar del diario.
-    Mostra una finestra grafica per scegliere nome e percorso di salvataggio.
-    
-    :param include_assets: se False esclude assets/ e weeks/
+    Aggiunge una directory alle directory osservate da inotify.
     """
+    if dir_path in watcher["dirs"].values():
+        return
+    wd = watcher["libc"].inotify_add_watch(watcher["fd"], os.fsencode(str(dir_path)), INOTIFY_MASK)
+    if wd >= 0:
+        watcher["dirs"][wd] = str(dir_path)
 
-    # Nasconde la finestra principale Tk
-    root = tk.Tk()
-    root.withdraw()
-    
-    root.attributes('-topmost', True) # sempre in primo piano
+def InotifyReadEvents(watcher, timeout):
+    """
+    Attende eventi inotify fino a timeout secondi.
+    Ritorna la lista di (directory, nome del file, maschera dell'evento).
+    """
+    import select
+    import struct
 
-    # Data odierna in formato YYYY-MM-DD
-    today = datetime.now().strftime("%Y-%m-%d")
+    events = []
+    ready, _, _ = select.select([watcher["fd"]], [], [], timeout)
+    if not ready:
+        return events
+    while True:
+        try:
+            data = os.read(watcher["fd"], 64 * 1024)
+        except BlockingIOError:
+            break
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = struct.unpack_from("iIII", data, offset)
+            name = data[offset + 16:offset + 16 + length].rstrip(b"\0")
+            events.append((watcher["dirs"].get(wd), os.fsdecode(name), mask))
+            offset += 16 + length
+    return events
 
-    # Nome file con data inclusa
-    default_name = f"backup-journal-{today}.tar"
-    
-    # Finestra "Salva con nome"
-    file_path = filedialog.asksaveasfilename(
-        title="Salva backup",
-        defaultextension=".tar",
-        filetypes=[("Tar archive", "*.tar")],
-        initialdir=os.getcwd(),
-        initialfile=default_name
-    )
+def PollSnapshot():
+    """
+    Ritorna lo stat (mtime, dimensione) di tutte le note .md delle directory YYYY, senza leggerle.
+    """
+    snapshot = {}
+    for year_dir in YearDirs():
+        with os.scandir(year_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".md") and entry.is_file():
+                    st = entry.stat()
+                    snapshot[entry.path] = (st.st_mtime_ns, st.st_size)
+    return snapshot
 
-    if not file_path:
-        print("Backup annullato.")
-        sys.exit(1)
+def SecondsToMidnight():
+    """
+    Ritorna i secondi che mancano alla prossima mezzanotte locale (piú un secondo di margine,
+    cosí al risveglio date.today() è giá il giorno nuovo).
+    """
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds() + 1
 
-    # Creazione archivio tar
-    with tarfile.open(file_path, "w") as tar:
-        for root_dir, dirs, files in os.walk(VAULT_DIR):
-            # Se non vogliamo includere assets e weeks → li escludiamo
-            if not includeAssets:
-                # Escludi cartelle "assets" e "weeks"
-                dirs[:] = [d for d in dirs if d not in [D_ASSETS, D_WEEKS]]
-            else:
-                dirs[:] = [d for d in dirs if d not in [D_WEEKS]]
+def WaitForChanges(watcher, snapshot):
+    """
+    Attende la prossima modifica del vault e ritorna l'insieme dei file toccati.
+    Con inotify raccoglie gli eventi arrivati entro WATCH_DEBOUNCE secondi (un salvataggio
+    dell'editor ne genera diversi), altrimenti confronta periodicamente lo stat delle note.
+    A mezzanotte ritorna anche senza modifiche (insieme vuoto), per aggiornare gli indici al nuovo giorno.
+    """
+    changed = set()
+    if watcher is None:
+        while not changed and date.today() == today:
+            time.sleep(WATCH_POLL_INTERVAL)
+            current = PollSnapshot()
+            changed = {path for path in current.keys() | snapshot.keys() if current.get(path) != snapshot.get(path)}
+            snapshot.clear()
+            snapshot.update(current)
+        return changed
 
-            for file in files:
-                full_path = os.path.join(root_dir, file)
-                # Path relativo per mantenere struttura dentro il tar
-                arcname = os.path.relpath(full_path, start=os.path.dirname(VAULT_DIR))
-                tar.add(full_path, arcname=arcname)
+    events = InotifyReadEvents(watcher, SecondsToMidnight())
+    while events:
+        for dir_path, name, mask in events:
+            if dir_path is None or not name:
+                continue
+            path = os.path.join(dir_path, name)
+            if mask & INOTIFY_IS_DIR:
+                # Nuova directory dell'anno: va osservata anche lei
+                if os.path.normpath(dir_path) == os.path.normpath(VAULT_DIR) and re.fullmatch(r"\d{4}", name) and os.path.isdir(path):
+                    InotifyAddWatch(watcher, path)
+                    with os.scandir(path) as entries:
+                        changed.update(entry.path for entry in entries if entry.name.endswith(".md"))
+                continue
+            if os.path.normpath(dir_path) != os.path.normpath(VAULT_DIR):
+                changed.add(path)
+        events = InotifyReadEvents(watcher, WATCH_DEBOUNCE)
+    return changed
 
+def WatchVault():
+    """
+    Carica il vault una sola volta e resta in ascolto delle modifiche alle note.
+    A ogni modifica rilegge solo le note toccate e riscrive solo gli indici
+    (main, tags, time, calendar e statistiche) il cui contenuto è cambiato.
+    Usa inotify dove disponibile, altrimenti controlla lo stat delle note ogni WATCH_POLL_INTERVAL secondi.
+    """
+    model = CheckConsistency()
+    manifest = LoadManifest()
+    LoadNotesData(model, manifest)
 
-## MAIN FUNCTION ##
-def main():  
-    # Creazione del parser
-    parser = argparse.ArgumentParser(
-        prog="JournalScript.py",
-        description="Make script per gestire la conversione di note in PDF. Tips: genera un repo git vuoto e inserisci questo come un sottomodulo prima di lanciare un --init",
-        epilog="Freeware Licence 2025 Fabio. Maintainer: BenettiFabio",
-        add_help=False
-    )
-    # Aggiunta delle opzioni
-    parser.add_argument("-i", "--init",     action="store_true",    help="Inizializza la struttura del vault in modo che sia consistente per journal il make.py")
-    parser.add_argument("-n", "--new",      action="store_true",    help="Aggiunge una nota vuota al giorno corrente (se non esiste già)")
-    parser.add_argument("-u", "--update",   action="store_true",    help="Aggiorna l'indice in main-index.md con tutte le note presenti ed eventuali tag aggiunti manualmente")
-    parser.add_argument("-cc", "--check-consistency",   action="store_true",    help="Check di consistenza dei nomi delle note nel vault")
-    parser.add_argument("-ft", "--fast-tag",                        nargs=1,        metavar="TAGNAME",  help="Inserisce alla nota di oggi")
-    parser.add_argument("-t", "--tag",                              nargs=2,        metavar=("TAGNAME", "DAY-NOTE"),  help="Inserisce alla nota specificata il tag scelto")
-    parser.add_argument("-lt", "--list-tag",action="store_true",    help="lista dei tag presenti in tutto il vault")
-    parser.add_argument("-w", "--week", nargs="?", const="current", metavar="YYYY", help="Genera i weekly log solo per l'anno corrente o per l'anno specificato (es: -w YYYY)")
-    parser.add_argument("-cw", "--clean-week",action="store_true",  help="effettua una pulizia di tutte le note settimanali per pulire il repo dai resoconti ripetitivi")
-    parser.add_argument("-b", "--backup",     action="store_true",  help="Effettua il backup in formato tar di tutta la cartella myjournal, con richiesta di salvare o meno gli assets")
-    parser.add_argument("-v", "--version",    action="store_true",  help="Mostra la versione dello script")
-    parser.add_argument("-h", "--help",       action="store_true",  help="Mostra questo messaggio di aiuto")
+    # Contenuto attuale degli indici su disco, per scrivere solo quelli che cambiano
+    written = {}
+    for file_path, _ in IndexRenderers():
+        if os.path.exists(file_path):
+            with open(file_path, "r", encoding="utf-8") as f:
+                written[file_path] = f.read()
+    RefreshIndexes(model, written)
+    UpdateYearCalendars(model, manifest)
+    UpdateYearIndexes(model, manifest)
+    UpdateTagPages(model, manifest)
+    UpdateYearStatistics(model)
+    SaveManifest(manifest)
+    search_index = UpdateSearchIndex(model)
+    UpdateDatabase(model)
 
-    # Parsing degli argomenti
-    args = parser.parse_args()
+    watcher = OpenInotify()
+    snapshot = {}
+    if watcher:
+        InotifyAddWatch(watcher, VAULT_DIR)
+        for year_dir in YearDirs():
+            InotifyAddWatch(watcher, year_dir)
+        print("In ascolto delle modifiche del vault (inotify), Ctrl+C per terminare...")
+    else:
+        snapshot = PollSnapshot()
+        print(f"In ascolto delle modifiche del vault (controllo ogni {WATCH_POLL_INTERVAL}s), Ctrl+C per terminare...")
+
+    try:
+        while True:
+            changed = WaitForChanges(watcher, snapshot)
+            # Dopo la mezzanotte cambiano l'anno corrente, la streak e la cella di oggi del calendario
+            model_changed = RefreshToday()
+            for file_path in sorted(changed):
+                model_changed |= ApplyNoteChange(model, manifest, file_path)
+            if model_changed:
+                RefreshIndexes(model, written)
+                UpdateYearCalendars(model, manifest)
+                UpdateYearIndexes(model, manifest)
+                UpdateTagPages(model, manifest)
+                UpdateYearStatistics(model)
+                SaveManifest(manifest)
+                UpdateSearchIndex(model, search_index)
+                UpdateDatabase(model)
+    except KeyboardInterrupt:
+        print("\nWatch terminato.")
+    finally:
+        SaveManifest(manifest)
+        if watcher:
+            os.close(watcher["fd"])
+
+######################
+## TIMING FUNCTIONS ##
+######################
+def TimedPhase(name, func):
+    """
+    Avvolge func per misurarne il tempo come fase di --timings.
+    Le fasi annidate (es: UpdateStatistics dentro UpdateIndex) sono registrate con il path
+    della fase padre, nell'ordine in cui iniziano.
+    """
+    def Wrapper(*args, **kwargs):
+        PHASE_STACK.append(name)
+        phase = PHASE_TIMES.setdefault("/".join(PHASE_STACK), [0.0, 0])
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            phase[0] += time.perf_counter() - start
+            phase[1] += 1
+            PHASE_STACK.pop()
+    Wrapper.__name__ = func.__name__
+    Wrapper.__doc__ = func.__doc__
+    return Wrapper
+
+def EnableTimings():
+    """
+    Attiva la misura delle fasi sostituendo le funzioni di TIMED_PHASES con la loro versione misurata.
+    Senza --timings le funzioni restano quelle originali e la misura non costa nulla.
+    """
+    global PHASE_TIMES
+    PHASE_TIMES = {}
+    for name in TIMED_PHASES:
+        globals()[name] = TimedPhase(name, globals()[name])
+
+def TimingsReport(total):
+    """
+    Ritorna il resoconto di --timings: tempo totale, tempo e chiamate di ogni fase e contatori di I/O.
+    """
+    return {
+        "total_ms": round(total * 1000, 3),
+        "phases": [
+            {"phase": phase, "ms": round(seconds * 1000, 3), "calls": calls}
+            for phase, (seconds, calls) in (PHASE_TIMES or {}).items()
+        ],
+        "io": dict(IO_STATS),
+    }
+
+def PrintTimings(total, output="text"):
+    """
+    Stampa il resoconto di --timings. In formato json viene scritto su stderr in una sola riga,
+    cosí puó essere raccolto separatamente dall'output del comando (es: 2> timings.json).
+    """
+    report = TimingsReport(total)
+    if output == "json":
+        print(json.dumps(report, ensure_ascii=False), file=sys.stderr)
+        return
+
+    print(f"\nTempi per fase (totale {report['total_ms']:.1f} ms):")
+    for phase in report["phases"]:
+        depth = phase["phase"].count("/")
+        name = phase["phase"].rsplit("/", 1)[-1]
+        calls = f" x{phase['calls']}" if phase["calls"] > 1 else ""
+        print(f"{phase['ms']:>10.1f} ms  {'  ' * depth}{name}{calls}")
+    io_stats = report["io"]
+    print(f"I/O: {io_stats['stat']} stat, {io_stats['read']} file letti ({FormatSize(io_stats['bytes_read'])}), "
+          f"{io_stats['write']} file scritti ({FormatSize(io_stats['bytes_written'])})")
+
+def PrintBanner():
+    """
+    Stampa il titolo dello script in ASCII art, se pyfiglet è installato.
+    """
+    try:
+        import pyfiglet
+        print(pyfiglet.figlet_format("Journal Script", font="chunky"))
+    except ImportError:
+        print("Journal Script\n")
 
+def RunCommand(args, parser):
+    """
+    Esegue il comando scelto da riga di comando sul vault attivo.
+    """
     # Gestione delle opzioni
     if args.init:
         print(f"Creazione di un vault di partenza...")
@@ -1195,14 +3833,36 @@ def main():
         print("JournalScript v"+JOURNALSCRIPT_VERSION)
     
     elif args.new:
-        print("Creazione di una nuova nota...")
-        AddNewNote()
+        if args.date_from or args.date_until:
+            if not args.date_from or args.note_date:
+                print("Errore: l'opzione --new richiede --from per creare più note (--until facoltativo) e non si combina con --date.")
+                sys.exit(1)
+            print("Creazione delle note mancanti nell'intervallo...")
+            AddNewNotes(args.date_from, args.date_until)
+        else:
+            print("Creazione di una nuova nota...")
+            AddNewNote(args.note_date)
         
     elif args.update:
         print("Aggiornamento dell'indice...")
         UpdateIndex()
         print("Indici (main, tags e calendar) aggiornati! (=^･ｪ･^=)ﾉ")
     
+    elif args.index_layout:
+        print(f"Layout degli indici '{args.index_layout}'...")
+        SetIndexLayout(args.index_layout)
+        print("Indici rigenerati! (=^･ｪ･^=)ﾉ")
+    
+    elif args.tags_layout:
+        print(f"Layout dell'indice dei tag '{args.tags_layout}'...")
+        SetTagsLayout(args.tags_layout)
+        print("Indici rigenerati! (=^･ｪ･^=)ﾉ")
+    
+    elif args.rebuild_cache:
+        print("Ricostruzione della cache e degli indici...")
+        RebuildCache()
+        print("Cache e indici ricostruiti! (=^･ｪ･^=)ﾉ")
+    
     elif args.check_consistency:
         print("Check dei nomi in corso...")
         CheckConsistency()
@@ -1228,11 +3888,42 @@ def main():
         print("Elenco dei tag presenti nel vault...")
         TagList()
     
+    elif args.search:
+        print(f"Ricerca di '{args.search}' nelle note...")
+        SearchVault(args.search, args.date_from, args.date_until, args.tagged)
+    
+    elif args.query:
+        print(f"Note che soddisfano '{args.query}'...")
+        QueryTags(args.query, args.date_from, args.date_until)
+    
+    elif args.time:
+        print("Resoconto delle ore per progetto...")
+        TimeReport(args.group, args.date_from, args.date_until, args.project)
+    
+    elif args.assets:
+        print("Resoconto degli asset del vault...")
+        AssetReport(args.assets)
+    
+    elif args.db:
+        print("Aggiornamento del database dei metadati...")
+        EnableDatabase()
+    
+    elif args.report:
+        print(f"Resoconto '{args.report}' dal database...")
+        DatabaseReport(args.report, args.date_from, args.date_until)
+    
+    elif args.fmt:
+        print("Formattazione delle note...")
+        FormatVault(args.date_from, args.date_until)
+    
     elif args.week:
         success = True
         if args.week == "current":
             print("Genero i Weekly log per l'anno corrente...")
             WeekLog()
+        elif args.week == "all":
+            print("Genero i Weekly log per tutti gli anni...")
+            WeekLog("all")
         else:
             year_dir = os.path.join(VAULT_DIR, str(args.week))
             if not os.path.exists(year_dir):
@@ -1245,35 +3936,167 @@ def main():
         if success:
             print("Weekly Log generati! =^._.^=ﾉ")
         
+    elif args.watch:
+        print("Avvio del watch del vault...")
+        WatchVault()
+        
     elif args.clean_week:
         print("Pulizia dei Weekly log...")
         DeleteWeekLog()
         print("Weekly log eliminati!. (=^･ｪ･^=)ﾉ")
         
-    elif args.backup:
-        include_assets = False
+    elif args.backup_store:
+        print("Generazione del backup nell'archivio a contenuto...")
+        BackupToStore(args.backup_assets, args.backup_store)
+        print("Backup Eseguito con successo!")
+    
+    elif args.restore:
+        print("Ripristino del vault dall'archivio a contenuto...")
+        RestoreFromStore(args.restore, args.restore_to, args.snapshot)
+    
+    elif args.backup or args.backup_to:
+        include_assets = args.backup_assets
         print("Generazione del backup...")
         
-        assets_choice = input("Inserire anche gli assets? [YySs/Nn] (vuoto per saltarli): ")
-        
-        if assets_choice.lower() not in ["y", "s", "n", ""]:
-            print("Scelta non valida, backup annullato...")
-            sys.exit(1)
-        elif assets_choice.lower() in ["y", "s"]:
-            include_assets = True
+        if not args.backup_to:
+            assets_choice = input("Inserire anche gli assets? [YySs/Nn] (vuoto per saltarli): ")
+            
+            if assets_choice.lower() not in ["y", "s", "n", ""]:
+                print("Scelta non valida, backup annullato...")
+                sys.exit(1)
+            elif assets_choice.lower() in ["y", "s"]:
+                include_assets = True
         
-        DoBackup(include_assets)
+        DoBackup(include_assets, args.backup_to, args.backup_mode, args.compress)
         print("Backup Eseguito con successo!")
         
     elif args.help:
-        print(pyfiglet.figlet_format("Journal Script", font="chunky"))
+        PrintBanner()
         parser.print_help()
         sys.exit(0)
     else:
         print("Errore: nessuna opzione valida selezionata.")
-        print(pyfiglet.figlet_format("Journal Script", font="chunky"))
+        PrintBanner()
         parser.print_help()
         sys.exit(0)
 
+    PrintWriteSummary()
+
+## MAIN FUNCTION ##
+def main():  
+    global JOBS
+
+    # Creazione del parser
+    parser = argparse.ArgumentParser(
+        prog="JournalScript.py",
+        description="Make script per gestire la conversione di note in PDF. Tips: genera un repo git vuoto e inserisci questo come un sottomodulo prima di lanciare un --init",
+        epilog="Freeware Licence 2025 Fabio. Maintainer: BenettiFabio",
+        add_help=False
+    )
+    # Aggiunta delle opzioni
+    parser.add_argument("-i", "--init",     action="store_true",    help="Inizializza la struttura del vault in modo che sia consistente per journal il make.py")
+    parser.add_argument("-n", "--new",      action="store_true",    help="Aggiunge una nota vuota al giorno corrente (se non esiste già), al giorno di --date o a tutti i giorni tra --from e --until")
+    parser.add_argument("--date",  dest="note_date", type=ParseDateOption, metavar="YYYY-MM-DD", help="Giorno della nota da creare con --new (default oggi)")
+    parser.add_argument("-u", "--update",   action="store_true",    help="Aggiorna l'indice in main-index.md con tutte le note presenti ed eventuali tag aggiunti manualmente")
+    parser.add_argument("-rc", "--rebuild-cache", action="store_true", help="Elimina la cache delle note e rigenera tutti gli indici rileggendo l'intero vault")
+    parser.add_argument("--index-layout",   choices=["single", "year"], help="Layout di main-, tags- e time-index.md: un unico file (single) o un indice per anno in YYYY/indexes/ con un riepilogo in cima al vault (year)")
+    parser.add_argument("--tags-layout",    choices=["single", "tag", "letter"], help="Layout di tags-index.md: un unico file (single) o l'elenco dei tag con una pagina per tag (tag) o per iniziale (letter) in indexes/tags/")
+    parser.add_argument("-cc", "--check-consistency",   action="store_true",    help="Check di consistenza dei nomi delle note nel vault")
+    parser.add_argument("-ft", "--fast-tag",                        nargs=1,        metavar="TAGNAME",  help="Inserisce alla nota di oggi")
+    parser.add_argument("-t", "--tag",                              nargs=2,        metavar=("TAGNAME", "DAY-NOTE"),  help="Inserisce alla nota specificata il tag scelto")
+    parser.add_argument("-lt", "--list-tag",action="store_true",    help="lista dei tag presenti in tutto il vault")
+    parser.add_argument("-s", "--search",   metavar="QUERY",        help='Cerca parole o frasi tra virgolette (es: -s \'"riunione di progetto" budget\') nel contenuto delle note')
+    parser.add_argument("-q", "--query",    metavar="QUERY",        help='Elenca le note che soddisfano una query sui tag con AND, OR, NOT e parentesi (es: -q "lavoro AND NOT ferie")')
+    parser.add_argument("--from",  dest="date_from", type=ParseDateOption, metavar="YYYY-MM-DD", help="Considera solo le note a partire da questa data (per --search, --query, --report, --fmt e --time) o crea le note da questa data (per --new)")
+    parser.add_argument("--until", dest="date_until", type=ParseDateOption, metavar="YYYY-MM-DD", help="Considera solo le note fino a questa data compresa (per --search, --query, --report, --fmt e --time) o crea le note fino a questa data, default oggi (per --new)")
+    parser.add_argument("--tagged", action="append", metavar="TAGNAME", help="Considera solo le note con questo tag, ripetibile (per --search)")
+    parser.add_argument("--time",           action="store_true",    help="Resoconto delle ore per progetto dal registro delle ore (con --group, --project, --from e --until)")
+    parser.add_argument("--group",          type=ParseTimeGroup, default="month", metavar="PERIODO", help="Raggruppamento di --time: day, week, month (default), year, total o Nd (es: 14d)")
+    parser.add_argument("--project",        action="append",        metavar="PROGETTO", help="Considera solo questo progetto, ripetibile (per --time)")
+    parser.add_argument("-a", "--assets",   nargs="?", const="all", choices=["orphans", "broken", "usage", "all"], help="Resoconto degli asset: orfani, link non validi e spazio occupato per anno (default tutti)")
+    parser.add_argument("--db",             action="store_true",    help="Crea il database SQLite dei metadati del vault (note, tag, ore, sezioni, asset e link agli asset), poi aggiornato da ogni comando")
+    parser.add_argument("-r", "--report",   choices=["tags", "time", "stats"], help="Resoconto di tag, ore o statistiche calcolato dal database (con --from e --until)")
+    parser.add_argument("--fmt",            action="store_true",    help="Ottimizza gli spazi di tutte le note del vault (o solo tra --from e --until), riscrivendo solo quelle cambiate")
+    parser.add_argument("-w", "--week", nargs="?", const="current", metavar="YYYY", help="Genera i weekly log solo per l'anno corrente, per l'anno specificato (es: -w YYYY) o per tutti gli anni (-w all)")
+    parser.add_argument("-wa", "--watch",      action="store_true",  help="Resta in ascolto delle modifiche alle note e aggiorna automaticamente gli indici")
+    parser.add_argument("-cw", "--clean-week",action="store_true",  help="effettua una pulizia di tutte le note settimanali per pulire il repo dai resoconti ripetitivi")
+    parser.add_argument("-b", "--backup",     action="store_true",  help="Effettua il backup in formato tar di tutta la cartella myjournal, con richiesta di salvare o meno gli assets")
+    parser.add_argument("--backup-to",      metavar="PATH",         help="Effettua il backup senza finestre né domande nel file o nella cartella indicata (es: da cron)")
+    parser.add_argument("--backup-mode",    choices=["full", "diff", "incr"], default="full", help="Backup completo (default), differenziale (file cambiati dall'ultimo completo) o incrementale (file cambiati dall'ultimo backup)")
+    parser.add_argument("--backup-assets",  action="store_true",    help="Include gli assets nel backup senza chiederlo (per --backup-to e --backup-store)")
+    parser.add_argument("--backup-store",   metavar="DIR",          help="Effettua il backup senza interazione in un archivio a contenuto (ogni file salvato una sola volta per hash)")
+    parser.add_argument("--restore",        metavar="DIR",          help="Ricostruisce myjournal/ da un archivio creato con --backup-store (con --snapshot e --restore-to)")
+    parser.add_argument("--snapshot",       metavar="NOME",         help="Snapshot da ripristinare con --restore (default l'ultimo)")
+    parser.add_argument("--restore-to",     metavar="DIR", default=".", help="Cartella in cui ricostruire myjournal/ con --restore (default la cartella corrente)")
+    parser.add_argument("--compress",       choices=["gz", "bz2", "xz"], help="Comprime l'archivio del backup")
+    parser.add_argument("--vault",          action="append",        metavar="PATH", help="Vault su cui eseguire il comando invece di ../myjournal; ripetibile per eseguirlo su piú vault in un solo processo")
+    parser.add_argument("--vault-list",     metavar="FILE",         help="File con un vault per riga su cui eseguire il comando in un solo processo (es: uno per membro del team)")
+    parser.add_argument("-j", "--jobs",       type=int, metavar="N",  help=f"Numero di thread usati per leggere le note (default {JOBS}, 1 per lettura seriale)")
+    parser.add_argument("--timings",        nargs="?", const="text", choices=["text", "json"], help="Al termine del comando riporta il tempo di ogni fase e i file letti, scritti e controllati (json: una riga su stderr)")
+    parser.add_argument("--profile",        metavar="FILE",         help="Salva il profilo cProfile del comando in FILE (da leggere con python -m pstats FILE)")
+    parser.add_argument("-v", "--version",    action="store_true",  help="Mostra la versione dello script")
+    parser.add_argument("-h", "--help",       action="store_true",  help="Mostra questo messaggio di aiuto")
+
+    # Parsing degli argomenti
+    args = parser.parse_args()
+
+    # Opzioni globali
+    if args.jobs is not None:
+        if args.jobs < 1:
+            print("Errore: l'opzione --jobs richiede un numero di thread maggiore di zero.")
+            sys.exit(1)
+        JOBS = args.jobs
+    if args.timings:
+        EnableTimings()
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start = time.perf_counter()
+
+    # Vault su cui eseguire il comando: quello accanto allo script oppure quelli di --vault e --vault-list
+    vaults = [Vault(path) for path in args.vault or []]
+    if args.vault_list:
+        try:
+            vaults += ReadVaultList(args.vault_list)
+        except OSError as e:
+            print(f"Errore durante la lettura dell'elenco dei vault: {e}")
+            sys.exit(1)
+    if args.watch and len(vaults) > 1:
+        print("Errore: l'opzione --watch accetta un solo vault.")
+        sys.exit(1)
+
+    failed = []
+    if len(vaults) <= 1 or args.version or args.help:
+        (vaults[0] if vaults else Vault(VAULT_DIR)).Activate()
+        RunCommand(args, parser)
+    else:
+        # Modalitá batch: un solo processo per tutti i vault, template e thread di lettura restano caldi
+        for vault in vaults:
+            vault.Activate()
+            print(f"\n=== Vault {vault.root} ===")
+            if not args.init and not vault.root.is_dir():
+                print(f"Errore: La directory '{vault.root}' non esiste.")
+                failed.append(str(vault.root))
+                continue
+            try:
+                RunCommand(args, parser)
+            except SystemExit as e:
+                if e.code:
+                    failed.append(str(vault.root))
+            WRITE_STATS.update(written=0, unchanged=0)
+        print(f"\nComando eseguito su {len(vaults) - len(failed)} vault su {len(vaults)}.")
+        for vault_root in failed:
+            print(f"- non riuscito: {vault_root}")
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        print(f"Profilo salvato in {args.profile} (python -m pstats {args.profile})")
+    if args.timings:
+        PrintTimings(time.perf_counter() - start, args.timings)
+    if failed:
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
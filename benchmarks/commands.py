@@ -0,0 +1,186 @@
+"""
+Benchmark dei comandi di JournalScript.py su vault sintetici di dimensione crescente.
+
+Per ogni dimensione genera con genvault.py un vault deterministico in una cartella
+temporanea, lancia ogni comando in un nuovo processo piú volte e riporta la mediana
+del tempo, il throughput (note al secondo) e il picco di memoria del processo.
+I risultati possono essere salvati e confrontati con una baseline, come per startup.py.
+
+Uso:
+    python benchmarks/commands.py
+    python benchmarks/commands.py --years 1,5,20 --runs 3 --save commands-baseline.json
+    python benchmarks/commands.py --baseline commands-baseline.json --tolerance 0.25
+    python benchmarks/commands.py --only update-cold,week
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from genvault import BuildLayout, END_YEAR
+
+# Codice eseguito in-process per misurare solo le statistiche (non hanno un comando dedicato)
+STATISTICS_SNIPPET = (
+    "import sys; sys.path.insert(0, sys.argv[1]); import JournalScript as js; "
+    "model = js.ScanVault(); js.LoadNotesData(model, js.LoadManifest()); js.UpdateStatistics(model)"
+)
+
+def RemoveWeeks(ctx):
+    for weeks_dir in glob.glob(os.path.join(ctx["vault"], "*", "weeks")):
+        shutil.rmtree(weeks_dir)
+
+def RemoveNewNote(ctx):
+    note_path = os.path.join(ctx["vault"], str(END_YEAR + 1), f"{END_YEAR + 1}-01-01.md")
+    if os.path.exists(note_path):
+        os.remove(note_path)
+
+def EmptyBackupDir(ctx):
+    shutil.rmtree(ctx["backup"], ignore_errors=True)
+    os.makedirs(ctx["backup"])
+
+# Nome del caso -> (argomenti dello script per l'esecuzione i-esima, preparazione prima di ogni esecuzione)
+COMMANDS = [
+    ("update-cold", lambda ctx, i: ["-rc"], None),
+    ("update", lambda ctx, i: ["-u"], None),
+    ("check-consistency", lambda ctx, i: ["-cc"], None),
+    ("statistics", lambda ctx, i: ["-c", STATISTICS_SNIPPET, ctx["script_dir"]], None),
+    ("week", lambda ctx, i: ["-w", "all"], RemoveWeeks),
+    ("new", lambda ctx, i: ["-n", "--date", f"{END_YEAR + 1}-01-01"], RemoveNewNote),
+    ("tag", lambda ctx, i: ["-t", f"bench{i}", ctx["first_note"]], None),
+    ("backup", lambda ctx, i: ["--backup-to", ctx["backup"], "--backup-assets"], EmptyBackupDir),
+]
+
+def RunCommand(argv):
+    """
+    Esegue un processo e ritorna (millisecondi, picco di memoria in MB o None se non misurabile, exit code).
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)  # Processo giá raccolto da wait4
+        # ru_maxrss è in KB su Linux e in byte su macOS
+        peak_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    else:
+        process.wait()
+        peak_mb = None
+    return (time.perf_counter() - start) * 1000, peak_mb, process.returncode
+
+def TimeCase(ctx, args_fn, prepare, runs):
+    """
+    Esegue un caso `runs` volte e ritorna la mediana del tempo e il picco di memoria massimo.
+    Se un'esecuzione termina con errore il caso viene interrotto e ritorna None:
+    un comando fallito non deve diventare un campione (magari piú veloce) da confrontare.
+    """
+    samples, peaks = [], []
+    for i in range(runs):
+        if prepare:
+            prepare(ctx)
+        args = args_fn(ctx, i)
+        argv = [sys.executable] + (args if args[0] == "-c" else [ctx["script"]] + args)
+        elapsed, peak, exit_code = RunCommand(argv)
+        if exit_code != 0:
+            print(f"Errore: '{' '.join(args)}' è terminato con exit code {exit_code}, caso scartato.")
+            return None
+        samples.append(elapsed)
+        if peak is not None:
+            peaks.append(peak)
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "notes_per_s": ctx["notes"] / (statistics.median(samples) / 1000),
+        "peak_mb": max(peaks) if peaks else None,
+    }
+
+def Compare(results, baseline, tolerance):
+    """
+    Ritorna le regressioni di tempo e memoria oltre la tolleranza rispetto alla baseline.
+    """
+    regressions = []
+    for key, res in results.items():
+        old = baseline.get(key)
+        if not old:
+            continue
+        if res["median_ms"] > old["median_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: {old['median_ms']:.1f}ms -> {res['median_ms']:.1f}ms")
+        if res["peak_mb"] and old.get("peak_mb") and res["peak_mb"] > old["peak_mb"] * (1 + tolerance):
+            regressions.append(f"{key}: {old['peak_mb']:.1f}MB -> {res['peak_mb']:.1f}MB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dei comandi di JournalScript.py su vault sintetici")
+    parser.add_argument("--years", default="1,3,10", help="Dimensioni del vault in anni, separate da virgola (default 1,3,10)")
+    parser.add_argument("--notes-per-year", type=int, default=300, help="Note per anno (default 300)")
+    parser.add_argument("--tags", type=int, default=20, help="Tag distinti (default 20)")
+    parser.add_argument("--time-bullets", type=int, default=4, help="Righe medie di ## time per nota (default 4)")
+    parser.add_argument("--assets", type=float, default=0.1, help="Frazione di note con un asset (default 0.1)")
+    parser.add_argument("--words", type=int, default=120, help="Parole medie di ## note (default 120)")
+    parser.add_argument("--runs", type=int, default=5, help="Esecuzioni per comando (default 5)")
+    parser.add_argument("--only", help="Esegue solo questi comandi, separati da virgola")
+    parser.add_argument("--save", metavar="FILE", help="Salva i risultati in formato JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="Confronta con dei risultati salvati in precedenza")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Peggioramento massimo accettato rispetto alla baseline (default 0.20 = 20%%)")
+    args = parser.parse_args()
+
+    only = set(args.only.split(",")) if args.only else None
+    commands = [c for c in COMMANDS if only is None or c[0] in only]
+    results = {}
+    failed = []
+    print(f"{'note':>7} {'comando':<18} {'mediana':>10} {'note/s':>10} {'memoria':>9}")
+    for years in map(int, args.years.split(",")):
+        with tempfile.TemporaryDirectory(prefix="journal-bench-") as root:
+            script, notes = BuildLayout(root, years=years, notes_per_year=args.notes_per_year, tags=args.tags,
+                                        time_bullets=args.time_bullets, assets=args.assets, words=args.words)
+            vault = os.path.join(root, "myjournal")
+            first_year = os.path.join(vault, str(END_YEAR - years + 1))
+            ctx = {
+                "script": script,
+                "script_dir": os.path.dirname(script),
+                "vault": vault,
+                "notes": notes,
+                "first_note": sorted(f for f in os.listdir(first_year) if f.endswith(".md"))[0],
+                "backup": os.path.join(root, "backup"),
+            }
+            # Prima esecuzione a vuoto: crea indici e cache come in un vault giá in uso
+            subprocess.run([sys.executable, script, "-u"], stdout=subprocess.DEVNULL, check=True)
+
+            for name, args_fn, prepare in commands:
+                res = TimeCase(ctx, args_fn, prepare, args.runs)
+                if res is None:
+                    failed.append(f"{notes}/{name}")
+                    continue
+                results[f"{notes}/{name}"] = res
+                peak = f"{res['peak_mb']:.1f}MB" if res["peak_mb"] is not None else "-"
+                print(f"{notes:>7} {name:<18} {res['median_ms']:>8.1f}ms {res['notes_per_s']:>10.0f} {peak:>9}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+        print(f"Risultati salvati in {args.save}")
+
+    if failed:
+        print("Comandi falliti (non salvati né confrontati):")
+        for key in failed:
+            print(f"- {key}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = Compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressioni rispetto alla baseline:")
+            for line in regressions:
+                print(f"- {line}")
+            sys.exit(1)
+        print("Nessuna regressione rispetto alla baseline.")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Generatore deterministico di vault sintetici per i benchmark di JournalScript.py.
+
+Crea un vault con la struttura reale YYYY/YYYY-MM-DD.md e note costruite come
+templates/void-notes.md (## note, ## time, ## tags, ## next, ## refs), con assets
+in YYYY/assets/ collegati dalle note. A paritá di parametri e seed il vault generato
+è sempre identico, cosí i tempi misurati su macchine e giorni diversi sono confrontabili.
+
+Uso:
+    python benchmarks/genvault.py /tmp/prova/myjournal --years 5 --notes-per-year 300
+    python benchmarks/genvault.py /tmp/prova/myjournal --tags 40 --time-bullets 6 --assets 0.2 --words 250
+"""
+import argparse
+import os
+import random
+import shutil
+from datetime import date, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ultimo anno generato di default: fisso, cosí il vault non cambia con la data di oggi
+END_YEAR = 2024
+
+WORDS = (
+    "riunione progetto budget cliente revisione codice test rilascio documentazione analisi "
+    "requisiti design architettura prototipo bug fix deploy server database backup rete "
+    "idea lettura libro corsa palestra cena amici famiglia viaggio treno aereo montagna mare "
+    "spesa casa giardino musica film serie studio esame appunti lezione seminario conferenza "
+    "telefonata email scadenza priorità obiettivo piano settimana mese anno bilancio nota"
+).split()
+
+def NoteDays(rng, year, notes_per_year):
+    """
+    Sceglie in modo deterministico i giorni dell'anno che hanno una nota, in ordine.
+    """
+    first = date(year, 1, 1)
+    days = (date(year + 1, 1, 1) - first).days
+    return sorted(first + timedelta(days=d) for d in rng.sample(range(days), min(notes_per_year, days)))
+
+def Sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def RenderNote(rng, note_date, tags, projects, time_bullets, words, asset_names):
+    """
+    Compone il testo di una nota con la struttura di templates/void-notes.md.
+    """
+    lines = [f"# {note_date.strftime('%d-%m-%Y')}", ""]
+    if rng.random() < 0.3:
+        lines += ["## next", "", f"- {Sentence(rng, 5)}", ""]
+
+    lines += ["## note", ""]
+    remaining = max(1, int(rng.gauss(words, words / 4)))
+    while remaining > 0:
+        count = min(remaining, rng.randint(6, 24))
+        lines.append(f"- {Sentence(rng, count)}")
+        remaining -= count
+    for name in asset_names:
+        lines.append(f"- ![{name}](assets/{name})")
+    lines.append("")
+
+    bullets = rng.randint(0, time_bullets * 2) if time_bullets else 0
+    if bullets:
+        lines += ["## time", ""]
+        lines += [f"- {rng.choice(projects)}" for _ in range(bullets)]
+        lines.append("")
+
+    if tags and rng.random() < 0.7:
+        lines += ["## tags", ""]
+        # I primi tag sono piú frequenti, come in un vault reale
+        chosen = {tags[min(int(rng.expovariate(4 / len(tags))), len(tags) - 1)] for _ in range(rng.randint(1, 3))}
+        lines += [f"- {tag}" for tag in sorted(chosen)]
+        lines.append("")
+
+    if rng.random() < 0.1:
+        lines += ["## refs", "", f"- https://example.org/{rng.choice(WORDS)}", ""]
+    return "\n".join(lines)
+
+def GenerateVault(vault_dir, years=3, notes_per_year=300, tags=20, time_bullets=4,
+                  assets=0.1, words=120, asset_size=4096, end_year=END_YEAR, seed=1):
+    """
+    Genera il vault in vault_dir (che non deve esistere) e ritorna il numero di note create.
+    - years: anni generati, fino a end_year compreso
+    - notes_per_year: note per anno (al massimo una per giorno)
+    - tags: tag distinti usati nelle sezioni ## tags
+    - time_bullets: righe medie della sezione ## time (0 per nessuna)
+    - assets: frazione delle note con un asset in YYYY/assets/
+    - words: parole medie della sezione ## note
+    """
+    rng = random.Random(seed)
+    tag_names = [f"tag{i:03d}" for i in range(tags)]
+    projects = [f"Progetto{i}" for i in range(max(1, time_bullets * 2))]
+    os.makedirs(vault_dir)
+
+    created = 0
+    for year in range(end_year - years + 1, end_year + 1):
+        year_dir = os.path.join(vault_dir, str(year))
+        os.makedirs(year_dir)
+        for note_date in NoteDays(rng, year, notes_per_year):
+            asset_names = []
+            if rng.random() < assets:
+                asset_names.append(f"{note_date.isoformat()}-img.png")
+                os.makedirs(os.path.join(year_dir, "assets"), exist_ok=True)
+                with open(os.path.join(year_dir, "assets", asset_names[0]), "wb") as f:
+                    f.write(rng.randbytes(asset_size) if hasattr(rng, "randbytes") else bytes(asset_size))
+            content = RenderNote(rng, note_date, tag_names, projects, time_bullets, words, asset_names)
+            with open(os.path.join(year_dir, f"{note_date.isoformat()}.md"), "w", encoding="utf-8", newline="\n") as f:
+                f.write(content)
+            created += 1
+    return created
+
+def BuildLayout(root, **params):
+    """
+    Crea in root la stessa struttura di un vero journal: root/JournalScript con lo script
+    e i template, accanto al vault root/myjournal generato con GenerateVault(**params).
+    Ritorna (path dello script, note create).
+    """
+    script_dir = os.path.join(root, "JournalScript")
+    os.makedirs(script_dir)
+    shutil.copy(os.path.join(REPO_DIR, "JournalScript.py"), script_dir)
+    shutil.copytree(os.path.join(REPO_DIR, "templates"), os.path.join(script_dir, "templates"))
+    notes = GenerateVault(os.path.join(root, "myjournal"), **params)
+    return os.path.join(script_dir, "JournalScript.py"), notes
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un vault sintetico e deterministico per i benchmark")
+    parser.add_argument("vault_dir", help="Cartella del vault da creare (es: /tmp/prova/myjournal)")
+    parser.add_argument("--years", type=int, default=3, help="Anni generati (default 3)")
+    parser.add_argument("--notes-per-year", type=int, default=300, help="Note per anno (default 300)")
+    parser.add_argument("--tags", type=int, default=20, help="Tag distinti (default 20)")
+    parser.add_argument("--time-bullets", type=int, default=4, help="Righe medie di ## time per nota (default 4)")
+    parser.add_argument("--assets", type=float, default=0.1, help="Frazione di note con un asset (default 0.1)")
+    parser.add_argument("--words", type=int, default=120, help="Parole medie di ## note (default 120)")
+    parser.add_argument("--end-year", type=int, default=END_YEAR, help=f"Ultimo anno generato (default {END_YEAR})")
+    parser.add_argument("--seed", type=int, default=1, help="Seed del generatore (default 1)")
+    args = parser.parse_args()
+
+    if os.path.exists(args.vault_dir):
+        parser.error(f"la cartella '{args.vault_dir}' esiste giá")
+    notes = GenerateVault(args.vault_dir, args.years, args.notes_per_year, args.tags, args.time_bullets,
+                          args.assets, args.words, end_year=args.end_year, seed=args.seed)
+    print(f"Vault generato in {args.vault_dir}: {notes} note in {args.years} anni")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark del tempo di avvio (cold start) di JournalScript.py per ogni sottocomando.
+
+Crea in una cartella temporanea la stessa struttura usata in un vero journal
+(JournalScript/ accanto a myjournal/), con un piccolo vault di note generato da genvault.py
+nell'anno corrente, e lancia ogni comando in un nuovo processo piú volte misurandone
+il tempo di esecuzione.
+
+Uso:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 30 --save startup-baseline.json
+    python benchmarks/startup.py --baseline startup-baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+from genvault import BuildLayout
+
+# Nome del caso -> argomenti passati allo script
+COMMANDS = [
+    ("version", ["-v"]),
+    ("help", ["-h"]),
+    ("check-consistency", ["-cc"]),
+    ("update", ["-u"]),
+    ("list-tag", ["-lt"]),
+    ("new", ["-n"]),
+    ("fast-tag", ["-ft", "bench"]),
+    ("week", ["-w"]),
+]
+
+def TimeCommand(script, args, runs):
+    """
+    Esegue lo script `runs` volte e ritorna i tempi in millisecondi,
+    o None se un'esecuzione termina con errore (un comando fallito non è un campione valido).
+    """
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, script] + args, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, check=False)
+        if result.returncode != 0:
+            print(f"Errore: '{' '.join(args)}' è terminato con exit code {result.returncode}, caso scartato.")
+            return None
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del tempo di avvio dei comandi di JournalScript.py")
+    parser.add_argument("--runs", type=int, default=15, help="Esecuzioni per comando (default 15)")
+    parser.add_argument("--notes", type=int, default=60, help="Note nel vault di prova (default 60)")
+    parser.add_argument("--save", metavar="FILE", help="Salva i risultati in formato JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="Confronta con dei risultati salvati in precedenza")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Peggioramento massimo accettato rispetto alla baseline (default 0.20 = 20%%)")
+    args = parser.parse_args()
+
+    results = {}
+    failed = []
+    with tempfile.TemporaryDirectory(prefix="journal-startup-") as root:
+        script, _ = BuildLayout(root, years=1, notes_per_year=args.notes, end_year=date.today().year)
+        # Prima esecuzione a vuoto: crea la nota di oggi (usata da -ft) e indici e cache come in un vault giá in uso
+        subprocess.run([sys.executable, script, "-n"], stdout=subprocess.DEVNULL, check=True)
+        subprocess.run([sys.executable, script, "-u"], stdout=subprocess.DEVNULL, check=True)
+
+        for name, target, cmd in [("python", "-c", ["pass"])] + [(name, script, cmd) for name, cmd in COMMANDS]:
+            samples = TimeCommand(target, cmd, args.runs)
+            if samples is None:
+                failed.append(name)
+                continue
+            results[name] = {"median_ms": statistics.median(samples), "min_ms": min(samples)}
+
+    print(f"{'comando':<20} {'mediana':>10} {'minimo':>10}")
+    for name, res in results.items():
+        print(f"{name:<20} {res['median_ms']:>8.1f}ms {res['min_ms']:>8.1f}ms")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+        print(f"Risultati salvati in {args.save}")
+    if failed:
+        print("Comandi falliti (non salvati né confrontati):")
+        for name in failed:
+            print(f"- {name}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = []
+        for name, res in results.items():
+            if name in baseline and res["median_ms"] > baseline[name]["median_ms"] * (1 + args.tolerance):
+                regressions.append(f"{name}: {baseline[name]['median_ms']:.1f}ms -> {res['median_ms']:.1f}ms")
+        if regressions:
+            print("Regressioni del tempo di avvio:")
+            for line in regressions:
+                print(f"- {line}")
+            sys.exit(1)
+        print("Nessuna regressione rispetto alla baseline.")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()